@@ -1,271 +1,92 @@
-from flask import Flask, render_template, jsonify
-from pymongo import MongoClient
-from datetime import date, datetime, timedelta
-import requests
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-import os
+from flask import Blueprint, Flask, Response, current_app, render_template, jsonify, request, g, stream_with_context
+from datetime import datetime
 from dotenv import load_dotenv
-from langdetect import detect, LangDetectException
 import logging
+import queue
+import time
+from database import check_database, db, warm_up
+from domains import DOMAIN_KEYWORDS, DOMAIN_NAMES
+from events import (PAPER_EVENTS_COLLECTION, STREAM_HEARTBEAT_SECONDS, SYNC_STREAM_MAX_CLIENTS, PaperEventHub,
+                    Subscription, format_sse)
+from response_cache import ResponseCache
+from metrics import RequestMetrics, PIPELINE_METRICS_ID, render_metrics
+from pagination import PaginationError, build_projection, parse_limit, serialize_dates, to_card
+from repositories import paper_repository
+from search_index import SearchIndex
+from seen import CLIENT_COOKIE, SEEN_COLLECTION, SWIPES_COLLECTION, SeenStore, SwipeError, client_id, parse_swipes
+from vector_index import VectorIndex
 
 load_dotenv()
 
-app = Flask(__name__)
-
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuration
-MONGODB_ATLAS_URI = os.getenv('MONGODB_ATLAS_URI')
-CORE_API_KEY = os.getenv('CORE_API_KEY')
-CORE_API_URL = "https://api.core.ac.uk/v3/search/works"
+response_cache = ResponseCache(paper_repository.data_version)
+search_index = SearchIndex.load()
+vector_index = VectorIndex()
+request_metrics = RequestMetrics()
+seen_store = SeenStore(db[SEEN_COLLECTION], db[SWIPES_COLLECTION])
+paper_events = PaperEventHub(db[PAPER_EVENTS_COLLECTION], paper_repository)
+api = Blueprint('api', __name__)
 
-# Domain-specific keywords
-DOMAIN_KEYWORDS = {
-    'artificial_intelligence': [
-        "artificial intelligence", "machine learning", "deep learning", "neural network",
-        "natural language processing", "NLP", "LLM", "large language model",
-        "transformer", "BERT", "GPT", "chatbot"
-    ],
-    'computer_vision': [
-        "computer vision", "object detection", "semantic segmentation",
-        "image processing", "computer graphics", "augmented reality",
-        "virtual reality", "AR VR"
-    ],
-    'data_science': [
-        "data science", "big data", "data mining", "data analytics",
-        "recommendation system", "knowledge graph", "data visualization",
-        "statistical analysis"
-    ],
-    'cloud_computing': [
-        "cloud computing", "edge computing", "distributed systems",
-        "microservices", "DevOps", "API", "containerization",
-        "serverless"
-    ],
-    'cybersecurity': [
-        "cybersecurity", "network security", "information security",
-        "cryptography", "blockchain", "cryptocurrency", "security protocols",
-        "penetration testing"
-    ],
-    'software_engineering': [
-        "software engineering", "web development", "algorithm",
-        "software architecture", "design patterns", "API design",
-        "testing", "continuous integration"
-    ],
-    'high_performance_computing': [
-        "parallel computing", "GPU computing", "quantum computing",
-        "high performance computing", "distributed computing",
-        "supercomputing", "CUDA", "optimization"
-    ]
-}
+def start_request_timer():
+    g.request_started = time.perf_counter()
 
-# MongoDB connection
-try:
-    client = MongoClient(MONGODB_ATLAS_URI)
-    client.admin.command('ping')
-    print("✓ Connected to MongoDB Atlas successfully!")
-except Exception as e:
-    print(f"✗ Failed to connect to MongoDB Atlas: {e}")
-    exit(1)
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.observe(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
 
-db = client['research_papers']
-papers_collection = db['papers']
+def request_client():
+    """The anonymous client id from the paper_client cookie, if the request carries a valid one"""
+    return client_id(request.cookies.get(CLIENT_COOKIE))
 
-def is_english_text(text):
-    """Check if text is in English"""
-    if not text or len(text.strip()) < 50:
-        return False
-    try:
-        lang = detect(text)
-        return lang == 'en'
-    except LangDetectException:
-        return False
-    except Exception:
-        return False
+def seen_for_request():
+    """The client's seen-set, or None to list everything (anonymous, nothing swiped yet, or unreadable)"""
+    if 'seen' not in g:
+        g.seen = None
+        user = request_client()
+        if user is not None:
+            try:
+                seen = seen_store.get(user)
+                g.seen = None if seen.empty else seen
+            except Exception as e:
+                logger.warning(f"Could not load seen papers for {user}: {e}")
+    return g.seen
 
-def get_page_count(paper_data):
-    """Extract page count from paper metadata"""
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: route latency here, ingestion stages from the shared metrics document"""
     try:
-        if 'pageCount' in paper_data:
-            return int(paper_data['pageCount'])
-        
-        if 'pages' in paper_data:
-            page_str = str(paper_data['pages'])
-            if '-' in page_str:
-                parts = page_str.split('-')
-                if len(parts) == 2:
-                    try:
-                        return int(parts[1]) - int(parts[0])
-                    except ValueError:
-                        return 0
-            else:
-                try:
-                    return int(page_str)
-                except ValueError:
-                    return 0
-        
-        return 0
+        pipeline_doc = db['ingest_meta'].find_one({'_id': PIPELINE_METRICS_ID})
     except Exception as e:
-        return 0
-
-def get_paper_domains(paper):
-    """Identify domains that a paper belongs to"""
-    title = paper.get('title', '').lower()
-    abstract = paper.get('abstract', '').lower()
-    keywords = paper.get('keywords', [])
-    
-    searchable_text = f"{title} {abstract} {' '.join(keywords)}".lower()
-    domains = []
-    
-    for domain, keywords in DOMAIN_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword.lower() in searchable_text:
-                domains.append(domain)
-                break
-    
-    return domains
+        logger.warning(f"Could not read pipeline metrics: {e}")
+        pipeline_doc = None
+    body = render_metrics(request_metrics, pipeline_doc, response_cache)
+    return current_app.response_class(body, content_type='text/plain; version=0.0.4; charset=utf-8')
 
-def is_ai_cs_paper(paper):
-    """Check if paper is about AI or Computer Science"""
-    return len(get_paper_domains(paper)) > 0
-
-def fetch_and_store_papers():
-    """Fetch recent AI and CS papers and store in MongoDB"""
-    try:
-        logger.info("=" * 70)
-        logger.info("Starting paper fetch from CORE API...")
-        logger.info("=" * 70)
-        
-        # Initialize domain stats for this update
-        domain_stats = {domain: 0 for domain in DOMAIN_KEYWORDS.keys()}
-        
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=7)
-        
-        query = f"yearPublished>={start_date.year} AND _exists_:abstract"
-        
-        headers = {
-            'Authorization': f'Bearer {CORE_API_KEY}'
-        }
-        
-        params = {
-            'q': query,
-            'limit': 150,
-            'offset': 0
-        }
-        
-        response = requests.get(CORE_API_URL, headers=headers, params=params, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            all_papers = data.get('results', [])
-            
-            inserted_count = 0
-            today = datetime.now().date()
-            # store fetchedDate as an ISO string to avoid encoding datetime.date issues with PyMongo
-            today_str = today.isoformat()
-            
-            for paper in all_papers:
-                try:
-                    title = paper.get('title', 'Untitled')
-                    abstract = paper.get('abstract', '')
-                    
-                    if not abstract:
-                        continue
-                    
-                    if not is_english_text(abstract):
-                        continue
-                    
-                    if not is_ai_cs_paper(paper):
-                        continue
-                    
-                    page_count = get_page_count(paper)
-                    if page_count > 0 and page_count < 15:
-                        continue
-                    
-                    paper_obj = {
-                        'coreId': paper.get('id'),
-                        'title': title,
-                        'abstract': abstract[:500],
-                        'authors': [author.get('name', '') for author in paper.get('authors', []) if author.get('name')],
-                        'publishedDate': paper.get('publishedDate', str(datetime.now())),
-                        'downloadUrl': paper.get('downloadUrl', ''),
-                        'sourceFulltextUrls': paper.get('sourceFulltextUrls', []),
-                        'doi': paper.get('doi', ''),
-                        'pageCount': page_count if page_count > 0 else None,
-                        'keywords': paper.get('keywords', [])[:5],
-                        'domains': get_paper_domains(paper),
-                        # store as string like 'YYYY-MM-DD' so queries and storage are consistent
-                        'fetchedDate': today_str,
-                        'fetchedAt': datetime.now()
-                    }
-                    
-                    # Insert or update paper
-                    result = papers_collection.update_one(
-                        {'coreId': paper_obj['coreId']},
-                        {'$set': paper_obj},
-                        upsert=True
-                    )
-                    
-                    if result.upserted_id or result.modified_count > 0:
-                        inserted_count += 1
-                        # Update domain stats
-                        for domain in paper_obj['domains']:
-                            domain_stats[domain] += 1
-                        logger.info(f"✓ Stored: {title[:60]}... ({page_count} pages)")
-                        
-                        if inserted_count >= 50:  # Limit to 50 papers per update
-                            break
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing paper: {str(e)}")
-                    continue
-            
-            # Store update statistics
-            update_stats = {
-                'timestamp': datetime.now(),
-                'total_papers': inserted_count,
-                'domain_stats': domain_stats
-            }
-            db['update_stats'].insert_one(update_stats)
-            
-            logger.info(f"✓ Successfully stored {inserted_count} papers")
-            for domain, count in domain_stats.items():
-                if count > 0:
-                    logger.info(f"  - {domain}: {count} papers")
-            logger.info("=" * 70)
-            
-        else:
-            logger.error(f"CORE API Error: {response.status_code}")
-            
-    except Exception as e:
-        logger.error(f"Error in fetch_and_store_papers: {str(e)}")
-
-def serialize_dates(paper):
-    # Convert datetime.date or datetime.datetime to ISO string
-    for key in ['fetchedDate', 'publishedDate', 'fetchedAt']:
-        if key in paper and isinstance(paper[key], (datetime, date)):
-            paper[key] = paper[key].isoformat()
-    return paper
-
-@app.route('/')
+@api.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/papers', methods=['GET'])
+@api.route('/api/papers', methods=['GET'])
+@response_cache.cached_unless(seen_for_request)
 def get_papers():
-    """Fetch today's papers from MongoDB"""
+    """Fetch today's papers"""
     try:
         today = datetime.now().date()
         today_str = today.isoformat()
 
         # Include papers fetched today or promoted for today
-        papers = list(papers_collection.find(
-            {'$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}]},
-            {'_id': 0}
-        ).sort('publishedDate', -1).limit(100))
+        papers, next_cursor = paper_repository.list_papers(
+            today_str,
+            request.args,
+            default_limit=100,
+            seen=seen_for_request()
+        )
 
         papers = [serialize_dates(p) for p in papers]
 
@@ -273,8 +94,14 @@ def get_papers():
             'success': True,
             'papers': papers,
             'count': len(papers),
+            'nextCursor': next_cursor,
             'fetchDate': today_str
         })
+    except PaginationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in get_papers: {str(e)}")
         return jsonify({
@@ -282,24 +109,15 @@ def get_papers():
             'error': str(e)
         }), 500
 
-@app.route('/api/domains', methods=['GET'])
+@api.route('/api/domains', methods=['GET'])
+@response_cache.cached
 def get_domains():
     """Get list of available domains"""
     try:
         domains = sorted(DOMAIN_KEYWORDS.keys())
-        domain_names = {
-            'artificial_intelligence': 'Artificial Intelligence',
-            'computer_vision': 'Computer Vision',
-            'data_science': 'Data Science',
-            'cloud_computing': 'Cloud Computing',
-            'cybersecurity': 'Cybersecurity',
-            'software_engineering': 'Software Engineering',
-            'high_performance_computing': 'High Performance Computing'
-        }
-        
         return jsonify({
             'success': True,
-            'domains': [{'id': d, 'name': domain_names.get(d, d)} for d in domains]
+            'domains': [{'id': d, 'name': DOMAIN_NAMES.get(d, d)} for d in domains]
         })
     except Exception as e:
         return jsonify({
@@ -307,7 +125,8 @@ def get_domains():
             'error': str(e)
         }), 500
 
-@app.route('/api/papers/<domain>', methods=['GET'])
+@api.route('/api/papers/<domain>', methods=['GET'])
+@response_cache.cached_unless(seen_for_request)
 def get_papers_by_domain(domain):
     """Fetch today's papers for a specific domain"""
     try:
@@ -321,13 +140,13 @@ def get_papers_by_domain(domain):
             }), 400
         
         # Include papers fetched today or promoted for today
-        papers = list(papers_collection.find(
-            {
-                '$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}],
-                'domains': domain
-            },
-            {'_id': 0}
-        ).sort('publishedDate', -1).limit(10))  # Limit to 10 papers per domain
+        papers, next_cursor = paper_repository.list_papers(
+            today_str,
+            request.args,
+            default_limit=10,  # 10 papers per page unless ?limit= asks for more
+            domain=domain,
+            seen=seen_for_request()  # cards this client already swiped are skipped
+        )
         
         papers = [serialize_dates(p) for p in papers]
         
@@ -335,9 +154,15 @@ def get_papers_by_domain(domain):
             'success': True,
             'papers': papers,
             'count': len(papers),
+            'nextCursor': next_cursor,
             'domain': domain,
             'fetchDate': today_str
         })
+    except PaginationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in get_papers_by_domain: {str(e)}")
         return jsonify({
@@ -345,26 +170,132 @@ def get_papers_by_domain(domain):
             'error': str(e)
         }), 500
 
-@app.route('/api/domain-stats', methods=['GET'])
+@api.route('/api/search', methods=['GET'])
+@response_cache.cached
+def search_papers():
+    """Full-text search over stored papers, ranked by BM25"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Missing query parameter q'
+            }), 400
+        
+        domain = request.args.get('domain')
+        if domain and domain not in DOMAIN_KEYWORDS:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid domain'
+            }), 400
+        
+        limit = parse_limit(request.args.get('limit'), 20)
+        
+        if paper_repository.supports_text_search:
+            hits = paper_repository.search_papers(query, limit, domain=domain)
+        else:
+            # Pull anything ingestion committed since the last search into the index
+            search_index.refresh(db['papers'], response_cache.data_version(), paper_repository.resync_count)
+            hits = search_index.search(query, limit=limit * 3 if domain else limit)
+        
+        # One indexed lookup for the matched documents only
+        docs = paper_repository.find_papers(
+            [core_id for core_id, _ in hits],
+            {'_id': 0, 'domains': 1, **build_projection(view='card')},
+            domain=domain
+        )
+        
+        papers = []
+        for core_id, score in hits:
+            doc = docs.get(core_id)
+            if doc is None:
+                continue
+            paper = to_card(doc)
+            paper['domains'] = doc.get('domains', [])
+            paper['score'] = round(score, 4)
+            papers.append(serialize_dates(paper))
+            if len(papers) >= limit:
+                break
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'papers': papers,
+            'count': len(papers)
+        })
+    except PaginationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in search_papers: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/api/papers/<int:core_id>/similar', methods=['GET'])
+@response_cache.cached
+def get_similar_papers(core_id):
+    """Papers closest to core_id by cosine similarity of their text vectors"""
+    try:
+        limit = parse_limit(request.args.get('limit'), 10)
+        
+        vector_index.refresh(db['paper_vectors'], response_cache.data_version(),
+                             read_resync_count=paper_repository.resync_count)
+        hits = vector_index.most_similar(core_id, limit=limit)
+        if hits is None:
+            return jsonify({
+                'success': False,
+                'error': 'Paper not found'
+            }), 404
+        
+        docs = paper_repository.find_papers(
+            [hit_id for hit_id, _ in hits],
+            {'_id': 0, 'domains': 1, **build_projection(view='card')}
+        )
+        
+        papers = []
+        for hit_id, score in hits:
+            doc = docs.get(hit_id)
+            if doc is None:
+                continue
+            paper = to_card(doc)
+            paper['domains'] = doc.get('domains', [])
+            paper['score'] = round(score, 4)
+            papers.append(serialize_dates(paper))
+        
+        return jsonify({
+            'success': True,
+            'coreId': core_id,
+            'papers': papers,
+            'count': len(papers)
+        })
+    except PaginationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in get_similar_papers: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/api/domain-stats', methods=['GET'])
+@response_cache.cached
 def get_domain_stats():
     """Get domain-specific statistics"""
     try:
         today = datetime.now().date()
         today_str = today.isoformat()
         
-        # Get the last update statistics
-        last_update = db['update_stats'].find_one(
-            sort=[('timestamp', -1)]
-        )
+        counts, last_update = paper_repository.daily_stats(today_str)
         
         # Get current counts per domain
-        domain_counts = {}
-        for domain in DOMAIN_KEYWORDS.keys():
-            count = papers_collection.count_documents({
-                'fetchedDate': today_str,
-                'domains': domain
-            })
-            domain_counts[domain] = count
+        domain_counts = {domain: counts['domains'].get(domain, 0) for domain in DOMAIN_KEYWORDS.keys()}
         
         return jsonify({
             'success': True,
@@ -381,14 +312,16 @@ def get_domain_stats():
             'error': str(e)
         }), 500
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
+@response_cache.cached
 def get_stats():
     """Get statistics"""
     try:
         today = datetime.now().date()
         today_str = today.isoformat()
-        total_papers_today = papers_collection.count_documents({'fetchedDate': today_str})
-        total_papers = papers_collection.count_documents({})
+        counts, _ = paper_repository.daily_stats(today_str)
+        total_papers_today = counts['total']
+        total_papers = paper_repository.count_papers()
         
         return jsonify({
             'success': True,
@@ -402,35 +335,83 @@ def get_stats():
             'error': str(e)
         }), 500
 
-# Initialize scheduler
-scheduler = BackgroundScheduler()
+@api.route('/api/swipes', methods=['POST'])
+def record_swipes():
+    """Record a batch of swipes so listings stop serving those papers to this client"""
+    user = request_client()
+    if user is None:
+        return jsonify({'success': False, 'error': f'Missing or invalid {CLIENT_COOKIE} cookie'}), 400
+    try:
+        swipes = parse_swipes(request.get_json(silent=True))
+        seen_store.record(user, swipes)
+        return jsonify({'success': True, 'recorded': len(swipes)})
+    except SwipeError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in record_swipes: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/api/stream', methods=['GET'])
+def stream_papers():
+    """Server-sent events: the coreIds (and cards) each ingestion or promotion adds, per domain"""
+    if paper_events.subscriber_count >= SYNC_STREAM_MAX_CLIENTS:
+        # EventSource gives up on a 503; the page falls back to hourly polling
+        return jsonify({'success': False, 'error': 'Too many open streams'}), 503, {'Retry-After': '60'}
+    subscription = paper_events.subscribe(Subscription())
+    last_event_id = request.headers.get('Last-Event-ID')
 
-# Schedule hourly updates
-scheduler.add_job(
-    fetch_and_store_papers,
-    trigger=CronTrigger(minute=0, timezone='UTC'),  # Run at the start of every hour
-    id='hourly_paper_fetch',
-    name='Hourly Paper Fetch from CORE API',
-    replace_existing=True
-)
+    def events():
+        try:
+            yield 'retry: 5000\n\n'
+            if last_event_id:
+                for event in paper_events.replay(last_event_id):
+                    yield format_sse(event)
+            while not subscription.overflowed:
+                try:
+                    event = subscription.queue.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+            # Fell too far behind; the client reloads its deck and reconnects
+            yield format_sse({}, event_type='reset')
+        finally:
+            paper_events.unsubscribe(subscription)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-# Also run on app startup
-def startup_job():
-    logger.info("App started - Running initial paper fetch...")
-    fetch_and_store_papers()
+@api.route('/healthz', methods=['GET'])
+def liveness():
+    """The process is up; says nothing about its dependencies"""
+    return jsonify({'alive': True})
 
-scheduler.add_job(
-    startup_job,
-    trigger='date',
-    run_date=datetime.now() + timedelta(seconds=2),
-    id='startup_fetch',
-    replace_existing=True
-)
+@api.route('/readyz', methods=['GET'])
+def readiness():
+    """Ready to serve once MongoDB answers a ping; 503 takes the worker out of rotation"""
+    database = check_database()
+    return jsonify({'ready': database['ok'], 'database': database}), 200 if database['ok'] else 503
 
-scheduler.start()
+# Ingestion (the ingest package) runs in the dedicated worker started by scheduler.py,
+# so web workers never fetch papers themselves.
+
+def create_app():
+    """Build the Flask app; no database I/O happens here, workers boot without waiting on MongoDB"""
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(api)
+    flask_app.before_request(start_request_timer)
+    flask_app.after_request(record_request_latency)
+    warm_up()
+    return flask_app
+
+app = create_app()
 
 if __name__ == '__main__':
-    try:
-        app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
-    except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
@@ -0,0 +1,592 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import wraps
+
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+import database
+from database import (MONGODB_ATLAS_URI, MONGODB_DATABASE, MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                      READINESS_TIMEOUT_SECONDS)
+from domains import DOMAIN_KEYWORDS, DOMAIN_NAMES
+from events import (PAPER_EVENTS_COLLECTION, STREAM_HEARTBEAT_SECONDS, STREAM_MAX_CLIENTS, STREAM_QUEUE_SIZE,
+                    PaperEventHub, format_sse)
+from metrics import RequestMetrics, PIPELINE_METRICS_ID, render_metrics
+from pagination import (PaginationError, UnseenPage, build_projection, finish_page, listing_query, parse_limit,
+                        serialize_dates, to_card)
+from repositories import STORAGE_BACKEND, MongoPaperRepository
+from response_cache import CLIENT_MAX_AGE, DATA_VERSION_CHECK_SECONDS, DATA_VERSION_ID, ResponseCache
+from search_index import INDEXED_FIELDS, SearchIndex
+from seen import CLIENT_COOKIE, SEEN_COLLECTION, SWIPES_COLLECTION, SeenStore, SwipeError, client_id, parse_swipes
+from stats import LAST_UPDATE_ID, daily_counts_pipeline, parse_daily_counts
+from vector_index import VectorIndex
+
+# Async serving mode: the same /api/* contract as app.py on Starlette + Motor.
+# Run with `SERVER_MODE=async gunicorn -c gunicorn.conf.py` or `uvicorn asgi:app`.
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The async server reads MongoDB through motor; the SQLite backend is served by app.py
+if STORAGE_BACKEND != 'mongo':
+    raise RuntimeError(f"asgi.py serves the mongo storage backend only (STORAGE_BACKEND={STORAGE_BACKEND}); "
+                       f"run app.py with gunicorn instead")
+
+# Configuration
+# One event loop keeps many requests in flight at once, so the pool is sized for
+# concurrent operations rather than for a handful of sync worker threads
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '200'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '10'))
+MONGODB_MAX_CONNECTING = int(os.getenv('MONGODB_MAX_CONNECTING', '8'))
+# Fail a request quickly instead of queueing behind an exhausted pool
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+
+# The version collection is polled here (without blocking the loop), not by the cache itself
+response_cache = ResponseCache()
+search_index = SearchIndex.load()
+vector_index = VectorIndex()
+request_metrics = RequestMetrics()
+# The event hub follows paper_events from a thread with the sync driver, shared with app.py
+paper_events = PaperEventHub(database.db[PAPER_EVENTS_COLLECTION], MongoPaperRepository(database.db))
+# Seen-sets are served from memory; misses and swipe writes go through the sync driver off the loop
+seen_store = SeenStore(database.db[SEEN_COLLECTION], database.db[SWIPES_COLLECTION])
+
+_search_lock = asyncio.Lock()
+_vector_lock = asyncio.Lock()
+_version_checked = float('-inf')
+_resync_count = 0
+
+templates = Environment(loader=FileSystemLoader(os.path.join(BASE_DIR, 'templates')), autoescape=True)
+templates.globals['url_for'] = lambda endpoint, filename='': f'/{endpoint}/{filename}'
+
+
+def create_client():
+    return AsyncIOMotorClient(
+        MONGODB_ATLAS_URI,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxConnecting=MONGODB_MAX_CONNECTING,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    )
+
+
+def json_response(payload, status_code=200):
+    # Same encoding as Flask's jsonify in production: sorted keys, compact, trailing newline
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str) + '\n'
+    return Response(body, status_code=status_code, media_type='application/json')
+
+
+def error_response(message, status_code):
+    return json_response({'success': False, 'error': message}, status_code)
+
+
+async def data_version(db):
+    """Re-read the ingestion data version at most once per DATA_VERSION_CHECK_SECONDS"""
+    global _version_checked, _resync_count
+    now = time.monotonic()
+    if now - _version_checked >= DATA_VERSION_CHECK_SECONDS:
+        _version_checked = now
+        try:
+            doc = await db['ingest_meta'].find_one({'_id': DATA_VERSION_ID}, {'version': 1, 'resync': 1})
+            _resync_count = (doc or {}).get('resync', 0)
+            response_cache.set_data_version((doc or {}).get('version', 0))
+        except Exception as e:
+            logger.warning(f"Could not read data version, keeping {response_cache.data_version()}: {e}")
+    return response_cache.data_version()
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in header.split(',')}
+    return '*' in tags or etag in tags
+
+
+def cached(view):
+    """Async counterpart of ResponseCache.cached: serve cached bytes with ETag / 304 support"""
+    @wraps(view)
+    async def wrapper(request):
+        await data_version(request.app.state.db)
+        today_str = datetime.now().date().isoformat()
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), today_str)
+
+        cached_entry = response_cache.get(key)
+        if cached_entry is not None:
+            response_cache.hits += 1
+            body, etag = cached_entry
+        else:
+            response_cache.misses += 1
+            response = await view(request)
+            if response.status_code != 200:
+                return response
+            body = response.body
+            etag = response_cache.set(key, body)
+
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': f'public, max-age={CLIENT_MAX_AGE}'}
+        if _etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type='application/json', headers=headers)
+    return wrapper
+
+
+def cached_unless(personal):
+    """Async counterpart of ResponseCache.cached_unless"""
+    def decorator(view):
+        cached_view = cached(view)
+
+        @wraps(view)
+        async def wrapper(request):
+            if not await personal(request):
+                response = await cached_view(request)
+                response.headers['Cache-Control'] = 'no-cache'
+            else:
+                response = await view(request)
+                response.headers['Cache-Control'] = 'private, no-store'
+            response.headers['Vary'] = 'Cookie'
+            return response
+        return wrapper
+    return decorator
+
+
+def request_client(request):
+    """The anonymous client id from the paper_client cookie, if the request carries a valid one"""
+    return client_id(request.cookies.get(CLIENT_COOKIE))
+
+
+async def seen_for_request(request):
+    """Async counterpart of app.seen_for_request"""
+    if not hasattr(request.state, 'seen'):
+        request.state.seen = None
+        user = request_client(request)
+        if user is not None:
+            try:
+                seen = seen_store.cached(user) or await asyncio.to_thread(seen_store.get, user)
+                request.state.seen = None if seen.empty else seen
+            except Exception as e:
+                logger.warning(f"Could not load seen papers for {user}: {e}")
+    return request.state.seen
+
+
+async def paginate(collection, query, args, default_limit, seen=None):
+    """Async counterpart of pagination.paginate"""
+    if seen is not None:
+        page = UnseenPage(query, args, default_limit, seen)
+        while page.wants_more():
+            cursor = collection.find(page.next_query, page.projection).sort(page.sort).limit(page.batch_size)
+            page.add(await cursor.to_list(page.batch_size))
+        return page.finish()
+    query, projection, sort, limit, view = listing_query(query, args, default_limit)
+    papers = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    return finish_page(papers, limit, view)
+
+
+async def load_daily_stats(db, today_str):
+    """Async counterpart of stats.load_daily_stats"""
+    docs = {doc['_id']: doc async for doc in db['daily_counts'].find({'_id': {'$in': [today_str, LAST_UPDATE_ID]}})}
+    counts = docs.get(today_str)
+    if counts is None:
+        result = await db['papers'].aggregate(daily_counts_pipeline(today_str)).to_list(1)
+        counts = parse_daily_counts(result[0] if result else {})
+    return counts, docs.get(LAST_UPDATE_ID)
+
+
+async def refresh_search_index(papers_collection, version):
+    """Pull papers committed since the last refresh; indexing runs off the event loop"""
+    if version == search_index.data_version:
+        return
+    async with _search_lock:
+        if version == search_index.data_version:
+            return
+        search_index.check_resync(_resync_count)
+        papers = await papers_collection.find(search_index.sync_query(), INDEXED_FIELDS).sort('fetchedAt', 1).to_list(None)
+        await asyncio.to_thread(search_index.apply_sync, papers)
+        await asyncio.to_thread(search_index.mark_synced, version)
+
+
+async def refresh_vector_index(vectors_collection, version):
+    if version == vector_index.data_version:
+        return
+    async with _vector_lock:
+        if version == vector_index.data_version:
+            return
+        vector_index.check_resync(_resync_count)
+        docs = await vectors_collection.find(vector_index.sync_query()).sort('fetchedAt', 1).to_list(None)
+        await asyncio.to_thread(vector_index.apply_sync, docs, version)
+
+
+async def cards_for_hits(papers_collection, hits, domain=None, limit=None):
+    """Card documents for ranked (coreId, score) hits, in hit order"""
+    docs_query = {'coreId': {'$in': [core_id for core_id, _ in hits]}}
+    if domain:
+        docs_query['domains'] = domain
+    docs = {doc['coreId']: doc async for doc in papers_collection.find(
+        docs_query, {'_id': 0, 'domains': 1, **build_projection(view='card')}
+    )}
+    papers = []
+    for core_id, score in hits:
+        doc = docs.get(core_id)
+        if doc is None:
+            continue
+        paper = to_card(doc)
+        paper['domains'] = doc.get('domains', [])
+        paper['score'] = round(score, 4)
+        papers.append(serialize_dates(paper))
+        if limit is not None and len(papers) >= limit:
+            break
+    return papers
+
+
+class AsyncSubscription:
+    """A stream client's inbox on the event loop, fed from the hub's thread"""
+
+    def __init__(self, loop, maxsize=STREAM_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class RequestTimer:
+    """ASGI middleware recording route latency into request_metrics, like app.py's hooks"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            request_metrics.observe(route, scope['method'], status, time.perf_counter() - started)
+
+
+async def metrics(request):
+    """Prometheus metrics: route latency here, ingestion stages from the shared metrics document"""
+    try:
+        pipeline_doc = await request.app.state.db['ingest_meta'].find_one({'_id': PIPELINE_METRICS_ID})
+    except Exception as e:
+        logger.warning(f"Could not read pipeline metrics: {e}")
+        pipeline_doc = None
+    body = render_metrics(request_metrics, pipeline_doc, response_cache)
+    return Response(body, media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def index(request):
+    return HTMLResponse(templates.get_template('index.html').render())
+
+
+@cached_unless(seen_for_request)
+async def get_papers(request):
+    """Fetch today's papers from MongoDB"""
+    try:
+        today_str = datetime.now().date().isoformat()
+
+        # Include papers fetched today or promoted for today
+        papers, next_cursor = await paginate(
+            request.app.state.db['papers'],
+            {'$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}]},
+            request.query_params,
+            default_limit=100,
+            seen=await seen_for_request(request)
+        )
+
+        papers = [serialize_dates(p) for p in papers]
+
+        return json_response({
+            'success': True,
+            'papers': papers,
+            'count': len(papers),
+            'nextCursor': next_cursor,
+            'fetchDate': today_str
+        })
+    except PaginationError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in get_papers: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@cached
+async def get_domains(request):
+    """Get list of available domains"""
+    domains = sorted(DOMAIN_KEYWORDS.keys())
+    return json_response({
+        'success': True,
+        'domains': [{'id': d, 'name': DOMAIN_NAMES.get(d, d)} for d in domains]
+    })
+
+
+@cached_unless(seen_for_request)
+async def get_papers_by_domain(request):
+    """Fetch today's papers for a specific domain"""
+    try:
+        today_str = datetime.now().date().isoformat()
+        domain = request.path_params['domain']
+
+        if domain not in DOMAIN_KEYWORDS:
+            return error_response('Invalid domain', 400)
+
+        # Include papers fetched today or promoted for today
+        papers, next_cursor = await paginate(
+            request.app.state.db['papers'],
+            {
+                '$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}],
+                'domains': domain
+            },
+            request.query_params,
+            default_limit=10,
+            seen=await seen_for_request(request)
+        )
+
+        papers = [serialize_dates(p) for p in papers]
+
+        return json_response({
+            'success': True,
+            'papers': papers,
+            'count': len(papers),
+            'nextCursor': next_cursor,
+            'domain': domain,
+            'fetchDate': today_str
+        })
+    except PaginationError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in get_papers_by_domain: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@cached
+async def search_papers(request):
+    """Full-text search over stored papers, ranked by BM25"""
+    try:
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return error_response('Missing query parameter q', 400)
+
+        domain = request.query_params.get('domain')
+        if domain and domain not in DOMAIN_KEYWORDS:
+            return error_response('Invalid domain', 400)
+
+        limit = parse_limit(request.query_params.get('limit'), 20)
+
+        papers_collection = request.app.state.db['papers']
+        await refresh_search_index(papers_collection, await data_version(request.app.state.db))
+        hits = await asyncio.to_thread(search_index.search, query, limit * 3 if domain else limit)
+        papers = await cards_for_hits(papers_collection, hits, domain=domain, limit=limit)
+
+        return json_response({
+            'success': True,
+            'query': query,
+            'papers': papers,
+            'count': len(papers)
+        })
+    except PaginationError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in search_papers: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@cached
+async def get_similar_papers(request):
+    """Papers closest to core_id by cosine similarity of their text vectors"""
+    try:
+        core_id = request.path_params['core_id']
+        limit = parse_limit(request.query_params.get('limit'), 10)
+
+        db = request.app.state.db
+        await refresh_vector_index(db['paper_vectors'], await data_version(db))
+        hits = await asyncio.to_thread(vector_index.most_similar, core_id, limit)
+        if hits is None:
+            return error_response('Paper not found', 404)
+
+        papers = await cards_for_hits(db['papers'], hits)
+
+        return json_response({
+            'success': True,
+            'coreId': core_id,
+            'papers': papers,
+            'count': len(papers)
+        })
+    except PaginationError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in get_similar_papers: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@cached
+async def get_domain_stats(request):
+    """Get domain-specific statistics"""
+    try:
+        db = request.app.state.db
+        today_str = datetime.now().date().isoformat()
+
+        counts, last_update = await load_daily_stats(db, today_str)
+        if last_update is None:
+            last_update = await db['update_stats'].find_one(sort=[('timestamp', -1)])
+
+        domain_counts = {domain: counts['domains'].get(domain, 0) for domain in DOMAIN_KEYWORDS.keys()}
+
+        return json_response({
+            'success': True,
+            'domain_counts': domain_counts,
+            'last_update': {
+                'timestamp': last_update['timestamp'].isoformat() if last_update else None,
+                'papers_added': last_update['total_papers'] if last_update else 0,
+                'domain_stats': last_update['domain_stats'] if last_update else {}
+            }
+        })
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@cached
+async def get_stats(request):
+    """Get statistics"""
+    try:
+        db = request.app.state.db
+        today_str = datetime.now().date().isoformat()
+        counts, _ = await load_daily_stats(db, today_str)
+
+        return json_response({
+            'success': True,
+            'papers_today': counts['total'],
+            'total_papers': await db['papers'].estimated_document_count(),
+            'last_updated': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def record_swipes(request):
+    """Record a batch of swipes so listings stop serving those papers to this client"""
+    user = request_client(request)
+    if user is None:
+        return error_response(f'Missing or invalid {CLIENT_COOKIE} cookie', 400)
+    try:
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        swipes = parse_swipes(payload)
+        await asyncio.to_thread(seen_store.record, user, swipes)
+        return json_response({'success': True, 'recorded': len(swipes)})
+    except SwipeError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in record_swipes: {str(e)}")
+        return error_response(str(e), 500)
+
+
+async def stream_papers(request):
+    """Server-sent events: the coreIds (and cards) each ingestion or promotion adds, per domain"""
+    if paper_events.subscriber_count >= STREAM_MAX_CLIENTS:
+        response = error_response('Too many open streams', 503)
+        response.headers['Retry-After'] = '60'
+        return response
+    subscription = paper_events.subscribe(AsyncSubscription(asyncio.get_running_loop()))
+    last_event_id = request.headers.get('last-event-id')
+
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            if last_event_id:
+                for event in await asyncio.to_thread(paper_events.replay, last_event_id):
+                    yield format_sse(event)
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+            yield format_sse({}, event_type='reset')
+        finally:
+            paper_events.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def liveness(request):
+    """The process is up; says nothing about its dependencies"""
+    return json_response({'alive': True})
+
+
+async def readiness(request):
+    """Ready to serve once MongoDB answers a ping; 503 takes the worker out of rotation"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(request.app.state.db.command('ping'), READINESS_TIMEOUT_SECONDS)
+        database = {'ok': True}
+    except Exception as e:
+        database = {'ok': False, 'error': str(e) or type(e).__name__}
+    database['latencyMs'] = round((time.perf_counter() - started) * 1000, 2)
+    return json_response({'ready': database['ok'], 'database': database}, 200 if database['ok'] else 503)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    client = create_client()
+    app.state.db = client[MONGODB_DATABASE]
+    try:
+        yield
+    finally:
+        client.close()
+
+
+routes = [
+    Route('/', index),
+    Route('/metrics', metrics, methods=['GET']),
+    Route('/api/papers', get_papers, methods=['GET']),
+    Route('/api/domains', get_domains, methods=['GET']),
+    Route('/api/papers/{domain}', get_papers_by_domain, methods=['GET']),
+    Route('/api/search', search_papers, methods=['GET']),
+    Route('/api/papers/{core_id:int}/similar', get_similar_papers, methods=['GET']),
+    Route('/api/domain-stats', get_domain_stats, methods=['GET']),
+    Route('/api/stats', get_stats, methods=['GET']),
+    Route('/api/swipes', record_swipes, methods=['POST']),
+    Route('/api/stream', stream_papers, methods=['GET']),
+    Route('/healthz', liveness, methods=['GET']),
+    Route('/readyz', readiness, methods=['GET']),
+    Mount('/static', StaticFiles(directory=os.path.join(BASE_DIR, 'static')), name='static'),
+]
+
+app = Starlette(routes=routes, middleware=[Middleware(RequestTimer)], lifespan=lifespan)
@@ -0,0 +1,97 @@
+"""Micro-benchmark: substring-loop domain classification vs DomainMatcher.
+
+Usage: python benchmarks/bench_domains.py [--papers 100000] [--seed 42]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from domain_matcher import DomainMatcher  # noqa: E402
+
+
+def load_domain_keywords():
+    from domains import DOMAIN_KEYWORDS
+    return DOMAIN_KEYWORDS
+
+
+def legacy_get_paper_domains(paper, domain_keywords):
+    """The original nested substring loop from app.get_paper_domains"""
+    title = paper.get('title', '').lower()
+    abstract = paper.get('abstract', '').lower()
+    keywords = paper.get('keywords', [])
+    searchable_text = f"{title} {abstract} {' '.join(keywords)}".lower()
+    domains = []
+    for domain, keywords in domain_keywords.items():
+        for keyword in keywords:
+            if keyword.lower() in searchable_text:
+                domains.append(domain)
+                break
+    return domains
+
+
+FILLER = (
+    "we propose a novel method for the study of protein folding soil erosion rapid "
+    "capital markets and coastal ecology using field measurements survey data and "
+    "longitudinal cohort analysis across several regions and time periods"
+).split()
+
+
+def synthetic_corpus(n, domain_keywords, seed):
+    rng = random.Random(seed)
+    vocabulary = [kw for kws in domain_keywords.values() for kw in kws]
+    corpus = []
+    for i in range(n):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(120, 220))]
+        # Roughly a third of abstracts mention one or two domain keywords
+        for _ in range(rng.choice((0, 0, 1, 2))):
+            words.insert(rng.randrange(len(words)), rng.choice(vocabulary))
+        corpus.append({
+            'id': i,
+            'title': ' '.join(rng.choice(FILLER) for _ in range(8)),
+            'abstract': ' '.join(words),
+            'keywords': [rng.choice(FILLER) for _ in range(3)],
+        })
+    return corpus
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    results = [fn(paper) for paper in corpus]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--papers', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    domain_keywords = load_domain_keywords()
+    corpus = synthetic_corpus(args.papers, domain_keywords, args.seed)
+
+    start = time.perf_counter()
+    matcher = DomainMatcher(domain_keywords)
+    build_time = time.perf_counter() - start
+
+    legacy_time, legacy = timed(lambda p: legacy_get_paper_domains(p, domain_keywords), corpus)
+    matcher_time, matched = timed(matcher.match_paper, corpus)
+    differing = sum(1 for a, b in zip(legacy, matched) if a != b)
+
+    # fetch_and_store_papers used to classify each kept paper twice
+    # (is_ai_cs_paper, then again for the stored document); it now classifies once.
+    print(f"papers:               {len(corpus)}")
+    print(f"matcher build:        {build_time * 1000:.2f} ms")
+    print(f"legacy, per call:     {legacy_time:.3f} s ({len(corpus) / legacy_time:,.0f} papers/s)")
+    print(f"DomainMatcher:        {matcher_time:.3f} s ({len(corpus) / matcher_time:,.0f} papers/s)")
+    print(f"speedup per call:     {legacy_time / matcher_time:.2f}x")
+    print(f"speedup per paper:    {2 * legacy_time / matcher_time:.2f}x (legacy called twice)")
+    print(f"results differing:    {differing} (word-boundary matches, e.g. 'api' in 'rapid')")
+
+
+if __name__ == '__main__':
+    main()
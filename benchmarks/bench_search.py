@@ -0,0 +1,95 @@
+"""Benchmark: SearchIndex build, BM25 query latency and snapshot round trip.
+
+Usage: python benchmarks/bench_search.py [--papers 100000] [--queries 500] [--seed 42]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search_index import SearchIndex  # noqa: E402
+
+TOPIC_WORDS = (
+    "neural network transformer attention graph segmentation detection retrieval "
+    "federated privacy blockchain consensus compiler kernel scheduling cache gpu "
+    "quantum annealing reinforcement policy gradient diffusion generative adversarial "
+    "embedding clustering anomaly intrusion malware encryption protocol microservice "
+    "container serverless latency throughput benchmark dataset evaluation robustness"
+).split()
+COMMON_WORDS = (
+    "we propose method results show approach model performance based paper study "
+    "framework novel existing data analysis system problem proposed using new two"
+).split()
+
+
+def synthetic_papers(n, seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for i in range(n):
+        title = ' '.join(rng.choice(TOPIC_WORDS) for _ in range(rng.randint(5, 10)))
+        abstract = ' '.join(
+            rng.choice(TOPIC_WORDS) if rng.random() < 0.3 else rng.choice(COMMON_WORDS)
+            for _ in range(rng.randint(80, 160))
+        )
+        yield {
+            'coreId': i,
+            'title': title,
+            'abstract': abstract,
+            'keywords': [rng.choice(TOPIC_WORDS) for _ in range(3)],
+            'fetchedAt': start + timedelta(seconds=i),
+        }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--papers', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for paper in synthetic_papers(args.papers, args.seed):
+        index.add(paper)
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(args.seed + 1)
+    queries = [' '.join(rng.sample(TOPIC_WORDS, rng.randint(1, 3))) for _ in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search.snapshot')
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        start = time.perf_counter()
+        restored = SearchIndex.load(path)
+        load_time = time.perf_counter() - start
+
+    print(f"papers indexed:   {len(index)} in {build_time:.2f} s ({len(index) / build_time:,.0f} papers/s)")
+    print(f"terms:            {len(index.postings)}")
+    print(f"query latency:    p50 {statistics.median(latencies):.2f} ms, "
+          f"p99 {percentile(latencies, 99):.2f} ms over {len(queries)} queries")
+    print(f"snapshot:         {size_mb:.1f} MB, save {save_time:.2f} s, load {load_time:.2f} s "
+          f"({len(restored)} papers)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Local stand-in for the CORE v3 search API, serving synthetic or recorded pages.
+
+Usage:
+  python benchmarks/core_stub.py [--port 8765] [--latency-ms 50] [--fixture pages.jsonl]
+  python benchmarks/core_stub.py --record pages.jsonl --pages 5   (needs CORE_API_KEY)
+
+A fixture is JSON lines, one CORE search response per line, replayed by offset.
+Without one, pages are generated deterministically from --seed. A query with
+title:"..." / abstract:"..." phrases (the per-domain ingestion queries) gets its
+own id range of works that mention those phrases, as CORE's search would.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_domains import FILLER, load_domain_keywords  # noqa: E402
+
+NON_ENGLISH_ABSTRACTS = [
+    "Diese Arbeit untersucht die Auswirkungen von Bodenerosion auf landwirtschaftliche Flächen "
+    "in mehreren Regionen und zeigt, dass die Ergebnisse von der Methode abhängen.",
+    "Este trabajo analiza el efecto de la erosión del suelo en las zonas agrícolas de varias "
+    "regiones y muestra que los resultados dependen del método utilizado.",
+    "Ce travail étudie les effets de l'érosion des sols sur les terres agricoles de plusieurs "
+    "régions et montre que les résultats dépendent de la méthode utilisée.",
+]
+
+PHRASE_RE = re.compile(r'(?:title|abstract):"([^"]+)"')
+
+
+def synthetic_work(rng, core_id, vocabulary, on_topic=False):
+    """One CORE 'works' record: ~15% on-topic (all if on_topic), ~10% non-English, some short or without abstract"""
+    roll = rng.random()
+    words = [rng.choice(FILLER) for _ in range(rng.randint(80, 160))]
+    if roll < 0.15 or on_topic:
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(vocabulary))
+    abstract = ' '.join(words)
+    if 0.15 <= roll < 0.25:
+        abstract = rng.choice(NON_ENGLISH_ABSTRACTS)
+    elif 0.25 <= roll < 0.28:
+        abstract = None
+    work = {
+        'id': core_id,
+        'title': ' '.join(rng.choice(FILLER) for _ in range(rng.randint(6, 12))),
+        'abstract': abstract,
+        'authors': [{'name': f'Author {rng.randint(1, 5000)}'} for _ in range(rng.randint(1, 6))],
+        'publishedDate': f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00',
+        'updatedDate': f'2026-10-{rng.randint(1, 16):02d}T{rng.randint(0, 23):02d}:00:00',
+        'downloadUrl': f'https://core.ac.uk/download/{core_id}.pdf',
+        'sourceFulltextUrls': [],
+        'doi': f'10.5555/bench.{core_id}' if rng.random() < 0.5 else None,
+        'keywords': [rng.choice(FILLER) for _ in range(3)],
+    }
+    page_count = rng.choice((None, 8, 20, 35))
+    if page_count is not None:
+        work['pageCount'] = page_count
+    return work
+
+
+class CoreStub:
+    """Threaded HTTP server answering /search/works?q=&limit=&offset= like CORE v3"""
+
+    def __init__(self, total_hits=100_000, seed=42, latency=0.05, fixture=None, port=0):
+        self.total_hits = total_hits
+        self.seed = seed
+        self.latency = latency
+        self.fixture = fixture
+        self.requests = 0
+        self.id_offset = 0
+        # (status, headers, body) responses served, in order, before any page; for retry tests
+        self.faults = []
+        self._faults_lock = threading.Lock()
+        self._vocabulary = [kw for kws in load_domain_keywords().values() for kw in kws]
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                limit = int(params.get('limit', ['100'])[0])
+                offset = int(params.get('offset', ['0'])[0])
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._faults_lock:
+                    fault = stub.faults.pop(0) if stub.faults else None
+                if fault is not None:
+                    status, headers, body = fault
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                phrases = PHRASE_RE.findall(params.get('q', [''])[0])
+                body = json.dumps(stub.page(offset, limit, phrases)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}/v3/search/works'
+
+    def page(self, offset, limit, phrases=()):
+        if self.fixture is not None:
+            index = offset // max(1, limit)
+            if index < len(self.fixture):
+                return self.fixture[index]
+            return {'totalHits': len(self.fixture) * limit, 'results': []}
+        # id_offset lets a benchmark ask for fresh (not yet stored) works on every run
+        query_slot = zlib.crc32('|'.join(sorted(set(phrases))).encode()) % 97 + 1 if phrases else 0
+        rng = random.Random(self.seed * 1_000_003 + self.id_offset + query_slot * 100_003 + offset)
+        count = max(0, min(limit, self.total_hits - offset))
+        start_id = self.id_offset + query_slot * 1_000_000 + offset + 1
+        vocabulary = list(dict.fromkeys(phrases)) or self._vocabulary
+        results = [synthetic_work(rng, start_id + i, vocabulary, on_topic=bool(phrases)) for i in range(count)]
+        return {'totalHits': self.total_hits, 'limit': limit, 'offset': offset, 'results': results}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def load_fixture(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_fixture(path, pages, per_page, query):
+    """Save real CORE responses as a replayable fixture"""
+    from core_client import CoreClient
+    client = CoreClient(os.getenv('CORE_API_KEY'))
+    with open(path, 'w') as f:
+        for page in range(pages):
+            data = client.search(query, limit=per_page, offset=page * per_page)
+            if data is None:
+                break
+            f.write(json.dumps(data) + '\n')
+            print(f"recorded offset {page * per_page}: {len(data.get('results', []))} works")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--fixture')
+    parser.add_argument('--record')
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--query', default='yearPublished>=2026 AND _exists_:abstract')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.record, args.pages, args.per_page, args.query)
+        return
+
+    fixture = load_fixture(args.fixture) if args.fixture else None
+    stub = CoreStub(seed=args.seed, latency=args.latency_ms / 1000, fixture=fixture, port=args.port)
+    print(f"CORE stub listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
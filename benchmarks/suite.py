@@ -0,0 +1,477 @@
+"""Benchmark suite: ingestion throughput, hot-path micro-benchmarks and /api/* route latency.
+
+Usage: python benchmarks/suite.py [--sizes 1000,5000] [--requests 50] [--mongo-uri URI]
+                                  [--storage mongo|sqlite] [--fixture pages.jsonl]
+                                  [--stream-clients 8] [--stream-events 5]
+                                  [--output results.json] [--compare baseline.json]
+
+CORE is replaced by benchmarks/core_stub.py (synthetic pages, or a recorded
+fixture). MongoDB is mongomock unless --mongo-uri points at a local mongod, in
+which case the paper_swiper_bench database is dropped and used. --storage sqlite
+keeps the papers in a temporary SQLite file instead (see repositories/) and skips
+the ingestion runs, which need mongo storage. Results are
+written as JSON; --compare prints ratios against an earlier results file.
+
+Besides the GET routes, each corpus size times POST /api/swipes batches (and the
+listing they filter) and the delivery of published paper events to
+--stream-clients open /api/stream connections. mongomock has no change streams,
+so there the event hub polls every STREAM_POLL_SECONDS (50 ms here).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core_stub import CoreStub, load_fixture, synthetic_work  # noqa: E402
+from metrics import PIPELINE_METRICS_ID  # noqa: E402
+
+BENCH_DATABASE = 'paper_swiper_bench'
+SEARCH_QUERIES = ['neural network', 'cloud computing security', 'data mining', 'quantum', 'image processing']
+SWIPE_BATCH = 20
+BENCH_CLIENT_ID = 'benchmark-client'
+STREAM_EVENT_TIMEOUT_SECONDS = 10
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_summary(samples_ms):
+    return {
+        'requests': len(samples_ms),
+        'p50_ms': round(statistics.median(samples_ms), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+        'mean_ms': round(statistics.fmean(samples_ms), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_app(args, stub):
+    """Import app and scheduler against the stub CORE server and the benchmark database"""
+    os.environ.update({
+        'MONGODB_ATLAS_URI': args.mongo_uri or 'mongodb://localhost',
+        'MONGODB_DATABASE': BENCH_DATABASE,
+        'CORE_API_URL': stub.url,
+        'CORE_API_KEY': 'benchmark',
+        'CORE_MAX_PAGES': str(args.ingest_pages),
+        'CORE_DOMAIN_PAGES': str(args.ingest_pages),
+        'SEARCH_INDEX_PATH': os.path.join(tempfile.mkdtemp(), 'search_index.snapshot'),
+        'STORAGE_BACKEND': args.storage,
+        'SQLITE_PATH': os.path.join(tempfile.mkdtemp(), 'paper_swiper_bench.db'),
+        # Pick up data version bumps immediately so every size starts from fresh caches
+        'DATA_VERSION_CHECK_SECONDS': '0',
+        'STREAM_POLL_SECONDS': '0.05',
+    })
+    import pymongo
+    if args.mongo_uri:
+        pymongo.MongoClient(args.mongo_uri).drop_database(BENCH_DATABASE)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock is required without --mongo-uri (pip install mongomock)")
+        pymongo.MongoClient = mongomock.MongoClient
+
+    import app
+    import ingest
+    import scheduler  # noqa: F401  (the worker entry point must import cleanly too)
+    logging.getLogger().setLevel(logging.WARNING)
+    return app, ingest
+
+
+def timed_calls(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    seconds = time.perf_counter() - start
+    return {
+        'calls': len(items),
+        'seconds': round(seconds, 4),
+        'per_call_us': round(seconds / len(items) * 1e6, 2),
+        'per_sec': round(len(items) / seconds, 1),
+    }
+
+
+def run_micro(app, count, seed):
+    import ingest
+    from dedup import DuplicateDetector
+    from language import LanguageDetector
+
+    rng = random.Random(seed)
+    vocabulary = [kw for kws in app.DOMAIN_KEYWORDS.values() for kw in kws]
+    works = [synthetic_work(rng, i, vocabulary) for i in range(count)]
+    with_abstract = [work for work in works if work['abstract']]
+    language_sample = [work['abstract'] for work in with_abstract[:min(500, len(with_abstract))]]
+    stored_form = [{'title': w['title'], 'abstract': w['abstract'][:500], 'keywords': w['keywords']}
+                   for w in with_abstract]
+    batches = [stored_form[i:i + 100] for i in range(0, len(stored_form), 100)]
+
+    # A fresh in-process detector per measurement, so nothing is served from its cache
+    single = LanguageDetector(workers=1)
+    batched = LanguageDetector()
+    detector = DuplicateDetector(None)
+    results = {
+        'get_page_count': timed_calls(ingest.get_page_count, works),
+        'get_paper_domains': timed_calls(ingest.get_paper_domains, works),
+        'is_english_text': timed_calls(single.is_english, language_sample),
+        'is_english_many_per_100': timed_calls(
+            batched.is_english_many, [language_sample[i:i + 100] for i in range(0, len(language_sample), 100)]),
+        'vectorize_per_100': timed_calls(ingest.get_paper_vectorizer().transform, batches),
+        'dedup_annotate': timed_calls(lambda w: detector.annotate(dict(w)), stored_form),
+    }
+    batched.shutdown()
+    return results
+
+
+def run_ingest(app, ingest, stub, runs):
+    """Both ingestion paths end to end against the stub; each run sees unseen CORE ids"""
+    results = {}
+    jobs = (('hourly', ingest.fetch_and_store_papers, app.db), ('daily', ingest.fetch_recent_papers, app.db))
+    for label, job, db in jobs:
+        samples = []
+        for _ in range(runs):
+            # Past every per-query id range the stub hands out (see CoreStub.page)
+            stub.id_offset += 1_000_000_000
+            requests_before = stub.requests
+            start = time.perf_counter()
+            job()
+            seconds = time.perf_counter() - start
+            metrics_doc = db['ingest_meta'].find_one({'_id': PIPELINE_METRICS_ID}) or {}
+            last_run = metrics_doc.get('pipelines', {}).get(label, {}).get('lastRun', {})
+            fetched = last_run.get('stages', {}).get('fetch', {}).get('out', 0)
+            samples.append({
+                'seconds': round(seconds, 3),
+                'core_requests': stub.requests - requests_before,
+                'papers_fetched': fetched,
+                'papers_per_sec': round(fetched / seconds, 1) if seconds else None,
+                'stages': last_run.get('stages', {}),
+                'rejections': last_run.get('rejections', {}),
+            })
+        results[label] = {
+            'runs': samples,
+            'papers_per_sec_median': statistics.median(s['papers_per_sec'] or 0 for s in samples),
+        }
+    return results
+
+
+def seed_corpus(app, size, seed):
+    """Replace the stored papers with size synthetic documents (about a third fetched today)"""
+    import ingest
+    from indexes import ensure_indexes, paper_expiry
+    from search_index import SearchIndex
+    from stats import record_daily_counts
+    from vector_index import VectorIndex, store_vectors
+
+    db = app.db
+    repository = app.paper_repository
+    for name in ('papers', 'paper_vectors', 'daily_counts', 'update_stats'):
+        db[name].delete_many({})
+    if repository.name == 'sqlite':
+        repository.clear()
+    ensure_indexes(db)
+
+    rng = random.Random(seed)
+    vocabulary = [kw for kws in app.DOMAIN_KEYWORDS.values() for kw in kws]
+    today = datetime.now().date()
+    now = datetime.now()
+    docs = []
+    for i in range(size):
+        work = synthetic_work(rng, i + 1, vocabulary)
+        abstract = work['abstract'] or ' '.join(rng.choice(vocabulary) for _ in range(40))
+        # Every stored paper is on-topic, as ingestion would have guaranteed
+        abstract = f"{rng.choice(vocabulary)} {abstract}"
+        age_days = 0 if rng.random() < 0.33 else rng.randint(1, 29)
+        paper = {
+            'coreId': work['id'],
+            'title': work['title'],
+            'abstract': abstract[:500],
+            'authors': [author['name'] for author in work['authors']],
+            'publishedDate': work['publishedDate'],
+            'downloadUrl': work['downloadUrl'],
+            'sourceFulltextUrls': [],
+            'doi': work['doi'] or '',
+            'pageCount': work.get('pageCount'),
+            'keywords': work['keywords'],
+            'fetchedDate': (today - timedelta(days=age_days)).isoformat(),
+            'fetchedAt': now - timedelta(days=age_days, seconds=i),
+        }
+        paper['expiresAt'] = paper_expiry(paper['fetchedAt'])
+        paper['domains'] = ingest.get_paper_domains(paper)
+        docs.append(paper)
+
+    for start in range(0, size, 1000):
+        chunk = docs[start:start + 1000]
+        if repository.name == 'mongo':
+            db['papers'].insert_many([dict(doc) for doc in chunk])
+        else:
+            repository.upsert_papers([dict(doc) for doc in chunk])
+        store_vectors(db['paper_vectors'], [doc['coreId'] for doc in chunk],
+                      ingest.get_paper_vectorizer().transform(chunk), now, [doc['expiresAt'] for doc in chunk])
+    if repository.name == 'mongo':
+        # Seed today's materialized counts the way the first ingestion of the day does
+        record_daily_counts(db['daily_counts'], db['papers'], today.isoformat(), 1)
+    repository.bump_data_version()
+
+    app.search_index = SearchIndex()
+    app.vector_index = VectorIndex()
+    app.response_cache.invalidate()
+    return docs
+
+
+def route_urls(app, docs):
+    domain = next(iter(app.DOMAIN_KEYWORDS))
+    core_id = docs[len(docs) // 2]['coreId']
+    urls = [
+        ('/api/papers', '/api/papers'),
+        ('/api/papers?view=card', '/api/papers?view=card&limit=10'),
+        ('/api/papers/<domain>', f'/api/papers/{domain}'),
+        ('/api/papers/<domain>?view=card', f'/api/papers/{domain}?view=card'),
+        ('/api/domains', '/api/domains'),
+        ('/api/search', None),
+        ('/api/papers/<core_id>/similar', f'/api/papers/{core_id}/similar'),
+        ('/api/domain-stats', '/api/domain-stats'),
+        ('/api/stats', '/api/stats'),
+    ]
+    covered = {label.split('?')[0].replace('<core_id>', '<int:core_id>') for label, _ in urls}
+    # Timed by run_swipes and run_stream
+    covered.update(('/api/swipes', '/api/stream'))
+    missing = sorted(rule.rule for rule in app.app.url_map.iter_rules()
+                     if rule.rule.startswith('/api/') and rule.rule not in covered)
+    if missing:
+        print(f"warning: routes without a benchmark: {', '.join(missing)}", file=sys.stderr)
+    return urls
+
+
+def run_routes(app, sizes, requests, seed, stream_clients=8, stream_events=5):
+    client = app.app.test_client()
+    results = {}
+    for size in sizes:
+        start = time.perf_counter()
+        docs = seed_corpus(app, size, seed)
+        seed_seconds = time.perf_counter() - start
+
+        urls = route_urls(app, docs)
+        # First search / similar request builds the in-memory indexes
+        warmup = {}
+        for label, url in (('search_index_sync', f'/api/search?q={SEARCH_QUERIES[0]}'),
+                           ('vector_index_sync', dict(urls)['/api/papers/<core_id>/similar'])):
+            start = time.perf_counter()
+            client.get(url)
+            warmup[label + '_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+        routes = {}
+        for label, url in urls:
+            for mode in ('uncached', 'cached'):
+                samples, statuses = [], set()
+                for n in range(requests):
+                    target = url or f'/api/search?q={SEARCH_QUERIES[n % len(SEARCH_QUERIES)]}'
+                    if mode == 'uncached':
+                        app.response_cache.invalidate()
+                    start = time.perf_counter()
+                    response = client.get(target)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    statuses.add(response.status_code)
+                routes.setdefault(label, {})[mode] = {**latency_summary(samples), 'status': sorted(statuses)}
+        swipes = run_swipes(app, client, docs, requests)
+        stream = run_stream(app, docs, stream_clients, stream_events)
+        results[str(size)] = {'seed_seconds': round(seed_seconds, 2), **warmup, 'routes': routes,
+                              'swipes': swipes, 'stream': stream}
+        print(f"routes @ {size} papers: " + ', '.join(
+            f"{label} {data['uncached']['p50_ms']:.1f}ms" for label, data in routes.items()), file=sys.stderr)
+        print(f"swipes @ {size} papers: POST {swipes['post']['p50_ms']:.1f}ms, "
+              f"filtered listing {swipes['listing']['p50_ms']:.1f}ms; stream: "
+              f"{stream.get('p50_ms', float('nan')):.1f}ms p50 delivery to {stream['clients']} clients",
+              file=sys.stderr)
+    return results
+
+
+def run_swipes(app, client, docs, requests):
+    """POST /api/swipes batches of SWIPE_BATCH of today's papers, then time the listing they filter"""
+    from seen import CLIENT_COOKIE
+    client.set_cookie(CLIENT_COOKIE, BENCH_CLIENT_ID)
+    today = datetime.now().date().isoformat()
+    core_ids = [doc['coreId'] for doc in docs if doc['fetchedDate'] == today] or [doc['coreId'] for doc in docs]
+    post_samples, statuses = [], set()
+    for n in range(requests):
+        batch = [core_ids[(n * SWIPE_BATCH + i) % len(core_ids)] for i in range(SWIPE_BATCH)]
+        body = {'swipes': [{'coreId': core_id, 'direction': 'left' if i % 2 else 'right'}
+                           for i, core_id in enumerate(batch)]}
+        start = time.perf_counter()
+        response = client.post('/api/swipes', json=body)
+        post_samples.append((time.perf_counter() - start) * 1000)
+        statuses.add(response.status_code)
+
+    listing_samples = []
+    for _ in range(requests):
+        app.response_cache.invalidate()
+        start = time.perf_counter()
+        client.get('/api/papers?view=card')
+        listing_samples.append((time.perf_counter() - start) * 1000)
+    client.delete_cookie(CLIENT_COOKIE)
+    return {
+        'batch': SWIPE_BATCH,
+        'post': {**latency_summary(post_samples), 'status': sorted(statuses)},
+        'listing': latency_summary(listing_samples),
+    }
+
+
+def run_stream(app, docs, clients, events):
+    """Open clients /api/stream connections and time each published event's delivery to all of them"""
+    from events import PAPER_EVENTS_COLLECTION, SYNC_STREAM_MAX_CLIENTS, publish_paper_event
+    if clients > SYNC_STREAM_MAX_CLIENTS:
+        print(f"warning: --stream-clients capped at {SYNC_STREAM_MAX_CLIENTS} (SYNC_STREAM_MAX_CLIENTS)",
+              file=sys.stderr)
+        clients = SYNC_STREAM_MAX_CLIENTS
+    if clients <= 0 or events <= 0:
+        return {'clients': 0, 'events': 0}
+
+    received = queue.Queue()
+
+    def read():
+        # Opened, read and closed on one thread: stream_with_context pushes the request context on open
+        response = app.app.test_client().get('/api/stream', buffered=False)
+        seen = 0
+        try:
+            for chunk in response.response:
+                if b'event: papers' in (chunk if isinstance(chunk, bytes) else chunk.encode()):
+                    received.put(time.perf_counter())
+                    seen += 1
+                    if seen == events:
+                        break
+        finally:
+            response.close()
+
+    threads = []
+    for _ in range(clients):
+        threads.append(threading.Thread(target=read, daemon=True))
+        threads[-1].start()
+    deadline = time.monotonic() + STREAM_EVENT_TIMEOUT_SECONDS
+    while app.paper_events.subscriber_count < clients and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    domain = next(iter(app.DOMAIN_KEYWORDS))
+    today = datetime.now().date().isoformat()
+    samples, missed = [], 0
+    for n in range(events):
+        core_ids = [doc['coreId'] for doc in docs[n * 5:(n + 1) * 5]]
+        published = time.perf_counter()
+        publish_paper_event(app.db[PAPER_EVENTS_COLLECTION], 'ingested', {domain: core_ids}, today)
+        for _ in range(clients):
+            try:
+                samples.append((received.get(timeout=STREAM_EVENT_TIMEOUT_SECONDS) - published) * 1000)
+            except queue.Empty:
+                missed += 1
+    for thread in threads:
+        thread.join(timeout=STREAM_EVENT_TIMEOUT_SECONDS)
+    summary = {'clients': clients, 'events': events, 'missed': missed}
+    if samples:
+        summary.update(latency_summary(samples))
+    return summary
+
+
+def compare(results, baseline_path):
+    """Print current/baseline ratios for the headline numbers (>1 means slower or lower)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    lines = []
+    for name, data in results['micro'].items():
+        old = baseline.get('micro', {}).get(name)
+        if old:
+            lines.append(f"micro {name}: {data['per_call_us'] / old['per_call_us']:.2f}x time per call")
+    for label, data in results.get('ingest', {}).items():
+        old = baseline.get('ingest', {}).get(label)
+        if old and old['papers_per_sec_median']:
+            lines.append(f"ingest {label}: {data['papers_per_sec_median'] / old['papers_per_sec_median']:.2f}x papers/s")
+    for size, data in results['routes'].items():
+        old_routes = baseline.get('routes', {}).get(size, {}).get('routes', {})
+        for label, modes in data['routes'].items():
+            old = old_routes.get(label, {}).get('uncached')
+            if old:
+                lines.append(f"route {label} @ {size}: {modes['uncached']['p50_ms'] / old['p50_ms']:.2f}x p50, "
+                             f"{modes['uncached']['p99_ms'] / old['p99_ms']:.2f}x p99")
+    print('\n'.join(lines), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,5000', help='comma-separated corpus sizes for route latency')
+    parser.add_argument('--requests', type=int, default=50, help='requests per route and cache mode')
+    parser.add_argument('--micro-papers', type=int, default=5000)
+    parser.add_argument('--ingest-runs', type=int, default=3)
+    parser.add_argument('--ingest-pages', type=int, default=10)
+    parser.add_argument('--core-latency-ms', type=float, default=50)
+    parser.add_argument('--fixture', help='recorded CORE responses (JSON lines) to replay; ids repeat, '
+                        'so ingest runs after the first measure the known-paper path')
+    parser.add_argument('--mongo-uri', help='local mongod to use instead of mongomock')
+    parser.add_argument('--storage', choices=('mongo', 'sqlite'), default='mongo',
+                        help='paper storage backend (STORAGE_BACKEND)')
+    parser.add_argument('--stream-clients', type=int, default=8, help='open /api/stream connections per size')
+    parser.add_argument('--stream-events', type=int, default=5, help='paper events published to them')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else None
+    stub = CoreStub(seed=args.seed, latency=args.core_latency_ms / 1000, fixture=fixture).start()
+    try:
+        app, ingest = load_app(args, stub)
+        results = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'backend': 'mongod' if args.mongo_uri else 'mongomock',
+                'storage': args.storage,
+                'core': 'fixture' if fixture else 'synthetic',
+                'args': vars(args),
+            },
+        }
+        results['micro'] = run_micro(app, args.micro_papers, args.seed)
+        print("micro: " + ', '.join(f"{k} {v['per_call_us']:.1f}us" for k, v in results['micro'].items()),
+              file=sys.stderr)
+        # The ingestion worker only runs on mongo storage (see repositories/__init__.py)
+        if args.storage == 'mongo':
+            results['ingest'] = run_ingest(app, ingest, stub, args.ingest_runs)
+            print("ingest: " + ', '.join(f"{k} {v['papers_per_sec_median']:.0f} papers/s"
+                                         for k, v in results['ingest'].items()), file=sys.stderr)
+        results['routes'] = run_routes(app, [int(s) for s in args.sizes.split(',')], args.requests, args.seed,
+                                       args.stream_clients, args.stream_events)
+    finally:
+        stub.stop()
+
+    payload = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    if args.compare:
+        compare(results, args.compare)
+    ingest.language_detector.shutdown()
+
+
+if __name__ == '__main__':
+    main()
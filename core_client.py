@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CORE_API_URL = "https://api.core.ac.uk/v3/search/works"
+CORE_FETCH_WORKERS = int(os.getenv('CORE_FETCH_WORKERS', '4'))
+CORE_MAX_RETRIES = int(os.getenv('CORE_MAX_RETRIES', '5'))
+CORE_BACKOFF_SECONDS = float(os.getenv('CORE_BACKOFF_SECONDS', '1.0'))
+CORE_MAX_BACKOFF_SECONDS = 60.0
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(headers):
+    """Return seconds to wait from Retry-After / X-RateLimit-Retry-After headers, or None"""
+    for name in ('Retry-After', 'X-RateLimit-Retry-After', 'X-RateLimitRetry-After'):
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            # HTTP-date (Retry-After) or ISO timestamp (CORE rate limit header)
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class CoreClient:
+    """Pooled, rate-limit aware client for the CORE v3 search API.
+
+    A single requests.Session is shared by all worker threads; its connection pool
+    is sized to the worker count so concurrent pages reuse keep-alive connections.
+    """
+
+    def __init__(self, api_key, base_url=CORE_API_URL, max_workers=CORE_FETCH_WORKERS,
+                 max_retries=CORE_MAX_RETRIES, backoff=CORE_BACKOFF_SECONDS,
+                 timeout=30, session=None):
+        self.base_url = base_url
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+        # Shared "do not send before" time, pushed forward when CORE tells us to slow down
+        self._throttle_lock = threading.Lock()
+        self._not_before = 0.0
+
+    def _throttle(self, delay):
+        with self._throttle_lock:
+            self._not_before = max(self._not_before, time.monotonic() + delay)
+
+    def _wait_for_slot(self):
+        with self._throttle_lock:
+            delay = self._not_before - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def search(self, query, limit=100, offset=0):
+        """Fetch one page of search results; returns the decoded JSON or None on failure"""
+        params = {'q': query, 'limit': limit, 'offset': offset}
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_slot()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                status, retry_after = f"{type(e).__name__}", None
+            else:
+                if response.status_code == 200:
+                    if response.headers.get('X-RateLimit-Remaining') == '0':
+                        wait_for = parse_retry_after(response.headers)
+                        if wait_for:
+                            self._throttle(wait_for)
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        # A truncated or non-JSON body is retried like a 5xx
+                        logger.warning(f"CORE API returned an unreadable page at offset {offset}: {e}")
+                        status, retry_after = 'invalid JSON', None
+                elif response.status_code not in RETRY_STATUS_CODES:
+                    logger.error(f"CORE API Error at offset {offset}: "
+                                 f"{response.status_code} - {response.text[:200]}")
+                    return None
+                else:
+                    status, retry_after = response.status_code, parse_retry_after(response.headers)
+
+            if attempt == self.max_retries:
+                break
+            delay = min(CORE_MAX_BACKOFF_SECONDS, self.backoff * (2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if status == 429:
+                self._throttle(delay)
+            logger.warning(f"CORE API {status} at offset {offset}, retrying in {delay:.1f}s "
+                           f"(attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+        logger.error(f"CORE API gave up at offset {offset} after {self.max_retries} retries")
+        return None
+
+    def iter_pages(self, query, per_page=100, max_pages=3, start_offset=0):
+        """Yield (offset, results) for up to max_pages pages as each one arrives.
+
+        results is None for a page that failed after all retries. At most max_workers
+        requests are in flight, and no further offsets are requested once a page comes
+        back short or past the reported totalHits.
+        """
+        pages = self.iter_queries({None: (query, max_pages)}, per_page=per_page, start_offset=start_offset)
+        try:
+            for _, offset, results in pages:
+                yield offset, results
+        finally:
+            pages.close()
+
+    def iter_queries(self, queries, per_page=100, start_offset=0, start_offsets=None):
+        """Yield (key, offset, results) for several queries at once, as pages arrive.
+
+        queries maps a key to (query, max_pages), in priority order; start_offsets
+        optionally maps a key to the offset its query resumes from. The queries
+        share the max_workers request slots: freed slots go to the queries round
+        robin, so every query keeps making progress and a large one cannot starve
+        the rest. Each query stops on its own short page or totalHits, as in iter_pages.
+        """
+        class Cursor:
+            def __init__(self, key, query, max_pages):
+                self.key = key
+                self.query = query
+                start = (start_offsets or {}).get(key, start_offset)
+                self.offsets = iter(range(start, start + per_page * max_pages, per_page))
+                self.total_hits = None
+                self.exhausted = False
+
+            def next_offset(self):
+                offset = None if self.exhausted else next(self.offsets, None)
+                if offset is None or (self.total_hits is not None and offset >= self.total_hits):
+                    self.exhausted = True
+                    return None
+                return offset
+
+        cursors = [Cursor(key, query, max_pages) for key, (query, max_pages) in queries.items()]
+        turn = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='core-fetch')
+        in_flight = {}
+        try:
+            def submit_next():
+                nonlocal turn
+                for _ in range(len(cursors)):
+                    cursor = cursors[turn % len(cursors)]
+                    turn += 1
+                    offset = cursor.next_offset()
+                    if offset is not None:
+                        in_flight[executor.submit(self.search, cursor.query, per_page, offset)] = (cursor, offset)
+                        return True
+                return False
+
+            for _ in range(self.max_workers):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cursor, offset = in_flight.pop(future)
+                    data = future.result()
+                    if data is None:
+                        results = None
+                    else:
+                        results = data.get('results', [])
+                        if data.get('totalHits') is not None:
+                            cursor.total_hits = data['totalHits']
+                        if len(results) < per_page:
+                            cursor.exhausted = True
+                    yield cursor.key, offset, results
+                    submit_next()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,130 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import pymongo
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MONGODB_ATLAS_URI = os.getenv('MONGODB_ATLAS_URI')
+MONGODB_DATABASE = os.getenv('MONGODB_DATABASE', 'research_papers')
+# Bound how long an operation waits for a reachable server (the driver default is 30s)
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGODB_CONNECT_RETRIES = int(os.getenv('MONGODB_CONNECT_RETRIES', '8'))
+MONGODB_RETRY_BACKOFF_SECONDS = float(os.getenv('MONGODB_RETRY_BACKOFF_SECONDS', '0.5'))
+MONGODB_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv('MONGODB_RETRY_MAX_BACKOFF_SECONDS', '30'))
+READINESS_TIMEOUT_SECONDS = float(os.getenv('READINESS_TIMEOUT_SECONDS', '2'))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide MongoClient, created on first use.
+
+    Creating the client does no network I/O; the driver connects in the
+    background and on the first operation, so importing app.py or scheduler.py
+    never waits on MongoDB.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    MONGODB_ATLAS_URI,
+                    serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS
+                )
+    return _client
+
+
+def get_database():
+    return get_client()[MONGODB_DATABASE]
+
+
+class LazyCollection:
+    """Collection handle that resolves against the shared client on first use"""
+
+    def __init__(self, name):
+        self.name = name
+        self._collection = None
+
+    def _resolve(self):
+        if self._collection is None:
+            self._collection = get_database()[self.name]
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self):
+        return f'LazyCollection({self.name!r})'
+
+
+class LazyDatabase:
+    """Database handle whose collections are LazyCollections, so module-level
+    handles like db['papers'] cost nothing until a query runs"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.setdefault(name, LazyCollection(name))
+        return collection
+
+    def __getattr__(self, attr):
+        return getattr(get_database(), attr)
+
+
+db = LazyDatabase()
+papers_collection = db['papers']
+
+
+def wait_for_database(retries=MONGODB_CONNECT_RETRIES, backoff=MONGODB_RETRY_BACKOFF_SECONDS):
+    """Ping MongoDB until it answers, backing off exponentially (with jitter) between tries.
+
+    Returns True once connected, False after the last retry failed.
+    """
+    delay = backoff
+    for attempt in range(1, retries + 1):
+        try:
+            get_client().admin.command('ping')
+            logger.info("✓ Connected to MongoDB")
+            return True
+        except PyMongoError as e:
+            if attempt == retries:
+                logger.error(f"✗ MongoDB unreachable after {retries} attempts: {e}")
+                return False
+            # Jitter keeps many workers booting at once from retrying in lockstep
+            sleep_for = delay * random.uniform(0.5, 1.5)
+            logger.warning(f"MongoDB not reachable (attempt {attempt}/{retries}): {e}; "
+                           f"retrying in {sleep_for:.1f}s")
+            time.sleep(sleep_for)
+            delay = min(delay * 2, MONGODB_RETRY_MAX_BACKOFF_SECONDS)
+    return False
+
+
+def warm_up():
+    """Open the connection pool in the background so the first request does not pay for it"""
+    threading.Thread(target=wait_for_database, name='mongodb-warmup', daemon=True).start()
+
+
+def check_database(timeout=READINESS_TIMEOUT_SECONDS):
+    """Ping once within timeout seconds; a status dict for readiness endpoints"""
+    started = time.perf_counter()
+    try:
+        with pymongo.timeout(timeout):
+            get_client().admin.command('ping')
+        return {'ok': True, 'latencyMs': round((time.perf_counter() - started) * 1000, 2)}
+    except PyMongoError as e:
+        return {'ok': False, 'latencyMs': round((time.perf_counter() - started) * 1000, 2), 'error': str(e)}
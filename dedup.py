@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+from bson.int64 import Int64
+
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity of title+abstract shingles above which two records are one work
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.8'))
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16   # 16 bands of 4 rows: pairs above ~0.5 Jaccard share a band with high probability
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 3
+MINHASH_SEED = 7
+
+# Universal hashes (a * x + b) mod p; 31-bit shingle hashes keep a * x + b inside uint64
+_PRIME = 4294967291  # largest prime below 2^32
+_rng = np.random.default_rng(MINHASH_SEED)
+_PERM_A = _rng.integers(1, _PRIME, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+_DOI_PREFIX_RE = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:)', re.IGNORECASE)
+
+
+def normalize_doi(doi):
+    """Lower-case a DOI and strip resolver prefixes; DOIs are case-insensitive"""
+    if not doi or not isinstance(doi, str):
+        return ''
+    return _DOI_PREFIX_RE.sub('', doi.strip()).lower()
+
+
+def shingles(title, abstract):
+    """Word 3-gram shingles of the normalized title and abstract"""
+    words = _NON_WORD_RE.sub(' ', f"{title or ''} {abstract or ''}".lower()).split()
+    if len(words) < SHINGLE_WORDS:
+        return set(words)
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(shingle_set):
+    """NUM_PERMUTATIONS min-hashes (uint32) of a shingle set, or None if it is empty"""
+    if not shingle_set:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode()) >> 1 for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    permuted = (_PERM_A * hashes + _PERM_B) % np.uint64(_PRIME)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature):
+    """One signed 64-bit key per LSH band, suitable for a multikey index"""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + rows, digest_size=8).digest()
+        keys.append(Int64(int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+def estimated_jaccard(a, b):
+    return float(np.mean(a == b))
+
+
+class DuplicateDetector:
+    """Spot CORE records that are another id for a work we already store.
+
+    Each paper document carries its MinHash signature and LSH band keys. Candidate
+    duplicates are the stored papers sharing any band key (one indexed $in query
+    per batch through the paper repository, so the cost grows with matches rather
+    than corpus size) or the same DOI; a candidate counts once its estimated Jaccard clears
+    DUPLICATE_THRESHOLD. Duplicates are not stored again; their ids are recorded
+    in the canonical paper's aliasIds so later fetches skip them up front.
+    """
+
+    def __init__(self, repository, threshold=DUPLICATE_THRESHOLD):
+        self.repository = repository
+        self.threshold = threshold
+        # Papers accepted earlier in this run, which are not yet visible in storage
+        self._run_bands = {}
+        self._run_dois = {}
+        self._run_signatures = {}
+        self._aliases = []
+        self.duplicate_count = 0
+
+    def annotate(self, paper_doc):
+        """Add normalized doi, minhash and lshBands fields to a paper document"""
+        paper_doc['doi'] = normalize_doi(paper_doc.get('doi'))
+        signature = minhash_signature(shingles(paper_doc.get('title'), paper_doc.get('abstract')))
+        if signature is not None:
+            paper_doc['minhash'] = signature.tobytes()
+            paper_doc['lshBands'] = band_keys(signature)
+        return paper_doc
+
+    def _stored_candidates(self, paper_docs):
+        keys = {key for doc in paper_docs for key in doc.get('lshBands', [])}
+        dois = {doc['doi'] for doc in paper_docs if doc.get('doi')}
+        if not keys and not dois:
+            return []
+        return self.repository.duplicate_candidates(keys, dois)
+
+    def _match(self, doc, signature, by_band, by_doi, signatures):
+        if doc.get('doi') and doc['doi'] in by_doi:
+            return by_doi[doc['doi']]
+        if signature is None:
+            return None
+        for key in doc.get('lshBands', []):
+            for core_id in by_band.get(key, ()):
+                other = signatures.get(core_id)
+                if other is not None and estimated_jaccard(signature, other) >= self.threshold:
+                    return core_id
+        return None
+
+    def find_duplicates(self, paper_docs):
+        """Return, per annotated document, the coreId it duplicates or None.
+
+        Non-duplicates are remembered so later documents in the same run match them.
+        """
+        by_band, by_doi, signatures = {}, {}, {}
+        for stored in self._stored_candidates(paper_docs):
+            core_id = stored.get('coreId')
+            if stored.get('doi'):
+                by_doi.setdefault(stored['doi'], core_id)
+            if stored.get('minhash'):
+                signatures[core_id] = np.frombuffer(stored['minhash'], dtype=np.uint32)
+            for key in stored.get('lshBands') or []:
+                by_band.setdefault(key, []).append(core_id)
+
+        results = []
+        for doc in paper_docs:
+            core_id = doc.get('coreId')
+            signature = np.frombuffer(doc['minhash'], dtype=np.uint32) if doc.get('minhash') else None
+            canonical = self._match(doc, signature, by_band, by_doi, signatures)
+            if canonical is None:
+                canonical = self._match(doc, signature, self._run_bands, self._run_dois, self._run_signatures)
+            if canonical is not None and canonical != core_id:
+                self.duplicate_count += 1
+                self._aliases.append((canonical, core_id))
+                results.append(canonical)
+                continue
+            results.append(None)
+            if doc.get('doi'):
+                self._run_dois.setdefault(doc['doi'], core_id)
+            if signature is not None:
+                self._run_signatures[core_id] = signature
+                for key in doc.get('lshBands', []):
+                    self._run_bands.setdefault(key, []).append(core_id)
+        return results
+
+    def flush_aliases(self):
+        """Record duplicate ids on their canonical papers in one write"""
+        if not self._aliases:
+            return
+        try:
+            self.repository.add_aliases(self._aliases)
+        except Exception as e:
+            logger.warning(f"Could not record duplicate paper ids: {e}")
+        self._aliases = []
@@ -0,0 +1,72 @@
+import re
+
+
+def _trie_pattern(words):
+    """Build a regex alternation that shares common prefixes between words.
+
+    re tries alternatives one by one, so "data mining|data science|..." re-reads the
+    same prefix for each keyword; factoring prefixes into a trie keeps the cost per
+    text position close to a single keyword comparison.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ending here makes the rest optional; greedy matching prefers the longer word
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class DomainMatcher:
+    """Match paper text against per-domain keyword lists in a single regex pass.
+
+    All keywords are compiled into one prefix-sharing alternation anchored at word
+    boundaries, so "API" no longer matches inside "rapid" or "capital". A trailing
+    plural ("networks", "APIs") still matches. The pattern sits inside a lookahead so
+    every word start is tried, which lets overlapping phrases such as "big data" and
+    "data science" both match "big data science".
+    """
+
+    def __init__(self, domain_keywords):
+        self.domains = list(domain_keywords.keys())
+        keyword_domains = {}
+        for domain, keywords in domain_keywords.items():
+            for keyword in keywords:
+                keyword_domains.setdefault(keyword.lower(), set()).add(domain)
+
+        # A keyword also carries the domains of any keyword it contains as whole words,
+        # since the regex reports only the longest keyword starting at each word.
+        ordered = sorted(keyword_domains, key=len, reverse=True)
+        self.keyword_domains = {}
+        for keyword in ordered:
+            domains = set(keyword_domains[keyword])
+            for other in ordered:
+                if other != keyword and re.search(rf'\b{re.escape(other)}\b', keyword):
+                    domains |= keyword_domains[other]
+            self.keyword_domains[keyword] = domains
+
+        self.pattern = re.compile(rf'\b(?=({_trie_pattern(ordered)})(?:e?s)?\b)')
+
+    def match_text(self, text):
+        """Return the set of domains whose keywords occur in text"""
+        found = set()
+        for keyword in set(self.pattern.findall(text.lower())):
+            found |= self.keyword_domains[keyword]
+        return found
+
+    def match_paper(self, paper):
+        """Return matching domains for a CORE paper, in DOMAIN_KEYWORDS order"""
+        title = paper.get('title') or ''
+        abstract = paper.get('abstract') or ''
+        keywords = paper.get('keywords') or []
+        found = self.match_text(f"{title} {abstract} {' '.join(keywords)}")
+        return [domain for domain in self.domains if domain in found]
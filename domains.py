@@ -0,0 +1,49 @@
+# Domain-specific keywords
+DOMAIN_KEYWORDS = {
+    'artificial_intelligence': [
+        "artificial intelligence", "machine learning", "deep learning", "neural network",
+        "natural language processing", "NLP", "LLM", "large language model",
+        "transformer", "BERT", "GPT", "chatbot"
+    ],
+    'computer_vision': [
+        "computer vision", "object detection", "semantic segmentation",
+        "image processing", "computer graphics", "augmented reality",
+        "virtual reality", "AR VR"
+    ],
+    'data_science': [
+        "data science", "big data", "data mining", "data analytics",
+        "recommendation system", "knowledge graph", "data visualization",
+        "statistical analysis"
+    ],
+    'cloud_computing': [
+        "cloud computing", "edge computing", "distributed systems",
+        "microservices", "DevOps", "API", "containerization",
+        "serverless"
+    ],
+    'cybersecurity': [
+        "cybersecurity", "network security", "information security",
+        "cryptography", "blockchain", "cryptocurrency", "security protocols",
+        "penetration testing"
+    ],
+    'software_engineering': [
+        "software engineering", "web development", "algorithm",
+        "software architecture", "design patterns", "API design",
+        "testing", "continuous integration"
+    ],
+    'high_performance_computing': [
+        "parallel computing", "GPU computing", "quantum computing",
+        "high performance computing", "distributed computing",
+        "supercomputing", "CUDA", "optimization"
+    ]
+}
+
+# Display names for /api/domains
+DOMAIN_NAMES = {
+    'artificial_intelligence': 'Artificial Intelligence',
+    'computer_vision': 'Computer Vision',
+    'data_science': 'Data Science',
+    'cloud_computing': 'Cloud Computing',
+    'cybersecurity': 'Cybersecurity',
+    'software_engineering': 'Software Engineering',
+    'high_performance_computing': 'High Performance Computing'
+}
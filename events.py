@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from pagination import build_projection, serialize_dates, to_card
+
+logger = logging.getLogger(__name__)
+
+PAPER_EVENTS_COLLECTION = 'paper_events'
+# Fallback polling interval when the deployment has no change streams (standalone mongod)
+STREAM_POLL_SECONDS = float(os.getenv('STREAM_POLL_SECONDS', '2'))
+# Change stream failures retried with exponential backoff before the hub settles on polling,
+# and how often a polling hub tries the change stream again after that
+STREAM_WATCH_RETRIES = int(os.getenv('STREAM_WATCH_RETRIES', '5'))
+STREAM_WATCH_RETRY_SECONDS = float(os.getenv('STREAM_WATCH_RETRY_SECONDS', '300'))
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+# Events buffered per client; a client that falls further behind is told to reload
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '32'))
+# Open streams per web process
+STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', '100'))
+# The sync server holds one of a worker's GUNICORN_THREADS (gunicorn.conf.py) per open
+# stream, so it caps streams below the thread count and keeps the reserve for other routes
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '32'))
+STREAM_THREAD_RESERVE = int(os.getenv('STREAM_THREAD_RESERVE', str(GUNICORN_THREADS // 2)))
+SYNC_STREAM_MAX_CLIENTS = max(0, min(STREAM_MAX_CLIENTS, GUNICORN_THREADS - STREAM_THREAD_RESERVE))
+STREAM_REPLAY_LIMIT = 50
+EVENT_RETENTION_HOURS = 24
+
+
+def publish_paper_event(collection, kind, core_ids_by_domain, date_str):
+    """Record that ingestion committed (kind='ingested') or promoted papers for date_str.
+
+    core_ids_by_domain maps each domain to the coreIds it gained. Web processes
+    pick the document up from the paper_events collection and push it to clients.
+    """
+    domains = {domain: list(ids) for domain, ids in core_ids_by_domain.items() if ids}
+    if not domains:
+        return
+    try:
+        collection.insert_one({'kind': kind, 'date': date_str, 'domains': domains, 'createdAt': datetime.now()})
+    except Exception as e:
+        logger.warning(f"Could not publish {kind} paper event: {e}")
+
+
+def format_sse(event, event_type='papers'):
+    """One server-sent event frame"""
+    lines = []
+    if event.get('id'):
+        lines.append(f"id: {event['id']}")
+    lines.append(f'event: {event_type}')
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'), default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """A stream client's bounded inbox; overflow marks it for a reload instead of blocking the hub"""
+
+    def __init__(self, maxsize=STREAM_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class PaperEventHub:
+    """Fan paper events out to the stream clients connected to this process.
+
+    One background thread follows the paper_events collection with a change
+    stream, or by polling for newer _ids when change streams are unavailable,
+    and looks up the new papers' cards once per event for every client. A broken
+    stream is resumed from its last resume token; events seen both by a catch-up
+    poll and by the stream are dispatched once.
+    """
+
+    def __init__(self, events_collection, repository, poll_seconds=STREAM_POLL_SECONDS):
+        self.events_collection = events_collection
+        self.repository = repository
+        self.poll_seconds = poll_seconds
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = None
+        self._resume_token = None
+        self._watch_failures = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._last_id = self._newest_id()
+                self._thread = threading.Thread(target=self._run, name='paper-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def replay(self, last_event_id):
+        """Events after last_event_id (a reconnecting client's Last-Event-ID)"""
+        try:
+            after = ObjectId(last_event_id)
+        except (InvalidId, TypeError):
+            return []
+        docs = self.events_collection.find({'_id': {'$gt': after}}).sort('_id', 1).limit(STREAM_REPLAY_LIMIT)
+        return [self._enrich(doc) for doc in docs]
+
+    def _newest_id(self):
+        try:
+            newest = self.events_collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+            return newest['_id'] if newest else None
+        except Exception as e:
+            logger.warning(f"Could not read paper events: {e}")
+            return None
+
+    def _enrich(self, doc):
+        core_ids = sorted({core_id for ids in doc.get('domains', {}).values() for core_id in ids})
+        docs = self.repository.find_papers(core_ids, {'_id': 0, 'domains': 1, **build_projection(view='card')})
+        papers = []
+        for core_id in core_ids:
+            paper = docs.get(core_id)
+            if paper is None:
+                continue
+            card = to_card(paper)
+            card['domains'] = paper.get('domains', [])
+            papers.append(serialize_dates(card))
+        return {
+            'id': str(doc['_id']),
+            'kind': doc.get('kind'),
+            'date': doc.get('date'),
+            'domains': doc.get('domains', {}),
+            'papers': papers
+        }
+
+    def _dispatch(self, doc):
+        # Only the ingestion worker publishes, so its ObjectIds arrive in increasing order
+        if self._last_id is not None and doc['_id'] <= self._last_id:
+            return
+        self._last_id = doc['_id']
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        event = self._enrich(doc)
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def _poll_once(self):
+        query = {'_id': {'$gt': self._last_id}} if self._last_id is not None else {}
+        for doc in self.events_collection.find(query).sort('_id', 1):
+            self._dispatch(doc)
+
+    def _watch(self):
+        """Dispatch inserts from a change stream until it fails"""
+        options = {'resume_after': self._resume_token} if self._resume_token is not None else {}
+        with self.events_collection.watch([{'$match': {'operationType': 'insert'}}], **options) as stream:
+            self._watch_failures = 0
+            if self._resume_token is None:
+                # Anything inserted since _last_id, before the stream opened
+                self._poll_once()
+            for change in stream:
+                self._resume_token = change['_id']
+                self._dispatch(change['fullDocument'])
+
+    def _watch_retry_delay(self, error):
+        """Seconds until the change stream is tried again after error"""
+        self._watch_failures += 1
+        if isinstance(error, OperationFailure):
+            # An expired or unusable resume token; the next stream starts fresh after a catch-up poll
+            self._resume_token = None
+        if not isinstance(error, PyMongoError) or getattr(error, 'code', None) == CHANGE_STREAMS_UNSUPPORTED:
+            # Standalone mongod, or a driver without change streams: no point retrying soon
+            self._watch_failures = max(self._watch_failures, STREAM_WATCH_RETRIES + 1)
+        if self._watch_failures > STREAM_WATCH_RETRIES:
+            if self._watch_failures == STREAM_WATCH_RETRIES + 1:
+                logger.info(f"Paper event change stream unavailable ({error}); polling every "
+                            f"{self.poll_seconds}s and retrying the stream every {STREAM_WATCH_RETRY_SECONDS}s")
+            return STREAM_WATCH_RETRY_SECONDS
+        delay = min(STREAM_WATCH_RETRY_SECONDS, self.poll_seconds * 2 ** (self._watch_failures - 1))
+        logger.warning(f"Paper event change stream failed ({error}); polling, retrying it in {delay:.1f}s")
+        return delay
+
+    def _run(self):
+        next_watch = 0.0
+        while True:
+            if time.monotonic() >= next_watch:
+                try:
+                    self._watch()
+                except Exception as e:
+                    next_watch = time.monotonic() + self._watch_retry_delay(e)
+            # While the stream is down, polling keeps events flowing
+            try:
+                self._poll_once()
+            except Exception as e:
+                logger.warning(f"Could not poll paper events: {e}")
+            threading.Event().wait(self.poll_seconds)
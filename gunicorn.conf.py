@@ -0,0 +1,18 @@
+import os
+
+# SERVER_MODE picks the serving stack at startup:
+#   sync  - Flask app (app.py) on gunicorn's threaded/sync workers
+#   async - Starlette app (asgi.py) with the Motor driver on uvicorn workers
+SERVER_MODE = os.getenv('SERVER_MODE', 'sync')
+
+if SERVER_MODE == 'async':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+elif SERVER_MODE == 'sync':
+    wsgi_app = 'app:app'
+    # /api/stream holds a thread per open EventSource, so sync workers are threaded;
+    # events.py keeps STREAM_THREAD_RESERVE of these threads free of streams
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '32'))
+else:
+    raise RuntimeError(f"SERVER_MODE must be sync or async, not {SERVER_MODE!r}")
@@ -0,0 +1,217 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from events import EVENT_RETENTION_HOURS, PAPER_EVENTS_COLLECTION
+from seen import SEEN_COLLECTION, SWIPES_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Fetched papers expire this long after fetchedAt, through the expiresAt TTL indexes
+# (replaces the manual cleanup_old_papers sweep); see paper_expiry
+PAPER_RETENTION_DAYS = int(os.getenv('PAPER_RETENTION_DAYS', '30'))
+
+PAPER_INDEXES = [
+    ([('coreId', ASCENDING)], {'name': 'coreId_unique', 'unique': True}),
+    # /api/papers and /api/papers/<domain> ($or branch 1), domain counts
+    ([('fetchedDate', ASCENDING), ('domains', ASCENDING), ('publishedDate', DESCENDING)],
+     {'name': 'fetchedDate_domains_publishedDate'}),
+    # $or branch 2; domains cannot share a compound index with another array field
+    ([('promotedDates', ASCENDING), ('publishedDate', DESCENDING)],
+     {'name': 'promotedDates_publishedDate'}),
+    # promote_old_papers candidates: least recently promoted, then oldest, per domain
+    ([('domains', ASCENDING), ('lastPromotedDate', ASCENDING), ('fetchedAt', ASCENDING)],
+     {'name': 'domains_lastPromotedDate_fetchedAt'}),
+    # Search index sync ranges and manual sweeps
+    ([('fetchedAt', ASCENDING)], {'name': 'fetchedAt'}),
+    # Retention: a paper is removed at its expiresAt; papers with none (dump loads) are kept
+    ([('expiresAt', ASCENDING)], {'name': 'expiresAt_ttl', 'expireAfterSeconds': 0}),
+    # Near-duplicate detection: LSH band lookups, DOI matches and known duplicate ids
+    ([('lshBands', ASCENDING)], {'name': 'lshBands'}),
+    ([('doi', ASCENDING)], {'name': 'doi'}),
+    ([('aliasIds', ASCENDING)], {'name': 'aliasIds'}),
+]
+
+# Similar-paper vectors expire with the papers they were computed from
+PAPER_VECTOR_INDEXES = [
+    ([('fetchedAt', ASCENDING)], {'name': 'fetchedAt'}),
+    ([('expiresAt', ASCENDING)], {'name': 'expiresAt_ttl', 'expireAfterSeconds': 0}),
+]
+
+# Indexes replaced by the ones above; dropped before those are built
+OBSOLETE_INDEXES = {
+    'papers': ['fetchedAt_ttl'],
+    'paper_vectors': ['fetchedAt_ttl'],
+}
+
+# Stream events only matter to clients reconnecting shortly after them
+PAPER_EVENT_INDEXES = [
+    ([('createdAt', ASCENDING)],
+     {'name': 'createdAt_ttl', 'expireAfterSeconds': EVENT_RETENTION_HOURS * 3600}),
+]
+
+# A seen-set only has to outlive the papers it hides; the swipe log expires with them
+SEEN_INDEXES = [
+    ([('updatedAt', ASCENDING)],
+     {'name': 'updatedAt_ttl', 'expireAfterSeconds': PAPER_RETENTION_DAYS * 24 * 3600}),
+]
+
+SWIPE_INDEXES = [
+    ([('user', ASCENDING), ('swipedAt', DESCENDING)], {'name': 'user_swipedAt'}),
+    ([('swipedAt', ASCENDING)],
+     {'name': 'swipedAt_ttl', 'expireAfterSeconds': PAPER_RETENTION_DAYS * 24 * 3600}),
+]
+
+UPDATE_STATS_INDEXES = [
+    ([('timestamp', DESCENDING)], {'name': 'timestamp_desc'}),
+]
+
+
+def paper_expiry(fetched_at, retention_days=PAPER_RETENTION_DAYS):
+    """The expiresAt of a paper or vector fetched at fetched_at; None (kept until removed) if retention_days is 0"""
+    return fetched_at + timedelta(days=retention_days) if retention_days > 0 else None
+
+
+def backfill_expiry(collection):
+    """Give documents stored before expiresAt existed the expiry the old fetchedAt TTL implied"""
+    result = collection.update_many(
+        {'expiresAt': {'$exists': False}, 'fetchedAt': {'$type': 'date'}},
+        [{'$set': {'expiresAt': {'$add': ['$fetchedAt', PAPER_RETENTION_DAYS * 24 * 3600 * 1000]}}}]
+    )
+    if result.modified_count:
+        logger.info(f"Set expiresAt on {result.modified_count} documents in {collection.name}")
+    return result.modified_count
+
+
+def remove_duplicate_papers(collection):
+    """Collapse documents sharing a coreId so the unique index can be built.
+
+    Older promote_old_papers runs inserted full copies of a paper. The earliest
+    document is kept and each copy's fetchedDate is folded into its promotedDates.
+    """
+    removed = 0
+    duplicates = collection.aggregate([
+        {'$group': {'_id': '$coreId', 'ids': {'$push': '$_id'},
+                    'dates': {'$addToSet': '$fetchedDate'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    for group in duplicates:
+        keep, *extra = sorted(group['ids'])
+        kept = collection.find_one({'_id': keep}, {'fetchedDate': 1})
+        promoted = [d for d in group['dates'] if d and d != kept.get('fetchedDate')]
+        if promoted:
+            collection.update_one({'_id': keep}, {'$addToSet': {'promotedDates': {'$each': promoted}}})
+        removed += collection.delete_many({'_id': {'$in': extra}}).deleted_count
+    if removed:
+        logger.info(f"Removed {removed} duplicate paper documents")
+    return removed
+
+
+def _create_indexes(collection, specs):
+    for keys, options in specs:
+        try:
+            collection.create_index(keys, **options)
+        except OperationFailure as e:
+            if e.code in (85, 86):  # IndexOptionsConflict / IndexKeySpecsConflict
+                logger.warning(f"Replacing index {options['name']} on {collection.name}: {e}")
+                collection.drop_index(options['name'])
+                collection.create_index(keys, **options)
+            elif e.code == 11000 and options.get('unique'):
+                remove_duplicate_papers(collection)
+                collection.create_index(keys, **options)
+            else:
+                raise
+
+
+def _drop_obsolete_indexes(collection):
+    existing = collection.index_information()
+    for name in OBSOLETE_INDEXES.get(collection.name, []):
+        if name in existing:
+            collection.drop_index(name)
+            logger.info(f"Dropped obsolete index {name} on {collection.name}")
+
+
+def ensure_indexes(db):
+    """Idempotently create the indexes every route and ingestion query relies on"""
+    for name in ('papers', 'paper_vectors'):
+        _drop_obsolete_indexes(db[name])
+        backfill_expiry(db[name])
+    _create_indexes(db['papers'], PAPER_INDEXES)
+    _create_indexes(db['paper_vectors'], PAPER_VECTOR_INDEXES)
+    _create_indexes(db['update_stats'], UPDATE_STATS_INDEXES)
+    _create_indexes(db[PAPER_EVENTS_COLLECTION], PAPER_EVENT_INDEXES)
+    _create_indexes(db[SEEN_COLLECTION], SEEN_INDEXES)
+    _create_indexes(db[SWIPES_COLLECTION], SWIPE_INDEXES)
+    logger.info("✓ MongoDB indexes are in place")
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def route_queries(today_str=None):
+    """(label, collection, filter, sort) for the queries issued by the API and jobs"""
+    today_str = today_str or datetime.now().date().isoformat()
+    today_or_promoted = {'$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}]}
+    return [
+        ('/api/papers', 'papers', today_or_promoted, [('publishedDate', -1)]),
+        ('/api/papers/<domain>', 'papers',
+         {**today_or_promoted, 'domains': 'artificial_intelligence'}, [('publishedDate', -1)]),
+        ('/api/domain-stats counts', 'papers',
+         {'fetchedDate': today_str, 'domains': 'artificial_intelligence'}, None),
+        ('/api/stats papers_today', 'papers', {'fetchedDate': today_str}, None),
+        ('/api/domain-stats last update', 'update_stats', {}, [('timestamp', -1)]),
+        ('upsert by coreId', 'papers', {'coreId': 0}, None),
+        ('duplicate candidates', 'papers', {'lshBands': {'$in': [0]}}, None),
+        ('duplicate by doi', 'papers', {'doi': {'$in': ['10.0/x']}}, None),
+        ('promote_old_papers', 'papers',
+         {'domains': {'$in': ['artificial_intelligence']}, 'fetchedDate': {'$ne': today_str},
+          'promotedDates': {'$ne': today_str}}, [('lastPromotedDate', 1), ('fetchedAt', 1)]),
+    ]
+
+
+def check_query_plans(db):
+    """Run explain() on each route query and warn about collection scans.
+
+    Returns the labels of queries whose winning plan contains a COLLSCAN.
+    """
+    unindexed = []
+    for label, collection_name, query, sort in route_queries():
+        cursor = db[collection_name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        except Exception as e:
+            logger.warning(f"Could not explain query for {label}: {e}")
+            continue
+        stages = set(_plan_stages(plan))
+        if 'COLLSCAN' in stages:
+            unindexed.append(label)
+            logger.warning(f"✗ Query for {label} is a collection scan")
+        else:
+            logger.info(f"✓ Query for {label} uses an index ({', '.join(sorted(stages))})")
+    return unindexed
+
+
+if __name__ == '__main__':
+    from database import get_database, wait_for_database
+
+    logging.basicConfig(level=logging.INFO)
+    if not wait_for_database():
+        raise SystemExit(1)
+    database = get_database()
+    ensure_indexes(database)
+    missing = check_query_plans(database)
+    raise SystemExit(1 if missing else 0)
@@ -0,0 +1,9 @@
+# Paper ingestion shared by the hourly and daily jobs in scheduler.py:
+# papers.py builds documents from CORE works, storage.py writes them in bulk,
+# runner.py wires both into one staged pipeline, backfill.py reclassifies stored papers,
+# dump.py loads CORE dataset dumps through the same filters with a process pool.
+from .papers import MIN_PAGE_COUNT, build_paper_doc, get_page_count, recent_papers_query
+from .runner import (DAILY, HOURLY, IngestProfile, core_client, domain_matcher, fetch_and_store_papers,
+                     fetch_recent_papers, get_paper_domains, get_paper_vectorizer, language_detector,
+                     run_ingestion)
+from .storage import BulkPaperWriter, FetchCheckpoint, INGEST_BATCH_SIZE, filter_known_papers
@@ -0,0 +1,93 @@
+"""Recompute `domains` (and paper vectors) for papers already in MongoDB.
+
+Usage:
+  python -m ingest.backfill            papers stored without domains (older daily runs)
+  python -m ingest.backfill --all      every stored paper, e.g. after editing domains.py
+  python -m ingest.backfill --dry-run  count what would change without writing
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from database import db, papers_collection, wait_for_database
+from indexes import paper_expiry
+from response_cache import bump_data_version
+from stats import aggregate_daily_counts
+from vector_index import store_vectors
+
+from .runner import classify_papers, get_paper_vectorizer
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_FIELDS = {'_id': 1, 'coreId': 1, 'title': 1, 'abstract': 1, 'keywords': 1, 'domains': 1, 'fetchedAt': 1,
+                   'expiresAt': 1}
+
+
+def backfill_domains(recompute_all=False, batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """Classify stored papers in _id order, one bulk write per batch; returns (scanned, changed)"""
+    vectorizer = get_paper_vectorizer()
+    query = {} if recompute_all else {'domains': {'$exists': False}}
+    scanned = changed = 0
+    last_id = None
+    while True:
+        page_query = {**query, '_id': {'$gt': last_id}} if last_id is not None else query
+        papers = list(papers_collection.find(page_query, BACKFILL_FIELDS).sort('_id', 1).limit(batch_size))
+        if not papers:
+            break
+        last_id = papers[-1]['_id']
+        scanned += len(papers)
+
+        classified = classify_papers(papers, vectorizer)
+        updates = [
+            UpdateOne({'_id': paper['_id']}, {'$set': {'domains': domains}})
+            for paper, (domains, _) in zip(papers, classified)
+            if paper.get('domains') != domains
+        ]
+        changed += len(updates)
+        if dry_run:
+            continue
+        if updates:
+            papers_collection.bulk_write(updates, ordered=False)
+        # Papers stored by older daily runs have no vector either
+        with_vectors = [(paper, vector) for paper, (_, vector) in zip(papers, classified) if paper.get('fetchedAt')]
+        store_vectors(
+            db['paper_vectors'],
+            [paper['coreId'] for paper, _ in with_vectors],
+            [vector for _, vector in with_vectors],
+            [paper['fetchedAt'] for paper, _ in with_vectors],
+            [paper.get('expiresAt', paper_expiry(paper['fetchedAt'])) for paper, _ in with_vectors]
+        )
+        logger.info(f"Backfill: {scanned} papers scanned, {changed} reclassified")
+
+    if changed and not dry_run:
+        # Today's materialized per-domain counts were computed from the old domains
+        today_str = datetime.now().date().isoformat()
+        db['daily_counts'].update_one(
+            {'_id': today_str},
+            {'$set': {**aggregate_daily_counts(papers_collection, today_str), 'seededAt': datetime.now()}},
+            upsert=True
+        )
+        bump_data_version(db['ingest_meta'])
+    return scanned, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--all', action='store_true', help='reclassify every paper, not only those without domains')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not wait_for_database():
+        raise SystemExit(1)
+    scanned, changed = backfill_domains(args.all, args.batch_size, args.dry_run)
+    verb = 'would change' if args.dry_run else 'changed'
+    logger.info(f"Backfill done: {scanned} papers scanned, {changed} {verb}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Cards each domain should get per day; domains below it get the run's CORE pages first
+DOMAIN_DAILY_TARGET = int(os.getenv('DOMAIN_DAILY_TARGET', '20'))
+# CORE pages one targeted run may spend across all domain queries
+CORE_DOMAIN_PAGES = int(os.getenv('CORE_DOMAIN_PAGES', '14'))
+
+DOMAIN_YIELD_ID = 'domain_yield'
+# Weight of the latest run in the smoothed kept/fetched ratio
+YIELD_SMOOTHING = 0.3
+# Ratio assumed for a domain with no history, and the floor that keeps a dry domain in rotation
+DEFAULT_YIELD = 0.2
+MIN_YIELD = 0.02
+
+
+def domain_query(base_query, keywords):
+    """base_query restricted to works with any of keywords in the title or abstract"""
+    phrases = [f'"{keyword.replace(chr(34), "")}"' for keyword in keywords]
+    terms = ' OR '.join(f'{field}:{phrase}' for phrase in phrases for field in ('title', 'abstract'))
+    return f'{base_query} AND ({terms})'
+
+
+def allocate_pages(deficits, yields, budget, per_page):
+    """CORE pages per domain for one run, most under-filled domains first.
+
+    Every domain short of its daily target gets a page before any gets a second.
+    Each further page goes to the domain expected to keep the most of its missing
+    papers from it (its kept-per-fetched yield times the page size, capped by
+    what is still missing), so pages follow the queries that actually deliver.
+    When no domain is short, each gets one page so decks still see fresh cards.
+    """
+    short = sorted((domain for domain, deficit in deficits.items() if deficit > 0), key=lambda d: -deficits[d])
+    if not short:
+        return {domain: 1 for domain in list(deficits)[:budget]}
+    pages = {domain: 1 for domain in short[:budget]}
+
+    def gain(domain):
+        per_page_kept = max(MIN_YIELD, yields[domain]) * per_page
+        return min(per_page_kept, deficits[domain] - pages[domain] * per_page_kept)
+
+    for _ in range(budget - len(pages)):
+        domain = max(pages, key=gain)
+        if gain(domain) <= 0:
+            break
+        pages[domain] += 1
+    return pages
+
+
+class DomainYield:
+    """Kept-to-fetched ratio of each domain's CORE query, smoothed across runs.
+
+    Stored as one document in ingest_meta; fetched and kept counts of the
+    current run are folded in by save().
+    """
+
+    def __init__(self, collection, domains):
+        self.collection = collection
+        doc = collection.find_one({'_id': DOMAIN_YIELD_ID}) or {}
+        stored = doc.get('domains') or {}
+        self.ratios = {domain: (stored.get(domain) or {}).get('yield') for domain in domains}
+        self.fetched = {domain: 0 for domain in domains}
+        self.kept = {domain: 0 for domain in domains}
+
+    def expected(self, domain):
+        ratio = self.ratios.get(domain)
+        return DEFAULT_YIELD if ratio is None else ratio
+
+    def observe_fetched(self, domain, count=1):
+        self.fetched[domain] += count
+
+    def observe_kept(self, domain, count=1):
+        self.kept[domain] += count
+
+    def save(self):
+        """Fold this run into the stored ratios; returns this run's per-domain counts"""
+        summary = {}
+        updates = {}
+        for domain, fetched in self.fetched.items():
+            if not fetched:
+                continue
+            ratio = self.kept[domain] / fetched
+            previous = self.ratios.get(domain)
+            smoothed = ratio if previous is None else previous + YIELD_SMOOTHING * (ratio - previous)
+            self.ratios[domain] = smoothed
+            summary[domain] = {'fetched': fetched, 'kept': self.kept[domain], 'yield': round(ratio, 4)}
+            updates[f'domains.{domain}'] = {'yield': smoothed, 'fetched': fetched, 'kept': self.kept[domain]}
+        if updates:
+            try:
+                self.collection.update_one(
+                    {'_id': DOMAIN_YIELD_ID},
+                    {'$set': {**updates, 'updatedAt': datetime.now()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"Could not store domain query yields: {e}")
+        return summary
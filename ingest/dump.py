@@ -0,0 +1,328 @@
+"""Load papers from local CORE dataset dumps (gzipped JSON lines) in bulk.
+
+Usage:
+  python -m ingest.dump DUMP [DUMP ...]       files, or directories of *.jsonl.gz / *.json.gz
+  python -m ingest.dump DUMP --workers 8      processes to shard the dumps across
+  python -m ingest.dump DUMP --require-domain keep on-topic papers only, as the hourly fetch does
+  python -m ingest.dump DUMP --restart        ignore saved checkpoints
+
+Records go through the same known-id, abstract, page count, classification,
+language and duplicate filters as the scheduled fetches and are upserted in
+DUMP_BATCH_SIZE batches. Each shard saves its position in the uncompressed
+stream after every batch, so an interrupted load resumes where it stopped,
+also when it is restarted with a different number of workers.
+Loaded papers are dated the day before the run: they fill search, similar
+papers and promotion without flooding today's decks. They do not follow the
+fetched papers' PAPER_RETENTION_DAYS. With the default DUMP_RETENTION_DAYS=0
+they get no expiresAt, so the TTL indexes and the daily sweep keep them and
+their vectors until they are deleted; a positive DUMP_RETENTION_DAYS expires
+them that many days after the load date. That date is behind the watermarks
+of the web processes' search and vector indexes, so the load bumps the
+repository's resync counter and those indexes reload in full on their next
+refresh.
+"""
+import argparse
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from database import db, wait_for_database
+from dedup import DuplicateDetector
+from domains import DOMAIN_KEYWORDS
+from language import LanguageDetector
+from repositories import paper_repository
+from vector_index import PaperVectorizer, store_vectors
+
+from .papers import ABSTRACT_CHARS, MIN_PAGE_COUNT, build_paper_doc, get_page_count, work_from_dump
+from .runner import classify_papers, get_paper_vectorizer
+from .storage import BulkPaperWriter, filter_known_papers
+
+logger = logging.getLogger(__name__)
+
+DUMP_BATCH_SIZE = int(os.getenv('DUMP_BATCH_SIZE', '1000'))
+DUMP_WORKERS = int(os.getenv('DUMP_WORKERS', str(os.cpu_count() or 1)))
+DUMP_SUFFIXES = ('.jsonl.gz', '.json.gz', '.jsonl', '.json')
+DUMP_CHECKPOINTS_COLLECTION = 'ingest_checkpoints'
+# Days loaded papers are kept; 0 keeps them until removed (see the module docstring)
+DUMP_RETENTION_DAYS = int(os.getenv('DUMP_RETENTION_DAYS', '0'))
+
+
+def dump_files(paths):
+    """The dump files named by paths, expanding directories, largest first"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(DUMP_SUFFIXES)]
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.getsize, reverse=True)
+
+
+def open_dump(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def dump_checkpoint_key(path):
+    return f"dump:{os.path.basename(path)}:{os.path.getsize(path)}"
+
+
+class DumpCheckpoint:
+    """Saved position of one shard of a dump file: uncompressed byte offset and line number.
+
+    One document per file, keyed on the file name and size (a replaced dump starts
+    over), holds the shard layout and every shard's position. prepare() sets the
+    layout before the shards start.
+    """
+
+    def __init__(self, collection, path, shard):
+        self.collection = collection
+        self.key = dump_checkpoint_key(path)
+        self.shard = shard
+        doc = collection.find_one({'_id': self.key}, {f'shards.{shard}': 1}) or {}
+        position = (doc.get('shards') or {}).get(str(shard)) or {}
+        self.offset = position.get('offset', 0)
+        self.line = position.get('line', 0)
+        self.done = position.get('done', False)
+
+    @staticmethod
+    def prepare(collection, path, shard_count, restart=False):
+        """Store the shard layout of this load, re-splitting positions saved under another one.
+
+        With a different shard count, every new shard resumes from the lowest line
+        any old shard reached; papers already stored past it are skipped as known.
+        """
+        key = dump_checkpoint_key(path)
+        doc = None if restart else collection.find_one({'_id': key})
+        if doc is not None and doc.get('shardCount') == shard_count:
+            return
+        shards = {}
+        if doc is not None:
+            old_count = doc.get('shardCount') or 0
+            saved = doc.get('shards') or {}
+            positions = [saved.get(str(shard)) or {'offset': 0, 'line': 0, 'done': False} for shard in range(old_count)]
+            if positions:
+                start = min(positions, key=lambda position: position['line'])
+                shards = {str(shard): dict(start) for shard in range(shard_count)}
+                logger.info(f"{key}: shard layout changed from {old_count} to {shard_count}, "
+                            f"resuming every shard at line {start['line']}")
+        collection.replace_one(
+            {'_id': key},
+            {'_id': key, 'shardCount': shard_count, 'shards': shards, 'savedAt': datetime.now()},
+            upsert=True
+        )
+
+    def save(self, offset, line, done=False):
+        self.offset, self.line, self.done = offset, line, done
+        self.collection.update_one(
+            {'_id': self.key},
+            {'$set': {f'shards.{self.shard}': {'offset': offset, 'line': line, 'done': done},
+                      'savedAt': datetime.now()}},
+            upsert=True
+        )
+
+
+class DumpLoader:
+    """Filter, classify and store batches of dump records for one worker process"""
+
+    def __init__(self, fetched_at, require_domain=False, batch_size=DUMP_BATCH_SIZE):
+        self.fetched_at = fetched_at
+        self.require_domain = require_domain
+        self.vectorizer = get_paper_vectorizer()
+        self.writer = BulkPaperWriter(paper_repository, batch_size=batch_size, domains=DOMAIN_KEYWORDS.keys())
+        self.duplicates = DuplicateDetector(paper_repository)
+        # In-process detection: the dump's own process pool is the only parallelism
+        self.language_detector = LanguageDetector(workers=1)
+        # Document frequencies of the stored papers, merged into the shared model by the parent
+        self.observed = PaperVectorizer(DOMAIN_KEYWORDS.keys())
+        self.rejections = Counter()
+        self.records = 0
+
+    def load(self, works):
+        """Run one batch of works through the ingestion filters and store it; returns papers stored"""
+        self.records += len(works)
+        with_ids = [work for work in works if work.get('id') is not None]
+        self.rejections['no_id'] += len(works) - len(with_ids)
+        works = with_ids
+        new_works = filter_known_papers(paper_repository, works)
+        self.rejections['known'] += len(works) - len(new_works)
+
+        prefiltered = []
+        for work in new_works:
+            if not work.get('abstract'):
+                self.rejections['no_abstract'] += 1
+                continue
+            page_count = get_page_count(work)
+            if 0 < page_count < MIN_PAGE_COUNT:
+                self.rejections['short'] += 1
+                continue
+            prefiltered.append((work, page_count))
+        if not prefiltered:
+            return 0
+
+        classified = classify_papers([work for work, _ in prefiltered], self.vectorizer)
+        candidates = [
+            (work, page_count, domains, vector)
+            for (work, page_count), (domains, vector) in zip(prefiltered, classified)
+            if domains or not self.require_domain
+        ]
+        self.rejections['off_domain'] += len(prefiltered) - len(candidates)
+        english_flags = self.language_detector.is_english_many(
+            [work['abstract'][:ABSTRACT_CHARS] for work, _, _, _ in candidates]
+        )
+
+        page_docs = []
+        for (work, page_count, domains, vector), is_english in zip(candidates, english_flags):
+            if not is_english:
+                self.rejections['non_english'] += 1
+                continue
+            try:
+                paper_doc = build_paper_doc(work, page_count, domains, self.fetched_at, DUMP_RETENTION_DAYS)
+                page_docs.append((self.duplicates.annotate(paper_doc), vector))
+            except Exception as e:
+                logger.warning(f"Error processing dump record {work.get('id')}: {str(e)}")
+        if not page_docs:
+            return 0
+
+        canonical_ids = self.duplicates.find_duplicates([paper_doc for paper_doc, _ in page_docs])
+        unique_docs = [pair for pair, canonical_id in zip(page_docs, canonical_ids) if canonical_id is None]
+        self.rejections['duplicate'] += len(page_docs) - len(unique_docs)
+        if not unique_docs:
+            return 0
+
+        for paper_doc, _ in unique_docs:
+            self.writer.add(paper_doc)
+        stored = self.writer.flush()
+        self.duplicates.flush_aliases()
+        try:
+            store_vectors(db['paper_vectors'], [paper_doc['coreId'] for paper_doc, _ in unique_docs],
+                          [vector for _, vector in unique_docs], self.fetched_at,
+                          [paper_doc['expiresAt'] for paper_doc, _ in unique_docs])
+            self.observed.observe([paper_doc for paper_doc, _ in unique_docs])
+        except Exception as e:
+            logger.warning(f"Could not store paper vectors: {e}")
+        return stored
+
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+
+
+def load_shard(path, shard, shard_count, fetched_at, require_domain=False, batch_size=DUMP_BATCH_SIZE):
+    """Load every shard_count-th line of path, starting at line shard; runs in a pool process.
+
+    Every worker still decompresses the whole file, which is cheap next to
+    classification, and only parses the lines it owns.
+    """
+    checkpoint = DumpCheckpoint(db[DUMP_CHECKPOINTS_COLLECTION], path, shard)
+    label = f"{checkpoint.key}:{shard}/{shard_count}"
+    summary = {'path': path, 'shard': shard, 'records': 0, 'stored': 0, 'malformed': 0, 'rejections': {},
+               'docFreq': None, 'docCount': 0}
+    if checkpoint.done:
+        logger.info(f"{label} already loaded")
+        return summary
+
+    loader = DumpLoader(fetched_at, require_domain=require_domain, batch_size=batch_size)
+    offset, line = checkpoint.offset, checkpoint.line
+    batch = []
+    with open_dump(path) as f:
+        if offset:
+            # A gzip stream can only seek forward by decompressing, but nothing is parsed
+            f.seek(offset)
+            logger.info(f"{label} resuming at line {line}")
+        for raw in f:
+            owned = line % shard_count == shard
+            line += 1
+            offset += len(raw)
+            if owned:
+                try:
+                    batch.append(work_from_dump(json.loads(raw)))
+                except (ValueError, TypeError, AttributeError):
+                    summary['malformed'] += 1
+            if len(batch) >= batch_size:
+                summary['stored'] += loader.load(batch)
+                batch = []
+                checkpoint.save(offset, line)
+                logger.info(f"{label}: {loader.records} records, {summary['stored']} stored")
+    if batch:
+        summary['stored'] += loader.load(batch)
+    checkpoint.save(offset, line, done=True)
+
+    summary.update(records=loader.records, rejections=dict(loader.rejections),
+                   docFreq=loader.observed.doc_freq, docCount=loader.observed.doc_count)
+    return summary
+
+
+def load_dumps(paths, workers=DUMP_WORKERS, require_domain=False, batch_size=DUMP_BATCH_SIZE, restart=False):
+    """Shard the dump files across a process pool; returns (records read, papers stored)"""
+    files = dump_files(paths)
+    if not files:
+        return 0, 0
+    workers = max(1, workers)
+    # Spread the pool over the files; a single large dump is split line-wise
+    shard_count = max(1, workers // len(files))
+    fetched_at = datetime.now() - timedelta(days=1)
+    # Document frequencies of everything the shards stored, folded into the saved model at the end
+    observed = PaperVectorizer(DOMAIN_KEYWORDS.keys())
+    rejections = Counter()
+    records = stored = 0
+    for path in files:
+        DumpCheckpoint.prepare(db[DUMP_CHECKPOINTS_COLLECTION], path, shard_count, restart)
+
+    # Fresh interpreters rather than forks: the database client must not be shared
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(load_shard, path, shard, shard_count, fetched_at, require_domain, batch_size)
+            for path in files for shard in range(shard_count)
+        ]
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                logger.error(f"Dump shard failed (rerun to resume it): {e}")
+                continue
+            records += summary['records']
+            stored += summary['stored']
+            rejections.update(summary['rejections'])
+            if summary['docCount']:
+                observed.doc_freq += summary['docFreq']
+                observed.doc_count += summary['docCount']
+            if summary['stored']:
+                # Dated behind the web indexes' watermarks, so they must resync to see them
+                paper_repository.bump_data_version(resync=True)
+            logger.info(f"{os.path.basename(summary['path'])} shard {summary['shard']}: "
+                        f"{summary['records']} records, {summary['stored']} stored, {summary['malformed']} malformed")
+
+    if observed.doc_count:
+        # Re-read the model just before saving so frequencies the scheduler saved meanwhile are kept
+        vectorizer = PaperVectorizer.load(db['vector_model'], DOMAIN_KEYWORDS.keys())
+        vectorizer.doc_freq += observed.doc_freq
+        vectorizer.doc_count += observed.doc_count
+        vectorizer.save(db['vector_model'])
+    logger.info(f"Dump rejections: {dict(rejections)}")
+    return records, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='dump files or directories of dump files')
+    parser.add_argument('--workers', type=int, default=DUMP_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=DUMP_BATCH_SIZE)
+    parser.add_argument('--require-domain', action='store_true', help='drop papers outside every domain')
+    parser.add_argument('--restart', action='store_true', help='ignore saved checkpoints')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not wait_for_database():
+        raise SystemExit(1)
+    records, stored = load_dumps(args.paths, args.workers, args.require_domain, args.batch_size, args.restart)
+    logger.info(f"Dump load done: {records} records read, {stored} papers stored")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from indexes import PAPER_RETENTION_DAYS, paper_expiry
+
+logger = logging.getLogger(__name__)
+
+# Papers with a known page count below this are too short to show
+MIN_PAGE_COUNT = int(os.getenv('MIN_PAGE_COUNT', '15'))
+ABSTRACT_CHARS = 500   # stored, vectorised and language-checked prefix of the abstract
+MAX_KEYWORDS = 5
+LOOKBACK_DAYS = 7
+
+
+def recent_papers_query(now=None):
+    """CORE query for recently published works that have an abstract, and the window start"""
+    start_date = (now or datetime.now()) - timedelta(days=LOOKBACK_DAYS)
+    return f"yearPublished>={start_date.year} AND _exists_:abstract", start_date
+
+
+def get_page_count(paper_data):
+    """Page count from CORE metadata: pageCount, else a 'pages' number or range; 0 if unknown"""
+    try:
+        if paper_data.get('pageCount') is not None:
+            return int(paper_data['pageCount'])
+
+        pages = paper_data.get('pages')
+        if pages is not None:
+            page_str = str(pages)
+            if '-' in page_str:
+                parts = page_str.split('-')
+                if len(parts) == 2:
+                    return int(parts[1]) - int(parts[0])
+                return 0
+            return int(page_str)
+    except (TypeError, ValueError) as e:
+        logger.debug(f"Unreadable page count for {paper_data.get('id')}: {e}")
+    return 0
+
+
+def classification_fields(paper):
+    """The stored fields domains and vectors are computed from, for a raw CORE work"""
+    return {
+        'title': paper.get('title'),
+        'abstract': (paper.get('abstract') or '')[:ABSTRACT_CHARS],
+        'keywords': (paper.get('keywords') or [])[:MAX_KEYWORDS]
+    }
+
+
+def work_from_dump(record):
+    """A CORE dataset dump record in the API works shape build_paper_doc reads.
+
+    Dumps written from API v3 already have that shape; older dataset releases use
+    coreId, plain author names, datePublished/year and topics instead.
+    """
+    work = dict(record)
+    core_id = record.get('id', record.get('coreId'))
+    try:
+        work['id'] = int(core_id)
+    except (TypeError, ValueError):
+        work['id'] = None
+    work['authors'] = [
+        author if isinstance(author, dict) else {'name': author}
+        for author in record.get('authors') or [] if author
+    ]
+    published = record.get('publishedDate') or record.get('datePublished')
+    if not published and record.get('year'):
+        published = f"{record['year']}-01-01"
+    if published:
+        work['publishedDate'] = published
+    else:
+        work.pop('publishedDate', None)
+    if not record.get('keywords') and record.get('topics'):
+        work['keywords'] = [topic for topic in record['topics'] if isinstance(topic, str)]
+    if not record.get('sourceFulltextUrls') and record.get('fullTextIdentifier'):
+        work['sourceFulltextUrls'] = [record['fullTextIdentifier']]
+    return work
+
+
+def build_paper_doc(paper, page_count, domains, fetched_at, retention_days=PAPER_RETENTION_DAYS):
+    """The stored paper document for a raw CORE work, expiring retention_days after fetched_at (0: never)"""
+    return {
+        'coreId': paper.get('id'),
+        'title': paper.get('title', 'Untitled'),
+        'abstract': (paper.get('abstract') or '')[:ABSTRACT_CHARS],
+        'authors': [author.get('name', '') for author in paper.get('authors') or [] if author.get('name')],
+        'publishedDate': paper.get('publishedDate', str(fetched_at)),
+        'downloadUrl': paper.get('downloadUrl', ''),
+        'sourceFulltextUrls': paper.get('sourceFulltextUrls', []),
+        'doi': paper.get('doi', ''),
+        'pageCount': page_count if page_count > 0 else None,
+        'keywords': (paper.get('keywords') or [])[:MAX_KEYWORDS],
+        'domains': domains,
+        'language': 'English',
+        'fetchedAt': fetched_at,
+        'expiresAt': paper_expiry(fetched_at, retention_days),
+        # store as string like 'YYYY-MM-DD' so queries and storage are consistent
+        'fetchedDate': fetched_at.date().isoformat()
+    }
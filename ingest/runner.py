@@ -0,0 +1,359 @@
+import logging
+import os
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from core_client import CoreClient
+from database import db
+from dedup import DuplicateDetector
+from domain_matcher import DomainMatcher
+from domains import DOMAIN_KEYWORDS
+from events import PAPER_EVENTS_COLLECTION, publish_paper_event
+from language import LanguageDetector
+from metrics import RunMetrics
+from pipeline import Pipeline, Stage
+from repositories import paper_repository
+from vector_index import PaperVectorizer, store_vectors
+
+from .domain_queries import CORE_DOMAIN_PAGES, DOMAIN_DAILY_TARGET, DomainYield, allocate_pages, domain_query
+from .papers import ABSTRACT_CHARS, MIN_PAGE_COUNT, build_paper_doc, classification_fields, get_page_count, recent_papers_query
+from .storage import BulkPaperWriter, FetchCheckpoint, INGEST_BATCH_SIZE, filter_known_papers
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CORE_API_KEY = os.getenv('CORE_API_KEY')
+CORE_API_URL = os.getenv('CORE_API_URL', "https://api.core.ac.uk/v3/search/works")
+CORE_PAGE_SIZE = int(os.getenv('CORE_PAGE_SIZE', '100'))
+CORE_MAX_PAGES = int(os.getenv('CORE_MAX_PAGES', '5'))
+# Worker threads for the ingestion stages that dominate per-page cost
+CLASSIFY_STAGE_WORKERS = int(os.getenv('CLASSIFY_STAGE_WORKERS', '2'))
+LANGUAGE_STAGE_WORKERS = int(os.getenv('LANGUAGE_STAGE_WORKERS', '2'))
+
+core_client = CoreClient(CORE_API_KEY, base_url=CORE_API_URL)
+domain_matcher = DomainMatcher(DOMAIN_KEYWORDS)
+language_detector = LanguageDetector()
+
+_paper_vectorizer = None
+_paper_vectorizer_lock = threading.Lock()
+
+
+def get_paper_vectorizer():
+    """Vector model used by ingestion, loaded from MongoDB on first use"""
+    global _paper_vectorizer
+    if _paper_vectorizer is None:
+        with _paper_vectorizer_lock:
+            if _paper_vectorizer is None:
+                _paper_vectorizer = PaperVectorizer.load(db['vector_model'], DOMAIN_KEYWORDS.keys())
+    return _paper_vectorizer
+
+
+def get_paper_domains(paper):
+    """Identify domains that a paper belongs to"""
+    return domain_matcher.match_paper(paper)
+
+
+def classify_papers(papers, vectorizer):
+    """(domains, vector) per paper: keyword matches plus the domains its vector clears"""
+    vectors = vectorizer.transform([classification_fields(paper) for paper in papers])
+    scored_domains = vectorizer.vector_domains(vectors)
+    results = []
+    for paper, vector, vector_domains in zip(papers, vectors, scored_domains):
+        keyword_domains = get_paper_domains(paper)
+        results.append(([d for d in DOMAIN_KEYWORDS if d in keyword_domains or d in vector_domains], vector))
+    return results
+
+
+class IngestProfile:
+    """What one scheduled ingestion run keeps and how much of CORE it reads.
+
+    require_domain drops papers outside every domain; max_papers stops the run
+    once that many papers have been accepted (None for no limit). With
+    domain_queries, CORE is asked once per under-filled domain instead of once
+    for everything, sharing domain_pages pages between those queries.
+    """
+
+    def __init__(self, name, require_domain=True, max_papers=None, max_pages=CORE_MAX_PAGES,
+                 per_page=CORE_PAGE_SIZE, domain_queries=False, domain_pages=CORE_DOMAIN_PAGES):
+        self.name = name
+        self.require_domain = require_domain
+        self.max_papers = max_papers
+        self.max_pages = max_pages
+        self.per_page = per_page
+        self.domain_queries = domain_queries
+        self.domain_pages = domain_pages
+
+
+# The hourly fetch keeps a small batch of on-topic papers, asking CORE per domain;
+# the daily update keeps every English paper long enough to read
+HOURLY = IngestProfile('hourly', require_domain=True, max_papers=50, domain_queries=True)
+DAILY = IngestProfile('daily', require_domain=False)
+
+
+def plan_queries(profile, base_query, today_str, domain_yield):
+    """{key: (CORE query, pages)} for one run, most needed first; the key is the domain or None"""
+    if domain_yield is None:
+        return {None: (base_query, profile.max_pages)}
+    counts, _ = paper_repository.daily_stats(today_str)
+    deficits = {
+        domain: max(0, DOMAIN_DAILY_TARGET - counts['domains'].get(domain, 0))
+        for domain in DOMAIN_KEYWORDS
+    }
+    yields = {domain: domain_yield.expected(domain) for domain in DOMAIN_KEYWORDS}
+    pages = allocate_pages(deficits, yields, profile.domain_pages, profile.per_page)
+    logger.info("Domain query pages: " + ', '.join(f"{domain}={count}" for domain, count in pages.items()))
+    return {
+        domain: (domain_query(base_query, DOMAIN_KEYWORDS[domain]), pages[domain])
+        for domain in sorted(pages, key=lambda d: -deficits[d])
+    }
+
+
+def run_ingestion(profile):
+    """Fetch the next checkpoint window of each planned CORE query and store the papers profile keeps.
+
+    Pages flow through parse -> page_count -> classify -> language -> dedupe ->
+    store stages (see pipeline.Pipeline). Returns the number of papers stored.
+    """
+    logger.info("=" * 70)
+    logger.info(f"Starting {profile.name} paper fetch from CORE API...")
+    logger.info("=" * 70)
+
+    fetched_at = datetime.now()
+    today_str = fetched_at.date().isoformat()
+    base_query, start_date = recent_papers_query()
+    domain_yield = DomainYield(db['ingest_meta'], DOMAIN_KEYWORDS) if profile.domain_queries else None
+    queries = plan_queries(profile, base_query, today_str, domain_yield)
+    # Only ask for works updated since each query's last drained checkpoint window
+    checkpoints = {
+        key: FetchCheckpoint(db['ingest_checkpoints'], query, initial_mark=start_date)
+        for key, (query, _) in queries.items()
+    }
+    windowed = {key: (checkpoints[key].build_query(query), pages) for key, (query, pages) in queries.items()}
+    resume_offsets = {key: checkpoint.offset for key, checkpoint in checkpoints.items()}
+
+    duplicates = DuplicateDetector(paper_repository)
+    run_metrics = RunMetrics(profile.name)
+    paper_vectorizer = get_paper_vectorizer()
+    pending_vectors = {}  # coreId -> vector of papers waiting for their bulk upsert
+    new_ids = {domain: [] for domain in DOMAIN_KEYWORDS}  # stored papers, for the 'ingested' event
+
+    def store_batch_vectors(stored_docs):
+        """Write the vectors of a committed batch right away, so a failed run keeps them"""
+        for paper_doc in stored_docs:
+            for domain in paper_doc['domains']:
+                new_ids[domain].append(paper_doc['coreId'])
+        try:
+            store_vectors(
+                db['paper_vectors'],
+                [paper_doc['coreId'] for paper_doc in stored_docs],
+                [pending_vectors.pop(paper_doc['coreId']) for paper_doc in stored_docs],
+                datetime.now(),  # written now, so stamped now (see BulkPaperWriter stamp)
+                [paper_doc['expiresAt'] for paper_doc in stored_docs]
+            )
+            paper_vectorizer.observe(stored_docs)
+        except Exception as e:
+            logger.warning(f"Could not store paper vectors: {e}")
+
+    writer = BulkPaperWriter(paper_repository, batch_size=INGEST_BATCH_SIZE, domains=DOMAIN_KEYWORDS.keys(),
+                             stamp=True, on_flush=store_batch_vectors)
+    pages_fetched = 0
+    drained = dict.fromkeys(queries, True)
+    started = set()  # queries with at least one page out of CORE
+    unprocessed = []  # papers or (paper, ...) entries fetched but left unprocessed by pipeline.stop()
+    source_domain = {}  # coreId -> the domain query that returned it first
+    source_offset = {}  # coreId -> offset of the page that returned it
+    fetched_offsets = {key: set() for key in queries}  # pages fetched, less those left unprocessed
+
+    def fetch_pages():
+        """Source stage: CORE pages of every query as they arrive; closing it cancels pending requests"""
+        nonlocal pages_fetched
+        pages = core_client.iter_queries(windowed, per_page=profile.per_page, start_offsets=resume_offsets)
+        try:
+            for key, offset, papers in pages:
+                started.add(key)
+                if papers is None:
+                    drained[key] = False
+                    continue
+                pages_fetched += 1
+                fetched_offsets[key].add(offset)
+                checkpoints[key].observe(papers)
+                if len(papers) == profile.per_page:
+                    drained[key] = False
+                logger.info(f"Fetched {len(papers)} papers from CORE API ({key or 'all'}, offset {offset})")
+                # Domain queries overlap; each work goes down the pipeline once
+                unique = [paper for paper in papers if paper.get('id') not in source_domain]
+                run_metrics.reject('overlap', len(papers) - len(unique))
+                for paper in unique:
+                    source_domain[paper.get('id')] = key
+                    source_offset[paper.get('id')] = offset
+                yield unique
+        finally:
+            pages.close()
+
+    def parse_page(papers):
+        if domain_yield is not None:
+            # Counted here rather than at fetch: pages left queued by pipeline.stop() never cost a filter pass
+            for paper in papers:
+                domain_yield.observe_fetched(source_domain.get(paper.get('id')))
+        # Skip papers we already store before any language detection or classification
+        new_papers = filter_known_papers(paper_repository, papers)
+        run_metrics.reject('known', len(papers) - len(new_papers))
+        return new_papers or None
+
+    def filter_page_count(new_papers):
+        prefiltered = []
+        for paper in new_papers:
+            if not paper.get('abstract'):
+                run_metrics.reject('no_abstract')
+                continue
+            page_count = get_page_count(paper)
+            if 0 < page_count < MIN_PAGE_COUNT:
+                run_metrics.reject('short')
+                continue
+            prefiltered.append((paper, page_count))
+        return prefiltered or None
+
+    def classify_page(prefiltered):
+        # Vectorise the page in one pass, from the same fields that get stored
+        classified = classify_papers([paper for paper, _ in prefiltered], paper_vectorizer)
+        candidates = [
+            (paper, page_count, domains, vector)
+            for (paper, page_count), (domains, vector) in zip(prefiltered, classified)
+            if domains or not profile.require_domain
+        ]
+        run_metrics.reject('off_domain', len(prefiltered) - len(candidates))
+        return candidates or None
+
+    def filter_language(candidates):
+        english_flags = language_detector.is_english_many(
+            [paper['abstract'][:ABSTRACT_CHARS] for paper, _, _, _ in candidates]
+        )
+        page_docs = []
+        for (paper, page_count, domains, vector), is_english in zip(candidates, english_flags):
+            if not is_english:
+                run_metrics.reject('non_english')
+                continue
+            try:
+                paper_doc = build_paper_doc(paper, page_count, domains, fetched_at)
+                page_docs.append((duplicates.annotate(paper_doc), vector))
+            except Exception as e:
+                logger.warning(f"Error processing paper {paper.get('id')}: {str(e)}")
+        return page_docs or None
+
+    def dedupe_page(page_docs):
+        # Other CORE ids of works already stored (or queued) are not stored again
+        canonical_ids = duplicates.find_duplicates([paper_doc for paper_doc, _ in page_docs])
+        unique_docs = []
+        for (paper_doc, vector), canonical_id in zip(page_docs, canonical_ids):
+            if canonical_id is not None:
+                run_metrics.reject('duplicate')
+                logger.debug(f"Skipping {paper_doc['coreId']}: duplicate of {canonical_id}")
+                continue
+            unique_docs.append((paper_doc, vector))
+        return unique_docs or None
+
+    def store_page(unique_docs):
+        for index, (paper_doc, vector) in enumerate(unique_docs):
+            # Queue for the next bulk upsert
+            pending_vectors[paper_doc['coreId']] = vector
+            writer.add(paper_doc)
+            if domain_yield is not None:
+                domain_yield.observe_kept(source_domain.get(paper_doc['coreId']))
+            logger.debug(f"Queued: {paper_doc['title'][:60]}... ({paper_doc['pageCount']} pages)")
+            if profile.max_papers and writer.accepted_count >= profile.max_papers:
+                unprocessed.extend(unique_docs[index + 1:])
+                pipeline.stop()
+                break
+
+    # Stages run concurrently on successive pages; dedupe and store keep run state, so one worker each
+    pipeline = Pipeline(fetch_pages(), [
+        Stage('parse', parse_page),
+        Stage('page_count', filter_page_count),
+        Stage('classify', classify_page, workers=CLASSIFY_STAGE_WORKERS),
+        Stage('language', filter_language, workers=LANGUAGE_STAGE_WORKERS),
+        Stage('dedupe', dedupe_page),
+        Stage('store', store_page),
+    ], metrics=run_metrics)
+    pipeline.run()
+
+    if pipeline.stopped:
+        # Only queries with pages still to fetch, or fetched but unprocessed, keep their window open
+        for key in drained:
+            if key not in started:
+                drained[key] = False
+        for entry in unprocessed + [entry for item in pipeline.skipped for entry in item]:
+            paper = entry[0] if isinstance(entry, tuple) else entry
+            core_id = paper.get('coreId', paper.get('id'))
+            key = source_domain.get(core_id)
+            drained[key] = False
+            fetched_offsets.get(key, set()).discard(source_offset.get(core_id))
+
+    if pages_fetched == 0:
+        logger.error("CORE API Error: no pages could be fetched")
+        run_metrics.persist(db['ingest_meta'])
+        return 0
+
+    writer.flush()
+    duplicates.flush_aliases()
+    for key, checkpoint in checkpoints.items():
+        # An undrained window resumes at its first page that failed, was never fetched or was left unprocessed
+        next_offset = resume_offsets[key]
+        while next_offset in fetched_offsets[key]:
+            next_offset += profile.per_page
+        checkpoint.save(drained[key], next_offset)
+    inserted_count = writer.stored_count
+    domain_stats = writer.domain_stats
+
+    if inserted_count:
+        try:
+            paper_vectorizer.save(db['vector_model'])
+        except Exception as e:
+            logger.warning(f"Could not save the vector model: {e}")
+
+    # Store update statistics
+    update_stats = {
+        'timestamp': datetime.now(),
+        'total_papers': inserted_count,
+        'upserted': writer.upserted_count,
+        'modified': writer.modified_count,
+        'duplicates': duplicates.duplicate_count,
+        'domain_stats': domain_stats,
+        'pipeline': run_metrics.persist(db['ingest_meta'])
+    }
+    if domain_yield is not None:
+        update_stats['domain_queries'] = domain_yield.save()
+    paper_repository.record_update(update_stats, today_str)
+    if inserted_count:
+        paper_repository.bump_data_version()
+        # Open decks append these instead of re-polling every listing
+        publish_paper_event(db[PAPER_EVENTS_COLLECTION], 'ingested', new_ids, today_str)
+
+    filtered_count = sum(count for reason, count in update_stats['pipeline']['rejections'].items()
+                         if reason not in ('known', 'no_abstract', 'overlap'))
+    logger.info(f"✓ Successfully stored {inserted_count} papers (filtered out {filtered_count})")
+    for domain, count in domain_stats.items():
+        if count > 0:
+            logger.info(f"  - {domain}: {count} papers")
+    logger.info("=" * 70)
+    return inserted_count
+
+
+def fetch_and_store_papers():
+    """Hourly run: recent AI and CS papers"""
+    try:
+        return run_ingestion(HOURLY)
+    except Exception as e:
+        logger.error(f"Error in fetch_and_store_papers: {str(e)}")
+        return 0
+
+
+def fetch_recent_papers():
+    """Daily run: recent English papers with the minimum page count"""
+    try:
+        return run_ingestion(DAILY)
+    except Exception as e:
+        logger.error(f"Error fetching papers: {str(e)}")
+        return 0
@@ -0,0 +1,167 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Number of paper documents sent to the paper repository per bulk upsert
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '100'))
+
+
+class BulkPaperWriter:
+    """Accumulate paper documents and upsert them through the repository in batches.
+
+    Documents are keyed by coreId, so a paper seen twice before a flush is only
+    written once. Every document carries a fresh fetchedAt, which means a matched
+    upsert always modifies the stored copy; counts are taken from the write result.
+    With stamp, fetchedAt is set as each batch is written rather than when the run
+    started, so the web workers' fetchedAt watermarks (search_index, vector_index)
+    see batches in about the order they became visible. on_flush, if given, is
+    called with the documents each flush stored, once they are committed.
+    """
+
+    def __init__(self, repository, batch_size=INGEST_BATCH_SIZE, domains=None, stamp=False, on_flush=None):
+        self.repository = repository
+        self.batch_size = max(1, int(batch_size))
+        self.stamp = stamp
+        self.on_flush = on_flush
+        self.pending = {}
+        self.accepted_count = 0
+        self.upserted_count = 0
+        self.modified_count = 0
+        self.failed_count = 0
+        self.domain_stats = {domain: 0 for domain in (domains or [])}
+
+    @property
+    def stored_count(self):
+        return self.upserted_count + self.modified_count
+
+    def add(self, paper_doc):
+        """Queue a document, flushing when the batch is full"""
+        core_id = paper_doc.get('coreId')
+        if core_id not in self.pending:
+            self.accepted_count += 1
+        self.pending[core_id] = paper_doc
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all pending documents in one round trip; returns papers stored"""
+        if not self.pending:
+            return 0
+
+        batch = list(self.pending.values())
+        self.pending = {}
+        if self.stamp:
+            written_at = datetime.now()
+            for doc in batch:
+                doc['fetchedAt'] = written_at
+
+        upserted, modified, failed = self.repository.upsert_papers(batch)
+        if failed:
+            logger.warning(f"Bulk write had {len(failed)} failed upserts out of {len(batch)}")
+
+        self.upserted_count += upserted
+        self.modified_count += modified
+        self.failed_count += len(failed)
+
+        stored = [doc for index, doc in enumerate(batch) if index not in failed]
+        for doc in stored:
+            for domain in doc.get('domains', []):
+                if domain in self.domain_stats:
+                    self.domain_stats[domain] += 1
+
+        logger.info(f"Bulk upserted {len(stored)} papers "
+                    f"({upserted} new, {modified} updated)")
+        if self.on_flush is not None and stored:
+            self.on_flush(stored)
+        return upserted + modified
+
+
+def filter_known_papers(repository, papers):
+    """Drop CORE results whose id is already stored, as a coreId or a known duplicate alias"""
+    ids = [paper.get('id') for paper in papers if paper.get('id') is not None]
+    if not ids:
+        return list(papers)
+    known = repository.known_core_ids(ids)
+    return [paper for paper in papers if paper.get('id') not in known]
+
+
+class FetchCheckpoint:
+    """Persisted high-water mark of CORE updatedDate for one query.
+
+    CORE does not return results in updatedDate order, so the mark can only move
+    once a run has drained its window. Each run therefore asks for a bounded window
+    [updatedDate, updatedDate + windowHours): a drained window advances the mark and
+    widens the next one. An undrained window keeps its bounds and saves the offset
+    the next run resumes from; only a run that made no progress halves the window.
+    """
+
+    MIN_WINDOW_HOURS = 1
+    MAX_WINDOW_HOURS = 24 * 7
+
+    def __init__(self, collection, key, initial_mark, window_hours=24):
+        self.collection = collection
+        self.key = key
+        doc = collection.find_one({'_id': key}) or {}
+        self.mark = doc.get('updatedDate') or initial_mark.strftime('%Y-%m-%dT%H:%M:%S')
+        self.last_id = doc.get('lastId')
+        self.window_hours = doc.get('windowHours', window_hours)
+        # Offset into the undrained window; its end is kept so the resumed query matches
+        self.offset = doc.get('offset', 0)
+        self.window_end = doc.get('windowEnd') if self.offset else None
+        self.newest = None
+        self.newest_id = None
+
+    def build_query(self, base_query, now=None):
+        """Restrict base_query to the next unprocessed updatedDate window"""
+        if not self.offset:
+            now = now or datetime.now()
+            end = datetime.fromisoformat(self.mark) + timedelta(hours=self.window_hours)
+            self.window_end = end.strftime('%Y-%m-%dT%H:%M:%S') if end < now else None
+        query = f'{base_query} AND updatedDate>="{self.mark}"'
+        if self.window_end:
+            query += f' AND updatedDate<"{self.window_end}"'
+        return query
+
+    def observe(self, papers):
+        """Track the newest updatedDate/id seen in a page of raw CORE results"""
+        for paper in papers:
+            updated = paper.get('updatedDate')
+            if updated and (self.newest is None or (updated, paper.get('id') or 0) > (self.newest, self.newest_id or 0)):
+                self.newest = updated
+                self.newest_id = paper.get('id')
+
+    def save(self, drained, next_offset=0):
+        """Persist the mark; only a drained window is allowed to advance it.
+
+        next_offset is where an undrained window's unprocessed results start.
+        """
+        if drained:
+            if self.window_end:
+                self.mark = self.window_end
+            elif self.newest:
+                self.mark = self.newest[:19]
+                self.last_id = self.newest_id
+            self.window_hours = min(self.MAX_WINDOW_HOURS, self.window_hours * 2)
+            self.offset = 0
+        elif next_offset > self.offset:
+            self.offset = next_offset
+        else:
+            self.window_hours = max(self.MIN_WINDOW_HOURS, self.window_hours / 2)
+            self.offset = 0
+
+        self.collection.update_one(
+            {'_id': self.key},
+            {'$set': {
+                'updatedDate': self.mark,
+                'lastId': self.last_id,
+                'windowHours': self.window_hours,
+                'windowEnd': self.window_end,
+                'offset': self.offset,
+                'savedAt': datetime.now()
+            }},
+            upsert=True
+        )
+        logger.info(f"Checkpoint '{self.key}' at updatedDate {self.mark} "
+                    f"(next window {self.window_hours}h from offset {self.offset}, drained={drained})")
@@ -0,0 +1,94 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class MongoLease:
+    """A named, expiring lock stored as one document in a MongoDB collection.
+
+    The holder renews the lease from a heartbeat thread while its job runs; if the
+    process dies the lease simply expires and another replica can take it over.
+    """
+
+    def __init__(self, collection, name, ttl_seconds=JOB_LEASE_SECONDS, owner=None):
+        self.collection = collection
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """Take the lease if it is free, expired, or already ours; returns True on success"""
+        now = _now()
+        try:
+            self.collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'expiresAt': {'$lt': now}}, {'owner': self.owner}]},
+                {'$set': {'owner': self.owner, 'expiresAt': now + self.ttl, 'acquiredAt': now}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease, so the upsert collided with their document
+            return False
+
+    def renew(self):
+        result = self.collection.update_one(
+            {'_id': self.name, 'owner': self.owner},
+            {'$set': {'expiresAt': _now() + self.ttl}}
+        )
+        return result.matched_count == 1
+
+    def release(self):
+        self.collection.delete_one({'_id': self.name, 'owner': self.owner})
+
+    @contextmanager
+    def hold(self):
+        """Yield True while holding the lease (renewed in the background), else False"""
+        if not self.acquire():
+            yield False
+            return
+
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl.total_seconds() / 3):
+                try:
+                    if not self.renew():
+                        logger.warning(f"Lost lease '{self.name}' while the job was running")
+                        return
+                except Exception as e:
+                    logger.warning(f"Failed to renew lease '{self.name}': {e}")
+
+        thread = threading.Thread(target=heartbeat, name=f'lease-{self.name}', daemon=True)
+        thread.start()
+        try:
+            yield True
+        finally:
+            stop.set()
+            thread.join()
+            try:
+                self.release()
+            except Exception as e:
+                logger.warning(f"Failed to release lease '{self.name}': {e}")
+
+
+def run_exclusive(collection, name, job, ttl_seconds=JOB_LEASE_SECONDS):
+    """Run job() only if no other instance currently holds the lease called name"""
+    with MongoLease(collection, name, ttl_seconds=ttl_seconds).hold() as acquired:
+        if not acquired:
+            logger.info(f"Skipping '{name}': another instance holds the lease")
+            return None
+        return job()
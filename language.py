@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from langdetect import DetectorFactory, detect, LangDetectException
+
+logger = logging.getLogger(__name__)
+
+# langdetect is randomised unless seeded; a fixed seed makes results reproducible
+LANGDETECT_SEED = 0
+DetectorFactory.seed = LANGDETECT_SEED
+
+LANGDETECT_WORKERS = int(os.getenv('LANGDETECT_WORKERS', str(os.cpu_count() or 1)))
+LANGUAGE_CACHE_SIZE = int(os.getenv('LANGUAGE_CACHE_SIZE', '50000'))
+
+# Below this many undecided texts a batch is detected in-process; the pool round trip costs more
+MIN_POOL_BATCH = 8
+
+MIN_TEXT_LENGTH = 50
+
+# Function words that are common in English prose and rare in other Latin-script languages
+ENGLISH_STOP_WORDS = frozenset("""
+    the and of to is are with for that this we which from by these be on as an our
+    it its has have was were can such their than been not or into between using
+""".split())
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def quick_language_check(text):
+    """Cheap pre-filter: True/False for obvious cases, None when langdetect is needed"""
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+        return False
+
+    words = WORD_RE.findall(text[:2000].lower())
+    if not words:
+        return False
+
+    non_ascii = sum(1 for word in words if not word.isascii())
+    if non_ascii / len(words) > 0.3:
+        return False
+
+    stop_ratio = sum(1 for word in words if word in ENGLISH_STOP_WORDS) / len(words)
+    if stop_ratio >= 0.15 and non_ascii == 0:
+        return True
+    if stop_ratio < 0.02 and len(words) >= 20:
+        return False
+    return None
+
+
+def _init_worker(seed):
+    DetectorFactory.seed = seed
+
+
+def _detect_is_english(text):
+    try:
+        return detect(text) == 'en'
+    except LangDetectException:
+        return False
+    except Exception:
+        return False
+
+
+def _detect_batch(texts):
+    return [_detect_is_english(text) for text in texts]
+
+
+class LanguageDetector:
+    """Batch English detection: heuristic pre-filter, process pool, memoized results.
+
+    Results are cached by a digest of the text, so re-fetching the same abstract
+    (or detecting it again on a later page) never runs langdetect twice.
+    """
+
+    def __init__(self, workers=LANGDETECT_WORKERS, cache_size=LANGUAGE_CACHE_SIZE):
+        self.workers = max(1, int(workers))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=16).digest()
+
+    def _get_pool(self):
+        # Ingestion may call in from several pipeline workers at once
+        with self._lock:
+            if self._pool is None:
+                # Fresh interpreters rather than forks: the pool starts inside the threaded pipeline
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(LANGDETECT_SEED,)
+                )
+            return self._pool
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def is_english_many(self, texts):
+        """Return a list of booleans, one per text, in input order"""
+        results = [None] * len(texts)
+        undecided = {}
+
+        for index, text in enumerate(texts):
+            verdict = quick_language_check(text)
+            if verdict is not None:
+                results[index] = verdict
+                continue
+            key = self._key(text)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                undecided.setdefault(key, []).append(index)
+
+        if undecided:
+            keys = list(undecided)
+            batch = [texts[undecided[key][0]] for key in keys]
+            if self.workers > 1 and len(batch) >= MIN_POOL_BATCH:
+                chunk = -(-len(batch) // self.workers)
+                chunks = [batch[i:i + chunk] for i in range(0, len(batch), chunk)]
+                try:
+                    detected = [flag for part in self._get_pool().map(_detect_batch, chunks) for flag in part]
+                except Exception as e:
+                    logger.warning(f"Language pool failed, detecting in-process: {e}")
+                    self._discard_pool()
+                    detected = _detect_batch(batch)
+            else:
+                detected = _detect_batch(batch)
+
+            for key, flag in zip(keys, detected):
+                self._remember(key, flag)
+                for index in undecided[key]:
+                    results[index] = flag
+
+        return results
+
+    def is_english(self, text):
+        return self.is_english_many([text])[0]
+
+    def _discard_pool(self):
+        """Drop a broken pool without waiting on it; the next large batch starts a new one"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
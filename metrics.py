@@ -0,0 +1,193 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PIPELINE_METRICS_ID = 'pipeline_metrics'
+METRIC_PREFIX = 'paper_swiper'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; counts are per bucket, the last one is +Inf"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+
+class RunMetrics:
+    """Per-stage timings, paper counts and rejection reasons for one ingestion run.
+
+    Pipeline stages report each item they process; stage functions report why
+    papers were dropped. summary() is stored with the run's update_stats and
+    persist() folds the run into cumulative counters that /metrics exposes.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.stages = {}
+        self.rejections = {}
+
+    def observe_stage(self, stage, seconds, items_in, items_out):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'in': 0, 'out': 0, 'histogram': Histogram()}
+            entry['in'] += items_in
+            entry['out'] += items_out
+            entry['histogram'].observe(seconds)
+
+    def reject(self, reason, count=1):
+        if count:
+            with self._lock:
+                self.rejections[reason] = self.rejections.get(reason, 0) + count
+
+    def summary(self):
+        with self._lock:
+            return {
+                'pipeline': self.pipeline,
+                'durationSeconds': round(time.monotonic() - self._started, 3),
+                'stages': {
+                    stage: {
+                        'in': entry['in'],
+                        'out': entry['out'],
+                        'calls': entry['histogram'].count,
+                        'seconds': round(entry['histogram'].sum, 4),
+                        'maxSeconds': round(entry['histogram'].max, 4)
+                    }
+                    for stage, entry in self.stages.items()
+                },
+                'rejections': dict(self.rejections)
+            }
+
+    def persist(self, collection):
+        """$inc this run into the cumulative pipeline metrics document"""
+        prefix = f'pipelines.{self.pipeline}'
+        summary = self.summary()
+        inc = {f'{prefix}.runs': 1, f'{prefix}.runSeconds': summary['durationSeconds']}
+        with self._lock:
+            for stage, entry in self.stages.items():
+                histogram = entry['histogram']
+                inc[f'{prefix}.stages.{stage}.in'] = entry['in']
+                inc[f'{prefix}.stages.{stage}.out'] = entry['out']
+                inc[f'{prefix}.stages.{stage}.sum'] = histogram.sum
+                inc[f'{prefix}.stages.{stage}.count'] = histogram.count
+                for index, count in enumerate(histogram.counts):
+                    if count:
+                        inc[f'{prefix}.stages.{stage}.buckets.{index}'] = count
+            for reason, count in self.rejections.items():
+                inc[f'{prefix}.rejections.{reason}'] = count
+        try:
+            collection.update_one(
+                {'_id': PIPELINE_METRICS_ID},
+                {'$inc': inc, '$set': {f'{prefix}.lastRun': {**summary, 'finishedAt': datetime.now()}}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist pipeline metrics: {e}")
+        return summary
+
+
+class RequestMetrics:
+    """Latency histograms per (route, method, status) for this web process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, route, method, status, seconds):
+        key = (route, method, str(status))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name, labels, counts, total, count, buckets=LATENCY_BUCKETS):
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_labels(**labels)} {count}')
+    return lines
+
+
+def render_metrics(request_metrics, pipeline_doc=None, response_cache=None):
+    """Prometheus text exposition of route latency, cache and ingestion metrics"""
+    lines = []
+
+    name = f'{METRIC_PREFIX}_http_request_duration_seconds'
+    lines += [f'# HELP {name} HTTP request latency by route.', f'# TYPE {name} histogram']
+    with request_metrics._lock:
+        snapshot = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(request_metrics.histograms.items())]
+    for (route, method, status), counts, total, count in snapshot:
+        lines += _histogram_lines(name, {'route': route, 'method': method, 'status': status}, counts, total, count)
+
+    if response_cache is not None:
+        for kind, value in (('hits', response_cache.hits), ('misses', response_cache.misses)):
+            name = f'{METRIC_PREFIX}_response_cache_{kind}_total'
+            lines += [f'# HELP {name} Response cache {kind} in this process.', f'# TYPE {name} counter',
+                      f'{name} {value}']
+
+    pipelines = (pipeline_doc or {}).get('pipelines', {})
+    families = {
+        'ingest_runs_total': ('counter', 'Ingestion runs.'),
+        'ingest_last_run_duration_seconds': ('gauge', 'Wall time of the latest ingestion run.'),
+        'ingest_stage_seconds': ('histogram', 'Time per pipeline stage call (one CORE page).'),
+        'ingest_stage_items_in_total': ('counter', 'Papers received by each pipeline stage.'),
+        'ingest_stage_items_out_total': ('counter', 'Papers passed on by each pipeline stage.'),
+        'ingest_rejections_total': ('counter', 'Papers dropped during ingestion, by reason.'),
+    }
+    samples = {family: [] for family in families}
+    for pipeline, data in sorted(pipelines.items()):
+        samples['ingest_runs_total'].append(f"{_labels(pipeline=pipeline)} {data.get('runs', 0)}")
+        last_run = data.get('lastRun') or {}
+        if 'durationSeconds' in last_run:
+            samples['ingest_last_run_duration_seconds'].append(
+                f"{_labels(pipeline=pipeline)} {last_run['durationSeconds']}")
+        for stage, stats in sorted((data.get('stages') or {}).items()):
+            labels = {'pipeline': pipeline, 'stage': stage}
+            stored = stats.get('buckets') or {}
+            counts = [stored.get(str(index), 0) for index in range(len(LATENCY_BUCKETS) + 1)]
+            samples['ingest_stage_seconds'] += _histogram_lines(
+                f'{METRIC_PREFIX}_ingest_stage_seconds', labels, counts, stats.get('sum', 0), stats.get('count', 0))
+            samples['ingest_stage_items_in_total'].append(f"{_labels(**labels)} {stats.get('in', 0)}")
+            samples['ingest_stage_items_out_total'].append(f"{_labels(**labels)} {stats.get('out', 0)}")
+        for reason, count in sorted((data.get('rejections') or {}).items()):
+            samples['ingest_rejections_total'].append(f"{_labels(pipeline=pipeline, reason=reason)} {count}")
+
+    for family, (kind, help_text) in families.items():
+        name = f'{METRIC_PREFIX}_{family}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'histogram':
+            lines += samples[family]
+        else:
+            lines += [f'{name}{sample}' for sample in samples[family]]
+
+    return '\n'.join(lines) + '\n'
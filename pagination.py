@@ -0,0 +1,189 @@
+import base64
+import json
+from datetime import date, datetime
+
+MAX_PAGE_SIZE = 100
+LISTING_SORT = [('publishedDate', -1), ('coreId', -1)]
+
+# Fields a client may request with ?fields=
+PAPER_FIELDS = {
+    'coreId', 'title', 'abstract', 'authors', 'publishedDate', 'downloadUrl',
+    'sourceFulltextUrls', 'doi', 'pageCount', 'keywords', 'domains',
+    'fetchedDate', 'fetchedAt', 'promotedDates', 'language'
+}
+
+# Stored fields needed to build the compact ?view=card representation
+CARD_SOURCE_FIELDS = {
+    'coreId', 'title', 'abstract', 'authors', 'publishedDate',
+    'downloadUrl', 'sourceFulltextUrls', 'doi', 'pageCount', 'keywords'
+}
+CARD_ABSTRACT_CHARS = 300
+# Batches read to fill one page for a user who has swiped most of a listing
+SEEN_SCAN_ROUNDS = 4
+
+# Full documents are returned without internal deduplication data
+DEFAULT_PROJECTION = {'_id': 0, 'minhash': 0, 'lshBands': 0}
+
+
+class PaginationError(ValueError):
+    """Raised for malformed cursor, limit or fields parameters"""
+
+
+def encode_cursor(paper):
+    """Opaque cursor pointing just after paper in (publishedDate, coreId) descending order"""
+    raw = json.dumps([paper.get('publishedDate'), paper.get('coreId')], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_date, core_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return published_date, core_id
+    except Exception:
+        raise PaginationError('Invalid cursor')
+
+
+def keyset_query(query, cursor):
+    """Restrict query to documents that sort after the cursor"""
+    if not cursor:
+        return query
+    published_date, core_id = decode_cursor(cursor)
+    after = {'$or': [
+        {'publishedDate': {'$lt': published_date}},
+        {'publishedDate': published_date, 'coreId': {'$lt': core_id}}
+    ]}
+    return {'$and': [query, after]}
+
+
+def parse_limit(value, default):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def build_projection(fields=None, view=None):
+    """Mongo projection for ?fields=a,b or ?view=card; with neither, all public fields"""
+    if view == 'card':
+        requested = set(CARD_SOURCE_FIELDS)
+    elif fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - PAPER_FIELDS
+        if unknown:
+            raise PaginationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    elif view not in (None, 'full'):
+        raise PaginationError('view must be card or full')
+    else:
+        return dict(DEFAULT_PROJECTION)
+    # The cursor is built from these two, so they are always fetched
+    requested |= {'coreId', 'publishedDate'}
+    return {'_id': 0, **{field: 1 for field in requested}}
+
+
+def to_card(paper):
+    """Compact representation for the swipe deck"""
+    authors = paper.get('authors') or []
+    abstract = paper.get('abstract') or ''
+    return {
+        'coreId': paper.get('coreId'),
+        'title': paper.get('title'),
+        'authors': authors[:3],
+        'moreAuthors': max(0, len(authors) - 3),
+        'publishedDate': paper.get('publishedDate'),
+        'abstract': abstract[:CARD_ABSTRACT_CHARS] + ('…' if len(abstract) > CARD_ABSTRACT_CHARS else ''),
+        'link': paper.get('downloadUrl') or next(iter(paper.get('sourceFulltextUrls') or []), ''),
+        'doi': paper.get('doi') or '',
+        'pageCount': paper.get('pageCount'),
+        'keywords': paper.get('keywords') or []
+    }
+
+
+def serialize_dates(paper):
+    # Convert datetime.date or datetime.datetime to ISO string
+    for key in ['fetchedDate', 'publishedDate', 'fetchedAt']:
+        if key in paper and isinstance(paper[key], (datetime, date)):
+            paper[key] = paper[key].isoformat()
+    return paper
+
+
+def listing_query(query, args, default_limit):
+    """Translate request args into (filter, projection, sort, limit, view) for a listing"""
+    limit = parse_limit(args.get('limit'), default_limit)
+    view = args.get('view')
+    projection = build_projection(args.get('fields'), view)
+    return keyset_query(query, args.get('cursor')), projection, LISTING_SORT, limit, view
+
+
+def finish_page(papers, limit, view):
+    """Trim the limit + 1 fetched documents to a page and its next cursor"""
+    next_cursor = None
+    if len(papers) > limit:
+        papers = papers[:limit]
+        next_cursor = encode_cursor(papers[-1])
+    if view == 'card':
+        papers = [to_card(paper) for paper in papers]
+    return papers, next_cursor
+
+
+class UnseenPage:
+    """Builds a listing page that skips the papers in a user's seen-set.
+
+    Batches are read in listing order, each twice the size of the last, until the
+    page is full or SEEN_SCAN_ROUNDS batches were read; in the latter case the
+    next cursor points past the last paper scanned, so nothing is skipped twice.
+    """
+
+    def __init__(self, query, args, default_limit, seen):
+        self.query = query
+        self.next_query, self.projection, self.sort, self.limit, self.view = listing_query(query, args, default_limit)
+        self.seen = seen
+        self.papers = []
+        self.batch_size = self.limit + 1
+        self.rounds = 0
+        self.last_scanned = None
+        self.exhausted = False
+
+    def wants_more(self):
+        return not self.exhausted and len(self.papers) <= self.limit and self.rounds < SEEN_SCAN_ROUNDS
+
+    def add(self, batch):
+        self.rounds += 1
+        for paper in batch:
+            self.last_scanned = paper
+            if paper.get('coreId') not in self.seen:
+                self.papers.append(paper)
+                if len(self.papers) > self.limit:
+                    return
+        if len(batch) < self.batch_size:
+            self.exhausted = True
+            return
+        self.next_query = keyset_query(self.query, encode_cursor(self.last_scanned))
+        self.batch_size *= 2
+
+    def finish(self):
+        papers, next_cursor = finish_page(self.papers, self.limit, self.view)
+        if next_cursor is None and not self.exhausted and self.last_scanned is not None:
+            next_cursor = encode_cursor(self.last_scanned)
+        return papers, next_cursor
+
+
+def paginate(collection, query, args, default_limit, seen=None):
+    """Run a keyset-paginated listing query from request args.
+
+    Returns (papers, next_cursor); papers are stored documents, or cards for ?view=card.
+    With a seen-set, papers the user already swiped are left out (see UnseenPage).
+    """
+    if seen is not None:
+        page = UnseenPage(query, args, default_limit, seen)
+        while page.wants_more():
+            page.add(list(collection.find(page.next_query, page.projection).sort(page.sort).limit(page.batch_size)))
+        return page.finish()
+    query, projection, sort, limit, view = listing_query(query, args, default_limit)
+    papers = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+    return finish_page(papers, limit, view)
@@ -0,0 +1,126 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Items (CORE pages) buffered between two stages before the upstream stage blocks
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline: func maps an item to the next item, or None to drop it"""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._running = 0
+
+
+class Pipeline:
+    """Push items from a source iterator through stages joined by bounded queues.
+
+    Each stage runs in its own worker threads. A full queue blocks the stage
+    feeding it, so at most PIPELINE_QUEUE_SIZE items wait between two stages and
+    throughput is set by the slowest stage. stop() closes the source and lets the
+    items already queued drain without being processed; they are kept in skipped.
+
+    Items are batches (lists). With a metrics object (metrics.RunMetrics), the
+    time spent waiting on the source is reported as the 'fetch' stage and every
+    stage call is reported with its batch sizes in and out.
+    """
+
+    def __init__(self, source, stages, queue_size=PIPELINE_QUEUE_SIZE, metrics=None):
+        self.source = source
+        self.metrics = metrics
+        self.stages = list(stages)
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in self.stages]
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self.skipped = []
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _feed(self):
+        first = self.queues[0]
+        items = iter(self.source)
+        try:
+            while not self._stopped.is_set():
+                started = time.perf_counter()
+                item = next(items, _DONE)
+                if item is _DONE:
+                    break
+                if self.metrics is not None:
+                    self.metrics.observe_stage('fetch', time.perf_counter() - started, len(item), len(item))
+                first.put(item)
+        except Exception as e:
+            logger.error(f"Pipeline source failed: {e}")
+        finally:
+            close = getattr(self.source, 'close', None)
+            if close is not None:
+                close()
+            first.put(_DONE)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # Leave the marker for sibling workers; the last one passes it downstream
+                inbox.put(_DONE)
+                with self._lock:
+                    stage._running -= 1
+                    last = stage._running == 0
+                if last and outbox is not None:
+                    outbox.put(_DONE)
+                return
+            if self._stopped.is_set():
+                with self._lock:
+                    self.skipped.append(item)
+                continue
+            started = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                with self._lock:
+                    stage.failed += 1
+                logger.warning(f"Pipeline stage {stage.name} failed on an item: {e}")
+                continue
+            if self.metrics is not None:
+                self.metrics.observe_stage(stage.name, time.perf_counter() - started,
+                                           len(item), len(result) if result else 0)
+            with self._lock:
+                stage.processed += 1
+                if result is None:
+                    stage.dropped += 1
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    def run(self):
+        """Run until the source is exhausted (or stop() is called) and every stage drained"""
+        threads = [threading.Thread(target=self._feed, name='pipeline-source', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            stage._running = stage.workers
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(index,), name=f'pipeline-{stage.name}-{n}', daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,28 @@
+# Where papers and their statistics are stored, chosen by STORAGE_BACKEND:
+#   mongo  - MongoDB / Atlas (default), mongo.py
+#   sqlite - an embedded SQLite file at SQLITE_PATH, sqlite.py
+# Only papers move: vectors, stream events, seen-sets, checkpoints, job locks and
+# pipeline metrics stay in MongoDB with either backend, so MongoDB is always needed.
+# SQLite is a serving backend: the Flask app reads papers from a file filled by the
+# dump loader (ingest/dump.py); the ingestion worker (scheduler.py) refuses to start
+# on it, and it implements none of the worker's update, promotion or retention writes.
+import os
+
+from .base import PaperRepository
+from .mongo import MongoPaperRepository, promotion_candidates_pipeline
+from .sqlite import SQLITE_PATH, SqlitePaperRepository
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+
+
+def create_repository(backend=STORAGE_BACKEND):
+    """The configured PaperRepository; neither backend does any I/O until first used"""
+    if backend == 'mongo':
+        from database import db
+        return MongoPaperRepository(db)
+    if backend == 'sqlite':
+        return SqlitePaperRepository(SQLITE_PATH)
+    raise RuntimeError(f"STORAGE_BACKEND must be mongo or sqlite, not {backend!r}")
+
+
+paper_repository = create_repository()
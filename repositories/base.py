@@ -0,0 +1,95 @@
+from abc import ABC, abstractmethod
+
+
+class PaperRepository(ABC):
+    """Storage for papers and the statistics derived from them.
+
+    The web routes, the ingestion runner, the dump loader and the scheduler jobs
+    read and write papers through this interface rather than through a MongoDB
+    collection, so the backend can be swapped by configuration (see
+    repositories.create_repository). Only backends the ingestion worker runs on
+    implement its record_update, promote_papers and delete_papers_fetched_before.
+    Paper documents have the shape built by ingest.papers.build_paper_doc;
+    projections are the dicts returned by pagination.build_projection.
+    """
+
+    name = None
+    # Whether search_papers is available; otherwise routes use the in-process search_index
+    supports_text_search = False
+
+    # Listings and lookups
+
+    @abstractmethod
+    def list_papers(self, today_str, args, default_limit, domain=None, seen=None):
+        """One keyset page of today's papers (fetched or promoted today), optionally for one domain.
+
+        args are the request args (limit, cursor, fields, view); papers in seen
+        are skipped. Returns (papers, next_cursor) like pagination.paginate.
+        """
+
+    @abstractmethod
+    def find_papers(self, core_ids, projection, domain=None):
+        """{coreId: paper} for the given ids, restricted to domain if given"""
+
+    def search_papers(self, query, limit, domain=None):
+        """[(coreId, score)] best first; only backends that set supports_text_search implement it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def daily_stats(self, today_str):
+        """(today's counts {'total', 'domains'}, the newest update_stats entry or None)"""
+
+    @abstractmethod
+    def recent_papers(self, limit, projection):
+        """The limit most recently fetched papers, newest first"""
+
+    @abstractmethod
+    def count_papers(self):
+        """Number of stored papers, from metadata where the backend keeps one"""
+
+    @abstractmethod
+    def data_version(self):
+        """Counter bumped after every committed write that changes what routes return"""
+
+    @abstractmethod
+    def resync_count(self):
+        """Counter bumped by bump_data_version(resync=True); in-process indexes resync fully when it moves"""
+
+    # Ingestion
+
+    @abstractmethod
+    def known_core_ids(self, core_ids):
+        """The subset of core_ids already stored, as a paper or as a duplicate alias"""
+
+    @abstractmethod
+    def duplicate_candidates(self, band_keys, dois):
+        """Stored papers sharing an LSH band key or a DOI: coreId, doi, minhash and lshBands"""
+
+    @abstractmethod
+    def add_aliases(self, aliases):
+        """Record [(canonical coreId, duplicate coreId)] so later fetches skip the duplicates"""
+
+    @abstractmethod
+    def upsert_papers(self, paper_docs):
+        """Insert or update papers by coreId; returns (upserted, modified, indexes that failed)"""
+
+    @abstractmethod
+    def bump_data_version(self, resync=False):
+        """Record a committed write; resync when it stored papers dated behind stored ones (a bulk load)"""
+
+    # Ingestion worker (scheduler.py), which only runs on MongoDB
+
+    def record_update(self, update_stats, today_str):
+        """Store one ingestion run's update_stats entry and fold it into today's counts"""
+        raise NotImplementedError
+
+    def promote_papers(self, domains, today_str, limit_per_domain):
+        """Show the least recently promoted older papers of each domain again today.
+
+        Returns ({domain: [coreId]}, number of papers promoted).
+        """
+        raise NotImplementedError
+
+    def delete_papers_fetched_before(self, cutoff):
+        """Remove papers fetched before cutoff that have an expiresAt; returns how many were removed"""
+        raise NotImplementedError
@@ -0,0 +1,171 @@
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from pagination import paginate
+from response_cache import DATA_VERSION_ID, bump_data_version
+from stats import load_daily_stats, record_daily_counts, record_last_update
+
+from .base import PaperRepository
+
+logger = logging.getLogger(__name__)
+
+
+def promotion_candidates_pipeline(domains, today_str, limit_per_domain, use_top_n=True):
+    """Aggregation picking, per domain, the least recently promoted papers not shown today.
+
+    Never-promoted papers (no lastPromotedDate, which sorts first) go before the rest,
+    oldest fetchedAt first. $topN keeps only limit_per_domain ids per group on the
+    server; servers older than 5.2 get the equivalent $sort / $push / $slice.
+    """
+    order = {'lastPromotedDate': 1, 'fetchedAt': 1, 'coreId': 1}
+    stages = [
+        {'$match': {
+            'domains': {'$in': domains},
+            'fetchedDate': {'$ne': today_str},
+            'promotedDates': {'$ne': today_str}
+        }},
+        {'$project': {'_id': 0, 'coreId': 1, 'domains': 1, 'lastPromotedDate': 1, 'fetchedAt': 1}},
+        {'$unwind': '$domains'},
+        {'$match': {'domains': {'$in': domains}}},
+    ]
+    if use_top_n:
+        stages.append({'$group': {'_id': '$domains', 'coreIds': {
+            '$topN': {'n': limit_per_domain, 'sortBy': order, 'output': '$coreId'}
+        }}})
+    else:
+        stages += [
+            {'$sort': order},
+            {'$group': {'_id': '$domains', 'coreIds': {'$push': '$coreId'}}},
+            {'$project': {'coreIds': {'$slice': ['$coreIds', limit_per_domain]}}},
+        ]
+    return stages
+
+
+def today_query(today_str, domain=None):
+    """Papers fetched today or promoted for today"""
+    query = {'$or': [{'fetchedDate': today_str}, {'promotedDates': today_str}]}
+    if domain:
+        query['domains'] = domain
+    return query
+
+
+class MongoPaperRepository(PaperRepository):
+    """Papers in MongoDB (Atlas): the papers, update_stats, daily_counts and ingest_meta collections"""
+
+    name = 'mongo'
+
+    def __init__(self, db):
+        self.db = db
+        self.papers = db['papers']
+
+    def list_papers(self, today_str, args, default_limit, domain=None, seen=None):
+        return paginate(self.papers, today_query(today_str, domain), args, default_limit, seen=seen)
+
+    def find_papers(self, core_ids, projection, domain=None):
+        query = {'coreId': {'$in': list(core_ids)}}
+        if domain:
+            query['domains'] = domain
+        return {doc['coreId']: doc for doc in self.papers.find(query, projection)}
+
+    def daily_stats(self, today_str):
+        # Today's counts and the last update statistics come from one lookup
+        counts, last_update = load_daily_stats(self.db['daily_counts'], self.papers, today_str)
+        if last_update is None:
+            last_update = self.db['update_stats'].find_one(sort=[('timestamp', -1)])
+        return counts, last_update
+
+    def recent_papers(self, limit, projection):
+        return list(self.papers.find({}, projection).sort('fetchedAt', -1).limit(limit))
+
+    def count_papers(self):
+        # Collection metadata count; no scan of the papers collection
+        return self.papers.estimated_document_count()
+
+    def data_version(self):
+        doc = self.db['ingest_meta'].find_one({'_id': DATA_VERSION_ID}, {'version': 1})
+        return (doc or {}).get('version', 0)
+
+    def resync_count(self):
+        doc = self.db['ingest_meta'].find_one({'_id': DATA_VERSION_ID}, {'resync': 1})
+        return (doc or {}).get('resync', 0)
+
+    def known_core_ids(self, core_ids):
+        ids = list(core_ids)
+        known = set()
+        for doc in self.papers.find(
+            {'$or': [{'coreId': {'$in': ids}}, {'aliasIds': {'$in': ids}}]},
+            {'coreId': 1, 'aliasIds': 1, '_id': 0}
+        ):
+            known.add(doc['coreId'])
+            known.update(doc.get('aliasIds') or [])
+        return known
+
+    def duplicate_candidates(self, band_keys, dois):
+        clauses = []
+        if band_keys:
+            clauses.append({'lshBands': {'$in': list(band_keys)}})
+        if dois:
+            clauses.append({'doi': {'$in': list(dois)}})
+        if not clauses:
+            return []
+        return list(self.papers.find(
+            {'$or': clauses} if len(clauses) > 1 else clauses[0],
+            {'_id': 0, 'coreId': 1, 'doi': 1, 'minhash': 1, 'lshBands': 1}
+        ))
+
+    def add_aliases(self, aliases):
+        if aliases:
+            self.papers.bulk_write([
+                UpdateOne({'coreId': canonical}, {'$addToSet': {'aliasIds': alias}})
+                for canonical, alias in aliases
+            ], ordered=False)
+
+    def upsert_papers(self, paper_docs):
+        operations = [UpdateOne({'coreId': doc['coreId']}, {'$set': doc}, upsert=True) for doc in paper_docs]
+        try:
+            result = self.papers.bulk_write(operations, ordered=False)
+            return result.upserted_count, result.modified_count, set()
+        except BulkWriteError as e:
+            details = e.details or {}
+            failed = {err.get('index') for err in details.get('writeErrors', [])}
+            return details.get('nUpserted', 0), details.get('nModified', 0), failed
+
+    def record_update(self, update_stats, today_str):
+        self.db['update_stats'].insert_one(update_stats)
+        record_daily_counts(self.db['daily_counts'], self.papers, today_str,
+                            update_stats['total_papers'], update_stats['domain_stats'])
+        record_last_update(self.db['daily_counts'], update_stats)
+
+    def bump_data_version(self, resync=False):
+        bump_data_version(self.db['ingest_meta'], resync=resync)
+
+    def promote_papers(self, domains, today_str, limit_per_domain):
+        """One aggregation selects every domain's candidates, one update_many promotes them.
+
+        The listings match fetchedDate or promotedDates, so promotion never copies a paper.
+        """
+        try:
+            groups = list(self.papers.aggregate(
+                promotion_candidates_pipeline(domains, today_str, limit_per_domain)))
+        except OperationFailure as e:
+            logger.info(f"$topN unavailable ({e}); selecting promotion candidates with $push/$slice")
+            groups = list(self.papers.aggregate(
+                promotion_candidates_pipeline(domains, today_str, limit_per_domain, use_top_n=False),
+                allowDiskUse=True))
+
+        # A paper in several domains can be picked by more than one of them
+        core_ids = list({core_id for group in groups for core_id in group['coreIds']})
+        promoted = 0
+        if core_ids:
+            result = self.papers.update_many(
+                {'coreId': {'$in': core_ids}},
+                {'$addToSet': {'promotedDates': today_str}, '$set': {'lastPromotedDate': today_str}}
+            )
+            promoted = result.modified_count
+        return {group['_id']: group['coreIds'] for group in groups}, promoted
+
+    def delete_papers_fetched_before(self, cutoff):
+        # Papers without an expiry (dump loads) are kept, as by the expiresAt TTL index
+        return self.papers.delete_many({'fetchedAt': {'$lt': cutoff}, 'expiresAt': {'$ne': None}}).deleted_count
@@ -0,0 +1,314 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from pagination import UnseenPage, decode_cursor, finish_page, listing_query
+from search_index import tokenize
+
+from .base import PaperRepository
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'paper_swiper.db')
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv('SQLITE_BUSY_TIMEOUT_SECONDS', '5'))
+# Page cache per connection; the working set of a 30-day corpus fits comfortably
+SQLITE_CACHE_KIB = int(os.getenv('SQLITE_CACHE_KIB', '65536'))
+
+# Paper fields kept in their own columns and tables rather than in the JSON document
+DEDUP_FIELDS = ('_id', 'minhash', 'lshBands', 'aliasIds')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    core_id INTEGER PRIMARY KEY,
+    published_date TEXT,
+    fetched_date TEXT,
+    fetched_at TEXT,
+    doi TEXT,
+    minhash BLOB,
+    lsh_bands TEXT,
+    doc TEXT NOT NULL
+);
+-- Today's listings: fetchedDate equality, then the listing order
+CREATE INDEX IF NOT EXISTS papers_fetched_date_listing ON papers (fetched_date, published_date DESC, core_id DESC);
+-- Most recently fetched papers
+CREATE INDEX IF NOT EXISTS papers_fetched_at ON papers (fetched_at);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (doi) WHERE doi <> '';
+
+CREATE TABLE IF NOT EXISTS paper_domains (
+    domain TEXT NOT NULL,
+    core_id INTEGER NOT NULL,
+    PRIMARY KEY (domain, core_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_domains_core_id ON paper_domains (core_id);
+
+-- Near-duplicate detection: LSH band lookups and known duplicate ids
+CREATE TABLE IF NOT EXISTS paper_bands (
+    band INTEGER NOT NULL,
+    core_id INTEGER NOT NULL,
+    PRIMARY KEY (band, core_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_bands_core_id ON paper_bands (core_id);
+
+CREATE TABLE IF NOT EXISTS paper_aliases (
+    alias_id INTEGER PRIMARY KEY,
+    core_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paper_aliases_core_id ON paper_aliases (core_id);
+
+-- Full-text search, rowid = coreId
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(title, abstract, keywords, tokenize = 'porter unicode61');
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Dependent rows of a paper, removed with it
+PAPER_TABLES = ('paper_domains', 'paper_bands', 'paper_aliases')
+
+
+def _text(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _dumps(doc):
+    return json.dumps(doc, separators=(',', ':'), default=_text)
+
+
+def _project(doc, projection):
+    """Apply a pagination.build_projection dict to a stored document"""
+    included = {field for field, flag in projection.items() if flag and field != '_id'}
+    if included:
+        return {field: value for field, value in doc.items() if field in included}
+    excluded = {field for field, flag in projection.items() if not flag}
+    return {field: value for field, value in doc.items() if field not in excluded}
+
+
+class SqlitePaperRepository(PaperRepository):
+    """Papers in an embedded SQLite database that the web app serves from.
+
+    The file is filled by the dump loader (ingest/dump.py) or the benchmark
+    suite, never by the ingestion worker, so there are no promotions, update
+    statistics or retention sweeps: the file holds what was last loaded. It is
+    opened in WAL mode, so web workers keep reading during a load. Each paper is
+    one row holding its JSON document, with the fields the queries filter and
+    sort on in indexed columns; domains, LSH bands and aliases live in their
+    own tables, and an FTS5 table serves /api/search. Counts are computed from
+    the indexes directly, so there is no materialized daily_counts equivalent.
+    """
+
+    name = 'sqlite'
+    supports_text_search = True
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            # Durable at each checkpoint rather than each commit; the WAL keeps the file consistent
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KIB}')
+            conn.execute('PRAGMA temp_store = MEMORY')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        # Take the write lock up front so a transaction never fails halfway on SQLITE_BUSY
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _listing_batch(self, today_str, domain, after, batch_size, projection):
+        sql = ["""SELECT doc FROM papers
+                  WHERE fetched_date = ?"""]
+        params = [today_str]
+        if domain:
+            sql.append('AND core_id IN (SELECT core_id FROM paper_domains WHERE domain = ?)')
+            params.append(domain)
+        if after is not None:
+            published_date, core_id = after
+            sql.append('AND (published_date < ? OR (published_date = ? AND core_id < ?))')
+            params += [published_date, published_date, core_id]
+        sql.append('ORDER BY published_date DESC, core_id DESC LIMIT ?')
+        params.append(batch_size)
+        rows = self._connection().execute(' '.join(sql), params)
+        return [_project(json.loads(doc), projection) for doc, in rows]
+
+    def list_papers(self, today_str, args, default_limit, domain=None, seen=None):
+        _, projection, _, limit, view = listing_query({}, args, default_limit)
+        after = decode_cursor(args['cursor']) if args.get('cursor') else None
+        if seen is None:
+            papers = self._listing_batch(today_str, domain, after, limit + 1, projection)
+            return finish_page(papers, limit, view)
+        page = UnseenPage({}, args, default_limit, seen)
+        while page.wants_more():
+            page.add(self._listing_batch(today_str, domain, after, page.batch_size, projection))
+            if page.last_scanned is not None:
+                after = (page.last_scanned.get('publishedDate'), page.last_scanned.get('coreId'))
+        return page.finish()
+
+    def find_papers(self, core_ids, projection, domain=None):
+        sql = 'SELECT doc FROM papers WHERE core_id IN (SELECT value FROM json_each(?))'
+        params = [json.dumps(list(core_ids))]
+        if domain:
+            sql += ' AND core_id IN (SELECT core_id FROM paper_domains WHERE domain = ?)'
+            params.append(domain)
+        docs = (json.loads(doc) for doc, in self._connection().execute(sql, params))
+        return {doc['coreId']: _project(doc, projection) for doc in docs}
+
+    def search_papers(self, query, limit, domain=None):
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        # Any term may match, as in search_index; quoting keeps user input out of the FTS5 syntax
+        match = ' OR '.join('"' + term.replace('"', '""') + '"' for term in terms)
+        sql = 'SELECT rowid, bm25(papers_fts) AS rank FROM papers_fts WHERE papers_fts MATCH ?'
+        params = [match]
+        if domain:
+            sql += ' AND rowid IN (SELECT core_id FROM paper_domains WHERE domain = ?)'
+            params.append(domain)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+        # bm25() is lower-is-better; routes expect higher-is-better scores
+        return [(core_id, -rank) for core_id, rank in self._connection().execute(sql, params)]
+
+    def daily_stats(self, today_str):
+        conn = self._connection()
+        total = conn.execute('SELECT count(*) FROM papers WHERE fetched_date = ?', (today_str,)).fetchone()[0]
+        domains = dict(conn.execute(
+            """SELECT d.domain, count(*) FROM papers p JOIN paper_domains d ON d.core_id = p.core_id
+               WHERE p.fetched_date = ? GROUP BY d.domain""", (today_str,)))
+        # No ingestion runs write here, so there is no last update entry
+        return {'total': total, 'domains': domains}, None
+
+    def recent_papers(self, limit, projection):
+        rows = self._connection().execute('SELECT doc FROM papers ORDER BY fetched_at DESC LIMIT ?', (limit,))
+        return [_project(json.loads(doc), projection) for doc, in rows]
+
+    def count_papers(self):
+        return self._connection().execute('SELECT count(*) FROM papers').fetchone()[0]
+
+    def data_version(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def resync_count(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'resync_count'").fetchone()
+        return row[0] if row else 0
+
+    def known_core_ids(self, core_ids):
+        ids = json.dumps(list(core_ids))
+        rows = self._connection().execute(
+            """SELECT core_id FROM papers WHERE core_id IN (SELECT value FROM json_each(?))
+               UNION SELECT alias_id FROM paper_aliases WHERE alias_id IN (SELECT value FROM json_each(?))""",
+            (ids, ids))
+        return {core_id for core_id, in rows}
+
+    def duplicate_candidates(self, band_keys, dois):
+        if not band_keys and not dois:
+            return []
+        rows = self._connection().execute(
+            """SELECT core_id, doi, minhash, lsh_bands FROM papers
+               WHERE core_id IN (SELECT core_id FROM paper_bands WHERE band IN (SELECT value FROM json_each(?)))
+                  OR doi IN (SELECT value FROM json_each(?))""",
+            (json.dumps([int(key) for key in band_keys]), json.dumps(list(dois))))
+        return [
+            {'coreId': core_id, 'doi': doi, 'minhash': minhash, 'lshBands': json.loads(bands) if bands else []}
+            for core_id, doi, minhash, bands in rows
+        ]
+
+    def add_aliases(self, aliases):
+        if aliases:
+            with self._transaction() as conn:
+                conn.executemany('INSERT OR IGNORE INTO paper_aliases (alias_id, core_id) VALUES (?, ?)',
+                                 [(alias, canonical) for canonical, alias in aliases])
+
+    def _write_paper(self, conn, doc, minhash, bands):
+        core_id = doc['coreId']
+        conn.execute(
+            """INSERT INTO papers (core_id, published_date, fetched_date, fetched_at, doi, minhash, lsh_bands, doc)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (core_id) DO UPDATE SET
+                   published_date = excluded.published_date, fetched_date = excluded.fetched_date,
+                   fetched_at = excluded.fetched_at, doi = excluded.doi,
+                   minhash = coalesce(excluded.minhash, minhash), lsh_bands = coalesce(excluded.lsh_bands, lsh_bands),
+                   doc = excluded.doc""",
+            (core_id, _text(doc.get('publishedDate')), doc.get('fetchedDate'), _text(doc.get('fetchedAt')),
+             doc.get('doi') or '', minhash,
+             json.dumps([int(band) for band in bands]) if bands is not None else None, _dumps(doc)))
+        conn.execute('DELETE FROM paper_domains WHERE core_id = ?', (core_id,))
+        conn.executemany('INSERT OR IGNORE INTO paper_domains (domain, core_id) VALUES (?, ?)',
+                         [(domain, core_id) for domain in doc.get('domains') or []])
+        if bands is not None:
+            conn.execute('DELETE FROM paper_bands WHERE core_id = ?', (core_id,))
+            conn.executemany('INSERT OR IGNORE INTO paper_bands (band, core_id) VALUES (?, ?)',
+                             [(int(band), core_id) for band in bands])
+        conn.execute('DELETE FROM papers_fts WHERE rowid = ?', (core_id,))
+        conn.execute('INSERT INTO papers_fts (rowid, title, abstract, keywords) VALUES (?, ?, ?, ?)',
+                     (core_id, doc.get('title') or '', doc.get('abstract') or '',
+                      ' '.join(doc.get('keywords') or [])))
+
+    def upsert_papers(self, paper_docs):
+        upserted = modified = 0
+        failed = set()
+        with self._transaction() as conn:
+            existing = {core_id: json.loads(doc) for core_id, doc in conn.execute(
+                'SELECT core_id, doc FROM papers WHERE core_id IN (SELECT value FROM json_each(?))',
+                (json.dumps([doc.get('coreId') for doc in paper_docs]),))}
+            for index, paper_doc in enumerate(paper_docs):
+                core_id = paper_doc.get('coreId')
+                # Fields the new document does not carry are kept, as with $set
+                doc = {**existing.get(core_id, {}),
+                       **{field: value for field, value in paper_doc.items() if field not in DEDUP_FIELDS}}
+                conn.execute('SAVEPOINT paper')
+                try:
+                    self._write_paper(conn, doc, paper_doc.get('minhash'), paper_doc.get('lshBands'))
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    conn.execute('ROLLBACK TO paper')
+                    conn.execute('RELEASE paper')
+                    logger.warning(f"Could not store paper {core_id}: {e}")
+                    failed.add(index)
+                    continue
+                conn.execute('RELEASE paper')
+                if core_id in existing:
+                    modified += 1
+                else:
+                    upserted += 1
+                    existing[core_id] = doc
+        return upserted, modified, failed
+
+    def bump_data_version(self, resync=False):
+        keys = ('data_version', 'resync_count') if resync else ('data_version',)
+        with self._transaction() as conn:
+            for key in keys:
+                conn.execute("""INSERT INTO meta (key, value) VALUES (?, 1)
+                                ON CONFLICT (key) DO UPDATE SET value = value + 1""", (key,))
+
+    def clear(self):
+        """Delete every paper (the benchmark suite reseeds between corpus sizes)"""
+        with self._transaction() as conn:
+            for table in ('papers', 'papers_fts') + PAPER_TABLES:
+                conn.execute(f'DELETE FROM {table}')
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '512'))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+# How often a web worker re-reads the data version written by the ingestion worker
+DATA_VERSION_CHECK_SECONDS = int(os.getenv('DATA_VERSION_CHECK_SECONDS', '15'))
+CLIENT_MAX_AGE = int(os.getenv('CLIENT_MAX_AGE', '60'))
+
+DATA_VERSION_ID = 'papers'
+
+
+def bump_data_version(collection, resync=False):
+    """Record that ingestion committed new papers; web workers drop cached responses.
+
+    resync also bumps the resync counter, for writes that store papers dated behind
+    what the in-process search and vector indexes already synced (bulk loads).
+    """
+    increments = {'version': 1, 'resync': 1} if resync else {'version': 1}
+    collection.update_one(
+        {'_id': DATA_VERSION_ID},
+        {'$inc': increments, '$set': {'updatedAt': datetime.now()}},
+        upsert=True
+    )
+
+
+class ResponseCache:
+    """TTL + LRU cache of serialized JSON responses, keyed on route, query and date.
+
+    Entries are tagged with the data version returned by read_version (the paper
+    repository's data_version). Ingestion bumps that version after every commit, and workers poll it at most once per
+    DATA_VERSION_CHECK_SECONDS, so stale listings disappear within seconds without
+    every request touching the database.
+    """
+
+    def __init__(self, read_version=None, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL,
+                 version_check_seconds=DATA_VERSION_CHECK_SECONDS):
+        self.read_version = read_version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_seconds = version_check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self):
+        now = time.monotonic()
+        if self.read_version is not None and now - self._version_checked >= self.version_check_seconds:
+            self._version_checked = now
+            try:
+                self._version = self.read_version()
+            except Exception as e:
+                logger.warning(f"Could not read data version, keeping {self._version}: {e}")
+        return self._version
+
+    def set_data_version(self, version):
+        """Push a data version read elsewhere (the async server polls it in the background)"""
+        self._version = version
+        self._version_checked = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        version = self.data_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, entry_version, body, etag = entry
+            if expires < time.monotonic() or entry_version != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body, etag
+
+    def set(self, key, body):
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, self._version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag
+
+    def cached(self, view):
+        """Decorator for JSON views: serve cached bytes with ETag / 304 support"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            today_str = datetime.now().date().isoformat()
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), today_str)
+
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                body, etag = cached
+                response = current_app.response_class(body, mimetype='application/json')
+            else:
+                self.misses += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = self.set(key, body)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = f'public, max-age={CLIENT_MAX_AGE}'
+            return response.make_conditional(request)
+        return wrapper
+
+    def cached_unless(self, personal):
+        """Like cached, but requests for which personal() is truthy bypass the shared cache.
+
+        personal() is evaluated per request, so the same client is served from the
+        shared cache until it has something personal (a non-empty seen-set).
+        """
+        def decorator(view):
+            cached_view = self.cached(view)
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not personal():
+                    response = cached_view(*args, **kwargs)
+                    # The client's next request may be personalised (after a swipe), so browsers revalidate
+                    response.headers['Cache-Control'] = 'no-cache'
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    response.headers['Cache-Control'] = 'private, no-store'
+                # Shared caches must not hand an anonymous page to a personalised request
+                response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
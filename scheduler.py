@@ -1,12 +1,16 @@
-import requests
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
 import logging
-import os
 from dotenv import load_dotenv
-from langdetect import detect, LangDetectException
-from pymongo.errors import DuplicateKeyError
+from database import db, wait_for_database
+from domains import DOMAIN_KEYWORDS
+from events import PAPER_EVENTS_COLLECTION, publish_paper_event
+from ingest import MIN_PAGE_COUNT, domain_matcher, fetch_and_store_papers, fetch_recent_papers, get_paper_vectorizer
+from job_lock import run_exclusive
+from indexes import ensure_indexes, check_query_plans
+from repositories import paper_repository
+from vector_index import recalibrate
 
 # Load environment variables
 load_dotenv()
@@ -15,235 +19,39 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuration
-CORE_API_KEY = os.getenv('CORE_API_KEY')
-CORE_API_URL = "https://api.core.ac.uk/v3/search/works"
-MONGODB_ATLAS_URI = os.getenv('MONGODB_ATLAS_URI')
-MIN_PAGE_COUNT = 15
 
-# Domain keywords (used for selecting old papers to promote when no new papers found)
-DOMAIN_KEYWORDS = {
-    'artificial_intelligence': [
-        "artificial intelligence", "machine learning", "deep learning", "neural network",
-        "natural language processing", "nlp", "llm", "large language model",
-        "transformer", "bert", "gpt", "chatbot"
-    ],
-    'computer_vision': [
-        "computer vision", "object detection", "semantic segmentation",
-        "image processing", "computer graphics", "augmented reality",
-        "virtual reality", "ar vr"
-    ],
-    'data_science': [
-        "data science", "big data", "data mining", "data analytics",
-        "recommendation system", "knowledge graph", "data visualization"
-    ],
-}
-
-# MongoDB Atlas setup
-try:
-    client = MongoClient(MONGODB_ATLAS_URI)
-    client.admin.command('ping')
-    print("✓ Connected to MongoDB Atlas successfully!")
-except Exception as e:
-    print(f"✗ Failed to connect to MongoDB Atlas: {e}")
-    exit(1)
-
-db = client['research_papers']
-papers_collection = db['papers']
-
-def is_english_text(text, threshold=0.7):
-    """
-    Check if text is in English using language detection
-    threshold: confidence level (0.7 = 70% confidence)
-    """
-    if not text or len(text.strip()) < 50:
-        return False
-    
-    try:
-        # Use only abstract for language detection
-        detected_lang = detect(text[:500])  # Use first 500 chars
-        return detected_lang == 'en'
-    except LangDetectException:
-        return False
+def promote_old_papers(limit_per_domain=10):
+    """When no new papers are found, show older domain-similar papers again today.
 
-def get_page_count(paper_data):
+    The repository selects the candidates for every domain in one query and adds
+    today to their promotion dates in one write (the listings match papers fetched
+    or promoted today), so promotion never copies a paper.
     """
-    Extract page count from paper metadata
-    """
-    try:
-        # CORE API may provide page count info
-        if 'pageCount' in paper_data:
-            return int(paper_data['pageCount'])
-        
-        # Alternative: check source metadata
-        if 'pages' in paper_data:
-            page_str = str(paper_data['pages'])
-            # Extract numbers if format is "10-25"
-            if '-' in page_str:
-                parts = page_str.split('-')
-                if len(parts) == 2:
-                    try:
-                        return int(parts[1]) - int(parts[0])
-                    except ValueError:
-                        return 0
-            else:
-                try:
-                    return int(page_str)
-                except ValueError:
-                    return 0
-        
-        return 0
-    except Exception as e:
-        logger.warning(f"Error extracting page count: {str(e)}")
-        return 0
-
-def fetch_recent_papers():
-    """Fetch recent English papers with minimum page count from CORE API"""
+    today_str = datetime.now().date().isoformat()
+    domains = list(DOMAIN_KEYWORDS.keys())
     try:
-        # Calculate date range (last 7 days for better results)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=7)
-        
-        # CORE API v3 query for recent papers with abstracts
-        query = f"yearPublished>={start_date.year} AND _exists_:abstract"
-        
-        headers = {
-            'Authorization': f'Bearer {CORE_API_KEY}'
-        }
-        
-        # We'll page through the first few pages to catch recent additions.
-        inserted_count = 0
-        filtered_count = 0
-        max_pages = 3
-        per_page = 100
-
-        logger.info("Fetching papers from CORE API (paging)...")
-        for page in range(max_pages):
-            params = {
-                'q': query,
-                'limit': per_page,
-                'offset': page * per_page
-            }
-
-            response = requests.get(CORE_API_URL, headers=headers, params=params, timeout=30)
-            if response.status_code != 200:
-                logger.error(f"CORE API Error on page {page}: {response.status_code} - {response.text}")
-                continue
-
-            data = response.json()
-            papers = data.get('results', [])
-            logger.info(f"Fetched {len(papers)} papers from CORE API (page {page})")
-
-            # Process and store papers in MongoDB Atlas
-            for paper in papers:
-                try:
-                    # Extract data
-                    title = paper.get('title', 'Untitled')
-                    abstract = paper.get('abstract', '')
-                    
-                    # Skip if no abstract
-                    if not abstract:
-                        logger.debug(f"Skipping paper '{title}' - no abstract")
-                        continue
-                    
-                    # Check if English
-                    if not is_english_text(abstract):
-                        filtered_count += 1
-                        logger.debug(f"Skipping non-English paper: {title}")
-                        continue
-                    
-                    # Check page count
-                    page_count = get_page_count(paper)
-                    if page_count < MIN_PAGE_COUNT and page_count > 0:
-                        filtered_count += 1
-                        logger.debug(f"Skipping paper '{title}' - only {page_count} pages (min: {MIN_PAGE_COUNT})")
-                        continue
-                    
-                    # Build paper document
-                    paper_doc = {
-                        'coreId': paper.get('id'),
-                        'title': title,
-                        'abstract': abstract[:500],  # First 500 chars
-                        'authors': [author.get('name', '') for author in paper.get('authors', []) if author.get('name')],
-                        'publishedDate': paper.get('publishedDate', str(datetime.now())),
-                        'downloadUrl': paper.get('downloadUrl', ''),
-                        'sourceFulltextUrls': paper.get('sourceFulltextUrls', []),
-                        'doi': paper.get('doi', ''),
-                        'pageCount': page_count if page_count > 0 else None,
-                        'language': 'English',
-                        'fetchedAt': datetime.now(),
-                        # keep a stable fetchedDate string for easier querying
-                        'fetchedDate': datetime.now().date().isoformat()
-                    }
-                    
-                    # Update or insert paper
-                    result = papers_collection.update_one(
-                        {'coreId': paper_doc['coreId']},
-                        {'$set': paper_doc},
-                        upsert=True
-                    )
-                    
-                    if result.upserted_id or result.modified_count > 0:
-                        inserted_count += 1
-                        logger.info(f"✓ Stored/Updated: {title[:60]}... ({page_count} pages)")
-                        
-                except Exception as e:
-                    logger.warning(f"Error processing paper {paper.get('id')}: {str(e)}")
-                    continue
-            logger.info(f"Successfully stored/updated {inserted_count} English papers (filtered out {filtered_count})")
-            return inserted_count
+        promoted_ids, total_promoted = paper_repository.promote_papers(domains, today_str, limit_per_domain)
     except Exception as e:
-        logger.error(f"Error fetching papers: {str(e)}")
+        logger.warning(f"Error promoting papers: {e}")
         return 0
 
-
-def promote_old_papers(limit_per_domain=10):
-    """When no new papers are found, promote older domain-similar papers by inserting
-    copies with today's fetchedDate so they appear in today's listing. If an insert
-    fails due to a duplicate key, add today to the document's `promotedDates` array.
-    """
-    today_str = datetime.now().date().isoformat()
-    total_promoted = 0
-
-    for domain in DOMAIN_KEYWORDS.keys():
-        try:
-            # Find older papers for this domain (not already marked for today)
-            cursor = papers_collection.find({
-                'domains': domain,
-                'fetchedDate': {'$ne': today_str}
-            }).sort('fetchedAt', 1).limit(limit_per_domain)
-
-            for doc in cursor:
-                promoted = dict(doc)
-                promoted.pop('_id', None)
-                original_date = promoted.get('fetchedDate')
-                promoted['fetchedDate'] = today_str
-                promoted['fetchedAt'] = datetime.now()
-                promoted['promotedFrom'] = original_date
-
-                try:
-                    papers_collection.insert_one(promoted)
-                    total_promoted += 1
-                except DuplicateKeyError:
-                    # If a unique index prevents inserting a duplicate coreId, record promotion
-                    papers_collection.update_one(
-                        {'coreId': promoted.get('coreId')},
-                        {'$addToSet': {'promotedDates': today_str}}
-                    )
-        except Exception as e:
-            logger.warning(f"Error promoting papers for domain {domain}: {e}")
-
+    if total_promoted:
+        paper_repository.bump_data_version()
+        publish_paper_event(db[PAPER_EVENTS_COLLECTION], 'promoted', promoted_ids, today_str)
     logger.info(f"Promoted {total_promoted} papers across domains")
     return total_promoted
 
 def cleanup_old_papers():
-    """Remove papers older than 30 days"""
+    """Remove papers older than 30 days.
+
+    The expiresAt TTL index from indexes.ensure_indexes normally expires these
+    automatically; this remains for manual sweeps. Dump loads, which have no
+    expiresAt, are kept.
+    """
     try:
         cutoff_date = datetime.now() - timedelta(days=30)
-        result = papers_collection.delete_many({
-            'fetchedAt': {'$lt': cutoff_date}
-        })
-        logger.info(f"Cleaned up {result.deleted_count} old papers from MongoDB Atlas")
+        deleted_count = paper_repository.delete_papers_fetched_before(cutoff_date)
+        logger.info(f"Cleaned up {deleted_count} old papers from {paper_repository.name} storage")
     except Exception as e:
         logger.error(f"Error cleaning up papers: {str(e)}")
 
@@ -257,26 +65,60 @@ def daily_update_job():
     # NOTE: per configuration, do not delete stored papers after reading.
     logger.info(f"Update completed. Fetched/updated {papers_count} valid English papers.")
 
-    # If no new papers were added during this fetch, promote some older domain-similar papers
-    # by creating promoted copies with today's fetchedDate so they appear in today's listing.
+    # If no new papers were added during this fetch, promote some older domain-similar papers:
+    # adding today to their promotedDates puts them in today's listing without copying them.
     if papers_count == 0:
         try:
             promote_old_papers()
         except Exception as e:
             logger.error(f"Error during promoting old papers: {e}")
+
+    # Refit the vector domain thresholds against today's keyword labels
+    try:
+        paper_vectorizer = get_paper_vectorizer()
+        recalibrate(paper_repository, paper_vectorizer, domain_matcher)
+        paper_vectorizer.save(db['vector_model'])
+    except Exception as e:
+        logger.error(f"Error calibrating vector domains: {e}")
     logger.info("=" * 70)
 
+def hourly_fetch_job():
+    """Hourly fetch of AI/CS papers (formerly scheduled inside the web app)"""
+    run_exclusive(db['job_locks'], 'hourly_paper_fetch', fetch_and_store_papers)
+
+def locked_daily_update_job():
+    run_exclusive(db['job_locks'], 'daily_update_job', daily_update_job)
+
 if __name__ == '__main__':
-    # Run immediately on start
+    # This process is the single ingestion worker; the web app no longer schedules jobs.
+    # Each job takes a MongoDB lease first, so extra replicas of this worker stay idle.
+    # Its checkpoints, locks, vectors and events live in MongoDB, so SQLite storage is serving-only.
+    if paper_repository.name != 'mongo':
+        raise SystemExit(f"The ingestion worker needs STORAGE_BACKEND=mongo, not {paper_repository.name!r}; "
+                         "SQLite storage only serves papers to the web app")
+    # Wait out a MongoDB that is still starting or failing over instead of exiting at import.
+    if not wait_for_database():
+        raise SystemExit(1)
+    ensure_indexes(db)
+    check_query_plans(db)
+
     logger.info("Running initial fetch...")
-    daily_update_job()
+    locked_daily_update_job()
     
-    # Schedule daily updates at midnight IST
     scheduler = BlockingScheduler()
     # Schedule to run once every 24 hours
-    scheduler.add_job(daily_update_job, 'interval', hours=24)
-
-    logger.info("Scheduler started. Will run every 24 hours.")
+    scheduler.add_job(locked_daily_update_job, 'interval', hours=24, id='daily_update_job')
+    # Fetch AI/CS papers at the start of every hour
+    scheduler.add_job(
+        hourly_fetch_job,
+        trigger=CronTrigger(minute=0, timezone='UTC'),
+        id='hourly_paper_fetch',
+        name='Hourly Paper Fetch from CORE API',
+        max_instances=1,
+        coalesce=True
+    )
+
+    logger.info("Scheduler started. Daily update every 24 hours, paper fetch every hour.")
     try:
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,321 @@
+import logging
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from language import ENGLISH_STOP_WORDS
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', 'search_index.snapshot')
+SEARCH_SNAPSHOT_SECONDS = int(os.getenv('SEARCH_SNAPSHOT_SECONDS', '300'))
+PAPER_RETENTION_DAYS = int(os.getenv('PAPER_RETENTION_DAYS', '30'))
+# fetchedAt is stamped just before a batch is written, so a batch stamped earlier can
+# become visible after a later one; syncs re-read this far behind the watermark
+SYNC_LOOKBACK_SECONDS = int(os.getenv('SYNC_LOOKBACK_SECONDS', '120'))
+
+SNAPSHOT_VERSION = 2
+TITLE_WEIGHT = 2  # title terms are counted this many times
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#\-]*[a-z0-9+#]|[a-z0-9]")
+INDEXED_FIELDS = {'_id': 0, 'coreId': 1, 'title': 1, 'abstract': 1, 'keywords': 1, 'fetchedAt': 1, 'expiresAt': 1}
+
+
+def expiry_timestamp(doc):
+    """Epoch seconds at which a synced paper or vector leaves the index; inf if its expiresAt is None.
+
+    Documents stored before expiresAt existed expire PAPER_RETENTION_DAYS after fetchedAt.
+    """
+    if 'expiresAt' in doc:
+        expires_at = doc['expiresAt']
+        return expires_at.timestamp() if isinstance(expires_at, datetime) else math.inf
+    fetched_at = doc.get('fetchedAt')
+    fetched_ts = fetched_at.timestamp() if isinstance(fetched_at, datetime) else time.time()
+    return fetched_ts + PAPER_RETENTION_DAYS * 24 * 3600
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
+
+
+class SearchIndex:
+    """In-memory BM25 inverted index over paper titles, abstracts and keywords.
+
+    Postings are parallel arrays of (doc number, term frequency) per term, which
+    keeps a 100k-paper corpus in tens of megabytes and lets a query score each
+    term's postings in one NumPy operation. Removed or replaced papers are
+    tombstoned and the postings compacted once tombstones pass a quarter of the docs.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}          # term -> (array of doc numbers, array of tf)
+        self.doc_ids = []           # doc number -> coreId (None once removed)
+        self.doc_lengths = array('I')
+        self.doc_fetched = array('d')  # doc number -> fetchedAt timestamp
+        self.doc_expires = array('d')  # doc number -> expiresAt timestamp (inf: kept)
+        self.alive = bytearray()    # doc number -> 1 while the paper is indexed
+        self.doc_by_id = {}         # coreId -> live doc number
+        self.total_length = 0
+        self.removed = 0
+        self.watermark = None       # newest fetchedAt synced from MongoDB
+        self.data_version = None
+        self.resync_count = None    # repository resync counter the watermark is valid for
+        self._last_snapshot = 0.0
+
+    def __len__(self):
+        return len(self.doc_by_id)
+
+    # -- updates ---------------------------------------------------------------
+
+    def add(self, paper):
+        """Index (or re-index) one paper document"""
+        core_id = paper.get('coreId')
+        if core_id is None:
+            return
+        terms = {}
+        for _ in range(TITLE_WEIGHT):
+            for token in tokenize(paper.get('title') or ''):
+                terms[token] = terms.get(token, 0) + 1
+        for token in tokenize(paper.get('abstract') or ''):
+            terms[token] = terms.get(token, 0) + 1
+        for token in tokenize(' '.join(k for k in paper.get('keywords') or [] if isinstance(k, str))):
+            terms[token] = terms.get(token, 0) + 1
+
+        fetched_at = paper.get('fetchedAt')
+        fetched_ts = fetched_at.timestamp() if isinstance(fetched_at, datetime) else time.time()
+
+        with self._lock:
+            self.remove(core_id)
+            number = len(self.doc_ids)
+            self.doc_ids.append(core_id)
+            length = sum(terms.values())
+            self.doc_lengths.append(length)
+            self.doc_fetched.append(fetched_ts)
+            self.doc_expires.append(expiry_timestamp(paper))
+            self.alive.append(1)
+            self.doc_by_id[core_id] = number
+            self.total_length += length
+            for term, tf in terms.items():
+                entry = self.postings.get(term)
+                if entry is None:
+                    entry = self.postings[term] = (array('I'), array('H'))
+                entry[0].append(number)
+                entry[1].append(min(tf, 65535))
+
+    def remove(self, core_id):
+        with self._lock:
+            number = self.doc_by_id.pop(core_id, None)
+            if number is None:
+                return False
+            self.doc_ids[number] = None
+            self.alive[number] = 0
+            self.total_length -= self.doc_lengths[number]
+            self.removed += 1
+            if self.removed > max(1000, len(self.doc_by_id) // 4):
+                self.compact()
+            return True
+
+    def expire(self, now):
+        """Drop papers whose expiresAt has passed (mirrors the expiresAt TTL index)"""
+        cutoff = now.timestamp()
+        with self._lock:
+            stale = [core_id for core_id, number in self.doc_by_id.items() if self.doc_expires[number] <= cutoff]
+            for core_id in stale:
+                self.remove(core_id)
+        return len(stale)
+
+    def compact(self):
+        """Renumber live documents and drop tombstoned postings"""
+        with self._lock:
+            renumber = {}
+            doc_ids, lengths, fetched, expires = [], array('I'), array('d'), array('d')
+            for number, core_id in enumerate(self.doc_ids):
+                if core_id is not None:
+                    renumber[number] = len(doc_ids)
+                    doc_ids.append(core_id)
+                    lengths.append(self.doc_lengths[number])
+                    fetched.append(self.doc_fetched[number])
+                    expires.append(self.doc_expires[number])
+            postings = {}
+            for term, (numbers, tfs) in self.postings.items():
+                new_numbers, new_tfs = array('I'), array('H')
+                for number, tf in zip(numbers, tfs):
+                    new_number = renumber.get(number)
+                    if new_number is not None:
+                        new_numbers.append(new_number)
+                        new_tfs.append(tf)
+                if new_numbers:
+                    postings[term] = (new_numbers, new_tfs)
+            self.postings = postings
+            self.doc_ids, self.doc_lengths, self.doc_fetched, self.doc_expires = doc_ids, lengths, fetched, expires
+            self.alive = bytearray(b'\x01' * len(doc_ids))
+            self.doc_by_id = {core_id: number for number, core_id in enumerate(doc_ids)}
+            self.removed = 0
+
+    # -- queries ---------------------------------------------------------------
+
+    def search(self, query, limit=20):
+        """Return [(coreId, score)] for the best BM25 matches of query"""
+        terms = set(tokenize(query))
+        with self._lock:
+            live = len(self.doc_by_id)
+            if not terms or not live:
+                return []
+            avg_length = self.total_length / live
+            k1, b = self.k1, self.b
+            lengths = np.array(self.doc_lengths, dtype=np.float32)
+            scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                numbers = np.array(entry[0], dtype=np.int64)
+                tfs = np.array(entry[1], dtype=np.float32)
+                df = len(numbers)
+                idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+                norm = k1 * (1 - b + b * lengths[numbers] / avg_length)
+                # Doc numbers are unique within one term's postings, so += is safe
+                scores[numbers] += idf * tfs * (k1 + 1) / (tfs + norm)
+            scores *= np.frombuffer(bytes(self.alive), dtype=np.uint8)
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [(self.doc_ids[number], float(scores[number])) for number in ranked]
+
+    # -- MongoDB sync and snapshots ---------------------------------------------
+
+    def check_resync(self, resync_count):
+        """Forget the watermark once a bulk load has stored papers dated behind it"""
+        with self._lock:
+            if resync_count == self.resync_count:
+                return
+            if self.watermark is not None:
+                logger.info("Papers were stored behind the search watermark; resyncing the whole index")
+                self.watermark = None
+            self.resync_count = resync_count
+
+    def sync_query(self):
+        """Filter for papers stored since the watermark, less SYNC_LOOKBACK_SECONDS"""
+        if not self.watermark:
+            return {}
+        return {'fetchedAt': {'$gte': self.watermark - timedelta(seconds=SYNC_LOOKBACK_SECONDS)}}
+
+    def apply_sync(self, papers, now=None):
+        """Index papers returned by sync_query (oldest first) and drop those past retention"""
+        now = now or datetime.now()
+        added = 0
+        for paper in papers:
+            fetched_at = paper.get('fetchedAt')
+            number = self.doc_by_id.get(paper.get('coreId'))
+            # The lookback re-reads papers already indexed at this fetchedAt
+            if not (number is not None and isinstance(fetched_at, datetime)
+                    and self.doc_fetched[number] == fetched_at.timestamp()):
+                self.add(paper)
+                added += 1
+            if isinstance(fetched_at, datetime) and (self.watermark is None or fetched_at > self.watermark):
+                self.watermark = fetched_at
+        expired = self.expire(now)
+        if added or expired:
+            logger.info(f"Search index synced: +{added} / -{expired} papers ({len(self)} total)")
+        return added, expired
+
+    def sync(self, papers_collection, now=None):
+        """Pull papers stored since the watermark and drop those past retention"""
+        papers = papers_collection.find(self.sync_query(), INDEXED_FIELDS).sort('fetchedAt', 1)
+        return self.apply_sync(papers, now)
+
+    def mark_synced(self, data_version):
+        """Record the data version the index now reflects; snapshot occasionally"""
+        with self._lock:
+            self.data_version = data_version
+            if time.monotonic() - self._last_snapshot >= SEARCH_SNAPSHOT_SECONDS:
+                self.save()
+
+    def refresh(self, papers_collection, data_version, read_resync_count=None):
+        """Sync when ingestion has committed since the last refresh; snapshot occasionally.
+
+        read_resync_count (the repository's resync_count) is only called when the
+        data version has moved.
+        """
+        if data_version == self.data_version:
+            return
+        with self._lock:
+            if data_version == self.data_version:
+                return
+            if read_resync_count is not None:
+                self.check_resync(read_resync_count())
+            self.sync(papers_collection)
+            self.mark_synced(data_version)
+
+    def save(self, path=SEARCH_INDEX_PATH):
+        with self._lock:
+            if self.removed:
+                self.compact()
+            state = {
+                'version': SNAPSHOT_VERSION,
+                'postings': self.postings,
+                'doc_ids': self.doc_ids,
+                'doc_lengths': self.doc_lengths,
+                'doc_fetched': self.doc_fetched,
+                'doc_expires': self.doc_expires,
+                'total_length': self.total_length,
+                'watermark': self.watermark,
+                'resync_count': self.resync_count,
+            }
+            # A private temp file per save: every web worker process snapshots to the same path
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp',
+                                                dir=os.path.dirname(path) or '.')
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+                self._last_snapshot = time.monotonic()
+            except OSError as e:
+                logger.warning(f"Could not write search snapshot {path}: {e}")
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_PATH):
+        """Restore a snapshot, or return an empty index if there is none"""
+        index = cls()
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return index
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable search snapshot {path}: {e}")
+            return index
+        if state.get('version') != SNAPSHOT_VERSION:
+            return index
+        index.postings = state['postings']
+        index.doc_ids = state['doc_ids']
+        index.doc_lengths = state['doc_lengths']
+        index.doc_fetched = state['doc_fetched']
+        index.doc_expires = state['doc_expires']
+        index.total_length = state['total_length']
+        index.watermark = state['watermark']
+        index.resync_count = state.get('resync_count')
+        index.doc_by_id = {core_id: number for number, core_id in enumerate(index.doc_ids) if core_id is not None}
+        index.alive = bytearray(core_id is not None for core_id in index.doc_ids)
+        index._last_snapshot = time.monotonic()
+        logger.info(f"Loaded search snapshot with {len(index)} papers")
+        return index
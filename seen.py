@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+SEEN_COLLECTION = 'seen_papers'
+SWIPES_COLLECTION = 'swipes'
+# Anonymous per-browser id, set by static/script.js; sent with fetches and beacons alike
+CLIENT_COOKIE = 'paper_client'
+CLIENT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+SWIPE_DIRECTIONS = ('left', 'right')
+SWIPE_BATCH_LIMIT = 100
+
+# Papers per Bloom filter generation: ~2.4 KB at a 1% false-positive rate.
+# A full generation becomes the previous one, so a user costs at most twice that.
+SEEN_CAPACITY = int(os.getenv('SEEN_CAPACITY', '2000'))
+SEEN_ERROR_RATE = float(os.getenv('SEEN_ERROR_RATE', '0.01'))
+# Seen-sets kept in memory per web process, and how long one is trusted before re-reading it
+SEEN_CACHE_USERS = int(os.getenv('SEEN_CACHE_USERS', '5000'))
+SEEN_CACHE_SECONDS = float(os.getenv('SEEN_CACHE_SECONDS', '10'))
+SEEN_WRITE_RETRIES = 5
+
+
+class SwipeError(ValueError):
+    """Raised for a malformed POST /api/swipes body"""
+
+
+def client_id(value):
+    """The client id if it is well formed, else None"""
+    if value and CLIENT_ID_PATTERN.match(value):
+        return value
+    return None
+
+
+def parse_swipes(payload):
+    """[(coreId, direction)] from {'swipes': [{'coreId': 1, 'direction': 'left'}, ...]}"""
+    swipes = (payload or {}).get('swipes') if isinstance(payload, dict) else None
+    if not isinstance(swipes, list) or not swipes:
+        raise SwipeError('swipes must be a non-empty list')
+    if len(swipes) > SWIPE_BATCH_LIMIT:
+        raise SwipeError(f'At most {SWIPE_BATCH_LIMIT} swipes per request')
+    parsed = []
+    for swipe in swipes:
+        core_id = swipe.get('coreId') if isinstance(swipe, dict) else None
+        direction = swipe.get('direction') if isinstance(swipe, dict) else None
+        if not isinstance(core_id, int) or isinstance(core_id, bool) or direction not in SWIPE_DIRECTIONS:
+            raise SwipeError('Each swipe needs an integer coreId and a direction of left or right')
+        parsed.append((core_id, direction))
+    return parsed
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over coreIds; k positions from one blake2b digest (double hashing)"""
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SeenSet:
+    """The papers one user has swiped, as a current and a previous Bloom filter generation"""
+
+    def __init__(self, current=None, previous=None, count=0, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = current or BloomFilter.for_capacity(capacity, error_rate)
+        self.previous = previous
+        self.count = count
+
+    @classmethod
+    def from_doc(cls, doc):
+        if not doc:
+            return cls()
+        num_bits, num_hashes = doc['numBits'], doc['numHashes']
+        previous = doc.get('previous')
+        return cls(
+            BloomFilter(num_bits, num_hashes, doc['current']),
+            BloomFilter(num_bits, num_hashes, previous) if previous is not None else None,
+            doc.get('count', 0)
+        )
+
+    def to_doc(self):
+        return {
+            'numBits': self.current.num_bits,
+            'numHashes': self.current.num_hashes,
+            'current': bytes(self.current.bits),
+            'previous': bytes(self.previous.bits) if self.previous is not None else None,
+            'count': self.count,
+            'updatedAt': datetime.now()
+        }
+
+    def add(self, core_ids):
+        for core_id in core_ids:
+            if core_id in self.current:
+                continue
+            if self.count >= self.capacity:
+                # Papers expire after a month, so the oldest generation can be forgotten
+                self.previous, self.current = self.current, BloomFilter.for_capacity(self.capacity, self.error_rate)
+                self.count = 0
+            self.current.add(core_id)
+            self.count += 1
+
+    @property
+    def empty(self):
+        return self.count == 0 and self.previous is None
+
+    def __contains__(self, core_id):
+        return core_id in self.current or (self.previous is not None and core_id in self.previous)
+
+
+class SeenStore:
+    """Per-user seen-sets in MongoDB behind a bounded in-process LRU.
+
+    Listing routes look a user's set up once per request and test each candidate
+    in O(1); swipes are appended to the swipes collection and folded into the
+    stored set with a revision check, so concurrent workers never lose an update.
+    """
+
+    def __init__(self, collection, swipes_collection, cache_users=SEEN_CACHE_USERS,
+                 cache_seconds=SEEN_CACHE_SECONDS):
+        self.collection = collection
+        self.swipes_collection = swipes_collection
+        self.cache_users = cache_users
+        self.cache_seconds = cache_seconds
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, user):
+        """The user's seen-set if a fresh copy is in memory, else None"""
+        with self._lock:
+            entry = self._cache.get(user)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._cache.move_to_end(user)
+            return entry[1]
+
+    def _remember(self, user, seen):
+        with self._lock:
+            self._cache[user] = (time.monotonic() + self.cache_seconds, seen)
+            self._cache.move_to_end(user)
+            while len(self._cache) > self.cache_users:
+                self._cache.popitem(last=False)
+
+    def get(self, user):
+        seen = self.cached(user)
+        if seen is None:
+            seen = SeenSet.from_doc(self.collection.find_one({'_id': user}))
+            self._remember(user, seen)
+        return seen
+
+    def record(self, user, swipes):
+        """Store a batch of (coreId, direction) swipes and add them to the user's seen-set"""
+        now = datetime.now()
+        self.swipes_collection.insert_many(
+            [{'user': user, 'coreId': core_id, 'direction': direction, 'swipedAt': now}
+             for core_id, direction in swipes],
+            ordered=False
+        )
+        core_ids = [core_id for core_id, _ in swipes]
+        for _ in range(SEEN_WRITE_RETRIES):
+            doc = self.collection.find_one({'_id': user})
+            seen = SeenSet.from_doc(doc)
+            seen.add(core_ids)
+            if doc is None:
+                try:
+                    self.collection.insert_one({'_id': user, 'revision': 1, **seen.to_doc()})
+                    break
+                except DuplicateKeyError:
+                    continue
+            result = self.collection.update_one(
+                {'_id': user, 'revision': doc.get('revision', 0)},
+                {'$set': seen.to_doc(), '$inc': {'revision': 1}}
+            )
+            if result.matched_count:
+                break
+        else:
+            logger.warning(f"Seen-set for {user} kept changing; {len(core_ids)} swipes only in the swipes log")
+            return
+        self._remember(user, seen)
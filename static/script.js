@@ -4,6 +4,23 @@ let startX = 0;
 let currentX = 0;
 let isDragging = false;
 let currentDomain = null;
+let nextCursor = null;
+let isPrefetching = false;
+let deckIds = new Set();
+let domainCounts = {};
+let paperStream = null;
+let pollTimer = null;
+let pendingSwipes = [];
+let swipeTimer = null;
+
+// Cards per page, and how close to the end of the deck the next page is requested
+const PAGE_SIZE = 10;
+const PREFETCH_THRESHOLD = 3;
+
+// Swipes are sent in batches: when this many are queued, after a short delay, or on leaving the page
+const SWIPE_BATCH_SIZE = 10;
+const SWIPE_FLUSH_DELAY = 5000;
+const CLIENT_COOKIE = 'paper_client';
 
 const cardContainer = document.getElementById('cardContainer');
 const paperStatus = document.getElementById('paperStatus');
@@ -22,19 +39,8 @@ async function fetchDomainStats() {
             
             // Update domain cards with counts and new papers
             Object.entries(domain_counts).forEach(([domain, count]) => {
-                const newPapers = last_update.domain_stats[domain] || 0;
-                const card = document.querySelector(`[data-domain="${domain}"]`);
-                if (card) {
-                    const statsDiv = card.querySelector('.domain-stats') || document.createElement('div');
-                    statsDiv.className = 'domain-stats';
-                    statsDiv.innerHTML = `
-                        <span>${count} papers total</span>
-                        ${newPapers > 0 ? `<span class="new-papers">+${newPapers} new</span>` : ''}
-                    `;
-                    if (!card.querySelector('.domain-stats')) {
-                        card.insertBefore(statsDiv, card.querySelector('button'));
-                    }
-                }
+                domainCounts[domain] = { total: count, fresh: last_update.domain_stats[domain] || 0 };
+                renderDomainStats(domain);
             });
         }
     } catch (error) {
@@ -42,6 +48,23 @@ async function fetchDomainStats() {
     }
 }
 
+// Show a domain's counts on its card
+function renderDomainStats(domain) {
+    const card = document.querySelector(`[data-domain="${domain}"]`);
+    const counts = domainCounts[domain];
+    if (card && counts) {
+        const statsDiv = card.querySelector('.domain-stats') || document.createElement('div');
+        statsDiv.className = 'domain-stats';
+        statsDiv.innerHTML = `
+            <span>${counts.total} papers total</span>
+            ${counts.fresh > 0 ? `<span class="new-papers">+${counts.fresh} new</span>` : ''}
+        `;
+        if (!card.querySelector('.domain-stats')) {
+            card.insertBefore(statsDiv, card.querySelector('button'));
+        }
+    }
+}
+
 // Fetch available domains
 async function fetchDomains() {
     try {
@@ -67,15 +90,26 @@ async function fetchDomains() {
     }
 }
 
+// Build the listing URL for a domain, continuing from a cursor if given
+function papersUrl(domain, cursor) {
+    const params = new URLSearchParams({ view: 'card', limit: PAGE_SIZE });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    return `/api/papers/${domain}?${params}`;
+}
+
 // Fetch papers for selected domain
 async function fetchPapers(domain) {
     try {
         paperStatus.textContent = 'Loading papers...';
-        const response = await fetch(`/api/papers/${domain}`);
+        const response = await fetch(papersUrl(domain));
         const data = await response.json();
         
         if (data.success) {
             papers = data.papers;
+            deckIds = new Set(papers.map(paper => paper.coreId));
+            nextCursor = data.nextCursor;
             if (papers.length > 0) {
                 paperStatus.textContent = `${papers.length} papers available today • Swipe to explore`;
                 renderCard();
@@ -90,6 +124,34 @@ async function fetchPapers(domain) {
     }
 }
 
+// Append the next page to the deck before the user runs out of cards
+async function prefetchPapers() {
+    if (!nextCursor || isPrefetching || !currentDomain) return;
+    
+    isPrefetching = true;
+    const domain = currentDomain;
+    try {
+        const response = await fetch(papersUrl(domain, nextCursor));
+        const data = await response.json();
+        
+        // Ignore the page if the user switched domains meanwhile
+        if (data.success && domain === currentDomain) {
+            // Streamed papers may already be in the deck
+            const page = data.papers.filter(paper => !deckIds.has(paper.coreId));
+            page.forEach(paper => deckIds.add(paper.coreId));
+            papers = papers.concat(page);
+            nextCursor = data.nextCursor;
+            if (currentIndex >= papers.length - page.length) {
+                renderCard();
+            }
+        }
+    } catch (error) {
+        console.error('Error prefetching papers:', error);
+    } finally {
+        isPrefetching = false;
+    }
+}
+
 // Update statistics
 async function updateStats() {
     try {
@@ -107,8 +169,16 @@ async function updateStats() {
 
 // Render current card
 function renderCard() {
+    if (papers.length - currentIndex <= PREFETCH_THRESHOLD) {
+        prefetchPapers();
+    }
+    
     if (currentIndex >= papers.length) {
-        showNoMorePapers();
+        if (nextCursor) {
+            cardContainer.innerHTML = '<div class="loading">Loading more papers...</div>';
+        } else {
+            showNoMorePapers();
+        }
         return;
     }
     
@@ -117,10 +187,10 @@ function renderCard() {
     card.className = 'card';
     
     const authors = paper.authors && paper.authors.length > 0 
-        ? paper.authors.slice(0, 3).join(', ') + (paper.authors.length > 3 ? ', et al.' : '')
+        ? paper.authors.slice(0, 3).join(', ') + (paper.authors.length > 3 || paper.moreAuthors > 0 ? ', et al.' : '')
         : 'Unknown authors';
     
-    const downloadLink = paper.downloadUrl || (paper.sourceFulltextUrls && paper.sourceFulltextUrls[0]) || '';
+    const downloadLink = paper.link || paper.downloadUrl || (paper.sourceFulltextUrls && paper.sourceFulltextUrls[0]) || '';
     const publishDate = new Date(paper.publishedDate).toLocaleDateString('en-US', { 
         year: 'numeric', 
         month: 'short', 
@@ -215,8 +285,45 @@ function handleEnd(e) {
     }
 }
 
+// Anonymous id the server keeps this browser's seen papers under
+function ensureClientId() {
+    if (document.cookie.split('; ').some(cookie => cookie.startsWith(`${CLIENT_COOKIE}=`))) return;
+    const id = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : Math.random().toString(36).slice(2) + Date.now().toString(36);
+    document.cookie = `${CLIENT_COOKIE}=${id}; max-age=${60 * 60 * 24 * 365}; path=/; SameSite=Lax`;
+}
+
+// Queue a swipe on the current card for the next batch
+function recordSwipe(direction) {
+    const paper = papers[currentIndex];
+    if (!paper) return;
+    pendingSwipes.push({ coreId: paper.coreId, direction });
+    if (pendingSwipes.length >= SWIPE_BATCH_SIZE) {
+        flushSwipes();
+    } else if (!swipeTimer) {
+        swipeTimer = setTimeout(flushSwipes, SWIPE_FLUSH_DELAY);
+    }
+}
+
+// Send queued swipes; a beacon survives the page being closed
+function flushSwipes(useBeacon = false) {
+    clearTimeout(swipeTimer);
+    swipeTimer = null;
+    if (pendingSwipes.length === 0) return Promise.resolve();
+    const body = JSON.stringify({ swipes: pendingSwipes });
+    pendingSwipes = [];
+    if (useBeacon && navigator.sendBeacon) {
+        navigator.sendBeacon('/api/swipes', new Blob([body], { type: 'application/json' }));
+        return Promise.resolve();
+    }
+    return fetch('/api/swipes', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body, keepalive: true })
+        .catch(error => console.error('Error recording swipes:', error));
+}
+
 // Swipe right
 function swipeRight(card) {
+    recordSwipe('right');
     card.classList.add('swiped-right');
     setTimeout(() => {
         currentIndex++;
@@ -226,6 +333,7 @@ function swipeRight(card) {
 
 // Swipe left
 function swipeLeft(card) {
+    recordSwipe('left');
     card.classList.add('swiped-left');
     setTimeout(() => {
         currentIndex++;
@@ -246,11 +354,19 @@ function showNoMorePapers() {
 
 // Select domain and fetch its papers
 function selectDomain(domain) {
+    // The new listing should already leave out what was just swiped
+    const swipesSent = flushSwipes();
     currentDomain = domain;
     currentIndex = 0;
     papers = [];
+    deckIds = new Set();
+    nextCursor = null;
     cardContainer.innerHTML = '<div class="loading">Fetching papers for selected domain...</div>';
-    fetchPapers(domain);
+    swipesSent.then(() => {
+        if (domain === currentDomain) {
+            fetchPapers(domain);
+        }
+    });
     
     // Update UI to show selected domain
     document.querySelectorAll('.domain-card').forEach(card => {
@@ -261,16 +377,78 @@ function selectDomain(domain) {
     });
 }
 
-// Initialize
-fetchDomains();
+// Add the papers an ingestion or promotion run just published
+function applyPaperEvent(event) {
+    Object.entries(event.domains).forEach(([domain, ids]) => {
+        const counts = domainCounts[domain] || { total: 0, fresh: 0 };
+        counts.total += ids.length;
+        if (event.kind === 'ingested') {
+            counts.fresh += ids.length;
+        }
+        domainCounts[domain] = counts;
+        renderDomainStats(domain);
+    });
+    
+    if (!currentDomain || !event.domains[currentDomain]) return;
+    const fresh = event.papers.filter(paper =>
+        paper.domains.includes(currentDomain) && !deckIds.has(paper.coreId));
+    if (fresh.length === 0) return;
+    
+    const wasAtEnd = currentIndex >= papers.length;
+    fresh.forEach(paper => deckIds.add(paper.coreId));
+    papers = papers.concat(fresh);
+    paperStatus.textContent = `${fresh.length} new paper${fresh.length === 1 ? '' : 's'} added • Swipe to explore`;
+    if (wasAtEnd) {
+        renderCard();
+    }
+}
 
-// Set up auto-refresh (every hour)
-setInterval(() => {
+// Reload everything, as the hourly poll did
+function refreshAll() {
     fetchDomainStats();
     if (currentDomain) {
         fetchPapers(currentDomain);
     }
-}, 60 * 60 * 1000);  // 1 hour in milliseconds
+}
+
+// Poll hourly when the browser or server cannot stream
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(refreshAll, 60 * 60 * 1000);  // 1 hour in milliseconds
+}
+
+// Receive new papers as they are stored instead of polling for them
+function connectPaperStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    paperStream = new EventSource('/api/stream');
+    paperStream.addEventListener('papers', e => applyPaperEvent(JSON.parse(e.data)));
+    paperStream.addEventListener('reset', () => {
+        // The server dropped events for this client; resync, then listen again
+        paperStream.close();
+        refreshAll();
+        setTimeout(connectPaperStream, 5000);
+    });
+    paperStream.onerror = () => {
+        // EventSource reconnects by itself unless the server refused the stream
+        if (paperStream.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    };
+}
+
+// Initialize
+ensureClientId();
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        flushSwipes(true);
+    }
+});
+window.addEventListener('pagehide', () => flushSwipes(true));
+fetchDomains();
+connectPaperStream();
 
 // Set up stats refresh (every minute to update "time since last update")
 setInterval(() => {
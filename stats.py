@@ -0,0 +1,79 @@
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+LAST_UPDATE_ID = 'last_update'
+
+
+def daily_counts_pipeline(today_str):
+    """Aggregation counting today's papers overall and per domain"""
+    return [
+        {'$match': {'fetchedDate': today_str}},
+        {'$facet': {
+            'total': [{'$count': 'n'}],
+            'domains': [
+                {'$unwind': '$domains'},
+                {'$group': {'_id': '$domains', 'n': {'$sum': 1}}}
+            ]
+        }}
+    ]
+
+
+def parse_daily_counts(result):
+    total = (result or {}).get('total') or [{'n': 0}]
+    return {
+        'total': total[0]['n'],
+        'domains': {group['_id']: group['n'] for group in (result or {}).get('domains', [])}
+    }
+
+
+def aggregate_daily_counts(papers_collection, today_str):
+    """Count today's papers overall and per domain in a single aggregation"""
+    return parse_daily_counts(next(papers_collection.aggregate(daily_counts_pipeline(today_str)), {}))
+
+
+def record_daily_counts(counts_collection, papers_collection, today_str, added_total, added_domains=None):
+    """Fold a committed ingestion batch into today's materialized counts document.
+
+    The first write of the day seeds the document from an aggregation over the
+    papers already stored; later writes only $inc it.
+    """
+    if not added_total:
+        return
+    inc = {'total': added_total}
+    for domain, count in (added_domains or {}).items():
+        if count:
+            inc[f'domains.{domain}'] = count
+
+    result = counts_collection.update_one({'_id': today_str}, {'$inc': inc})
+    if result.matched_count == 0:
+        # Papers were just written, so the aggregation already includes this batch
+        counts = aggregate_daily_counts(papers_collection, today_str)
+        counts_collection.update_one(
+            {'_id': today_str},
+            {'$set': {**counts, 'seededAt': datetime.now()}},
+            upsert=True
+        )
+
+
+def record_last_update(counts_collection, update_stats):
+    """Keep a copy of the newest update_stats entry next to the daily counts"""
+    counts_collection.update_one(
+        {'_id': LAST_UPDATE_ID},
+        {'$set': {key: value for key, value in update_stats.items() if key != '_id'}},
+        upsert=True
+    )
+
+
+def load_daily_stats(counts_collection, papers_collection, today_str):
+    """Return (today's counts, last update) with one _id lookup.
+
+    Falls back to aggregating the papers collection when today's counts have
+    not been materialized yet.
+    """
+    docs = {doc['_id']: doc for doc in counts_collection.find({'_id': {'$in': [today_str, LAST_UPDATE_ID]}})}
+    counts = docs.get(today_str)
+    if counts is None:
+        counts = aggregate_daily_counts(papers_collection, today_str)
+    return counts, docs.get(LAST_UPDATE_ID)
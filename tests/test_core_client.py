@@ -0,0 +1,144 @@
+"""CoreClient against the local CORE stub (benchmarks/core_stub.py): retries, backoff and pagination"""
+import json
+
+import pytest
+
+import core_client
+from core_client import CoreClient
+from core_stub import CoreStub
+
+QUERY = 'yearPublished>=2026 AND _exists_:abstract'
+
+
+@pytest.fixture
+def stub():
+    server = CoreStub(total_hits=250, latency=0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays the client sleeps for, without actually sleeping"""
+    delays = []
+    monkeypatch.setattr(core_client.time, 'sleep', delays.append)
+    return delays
+
+
+def client_for(stub, **kwargs):
+    kwargs.setdefault('backoff', 0.5)
+    return CoreClient(None, base_url=stub.url, **kwargs)
+
+
+def error(status, headers=None, body=b''):
+    return status, headers or {}, body
+
+
+def test_search_returns_page(stub, sleeps):
+    data = client_for(stub).search(QUERY, limit=10, offset=20)
+    assert [work['id'] for work in data['results']] == list(range(21, 31))
+    assert data['totalHits'] == 250
+    assert sleeps == []
+
+
+def test_server_errors_retried_with_exponential_backoff(stub, sleeps):
+    stub.faults = [error(503), error(502), error(500)]
+    data = client_for(stub).search(QUERY, limit=5)
+    assert len(data['results']) == 5
+    assert stub.requests == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_backoff_capped(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(core_client, 'CORE_MAX_BACKOFF_SECONDS', 1.5)
+    stub.faults = [error(503)] * 3
+    client_for(stub).search(QUERY, limit=5)
+    assert sleeps == [0.5, 1.0, 1.5]
+
+
+def test_retry_after_overrides_shorter_backoff(stub, sleeps):
+    stub.faults = [error(429, {'Retry-After': '7'})]
+    client = client_for(stub)
+    assert client.search(QUERY, limit=5) is not None
+    assert sleeps[0] == 7.0
+    # A 429 also holds back the other workers until the window passes
+    assert client._not_before > 0
+
+
+def test_rate_limit_header_date_is_honoured(stub, sleeps):
+    stub.faults = [error(503, {'X-RateLimit-Retry-After': '2000-01-01T00:00:00Z'})]
+    assert client_for(stub).search(QUERY, limit=5) is not None
+    # A moment already past leaves the exponential backoff in charge
+    assert sleeps == [0.5]
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.faults = [error(503)] * 5
+    assert client_for(stub, max_retries=2).search(QUERY, limit=5) is None
+    assert stub.requests == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    stub.faults = [error(401, body=b'{"message": "Invalid API key"}')]
+    assert client_for(stub).search(QUERY, limit=5) is None
+    assert stub.requests == 1
+    assert sleeps == []
+
+
+def test_truncated_json_is_retried(stub, sleeps):
+    body = json.dumps({'totalHits': 250, 'results': [{'id': 1}]}).encode()[:-7]
+    stub.faults = [error(200, {'Content-Type': 'application/json'}, body)]
+    data = client_for(stub).search(QUERY, limit=5)
+    assert len(data['results']) == 5
+    assert stub.requests == 2
+    assert sleeps == [0.5]
+
+
+def test_iter_pages_stops_at_short_page(stub, sleeps):
+    pages = list(client_for(stub, max_workers=1).iter_pages(QUERY, per_page=100, max_pages=5))
+    assert [(offset, len(results)) for offset, results in pages] == [(0, 100), (100, 100), (200, 50)]
+    assert stub.requests == 3
+
+
+def test_iter_pages_stops_at_total_hits(stub, sleeps):
+    stub.total_hits = 200
+    pages = list(client_for(stub, max_workers=1).iter_pages(QUERY, per_page=100, max_pages=5))
+    assert [offset for offset, _ in pages] == [0, 100]
+    assert stub.requests == 2
+
+
+def test_iter_pages_concurrent_covers_every_offset(stub, sleeps):
+    pages = list(client_for(stub, max_workers=4).iter_pages(QUERY, per_page=50, max_pages=10))
+    offsets = sorted(offset for offset, results in pages if results)
+    assert offsets == [0, 50, 100, 150, 200]
+    ids = sorted(work['id'] for _, results in pages for work in results or [])
+    assert ids == list(range(1, 251))
+
+
+def test_iter_pages_reports_failed_page(stub, sleeps):
+    stub.faults = [error(503)] * 3
+    pages = list(client_for(stub, max_workers=1, max_retries=2).iter_pages(QUERY, per_page=100, max_pages=2))
+    assert pages[0] == (0, None)
+    assert [offset for offset, _ in pages] == [0, 100]
+
+
+def test_iter_queries_gives_every_query_its_pages(stub, sleeps):
+    queries = {
+        'nlp': (f'{QUERY} AND (title:"language model")', 2),
+        'vision': (f'{QUERY} AND (title:"image segmentation")', 2),
+    }
+    pages = list(client_for(stub, max_workers=2).iter_queries(queries, per_page=100))
+    assert sorted((key, offset) for key, offset, _ in pages) == [
+        ('nlp', 0), ('nlp', 100), ('vision', 0), ('vision', 100)
+    ]
+    ids = {key: set() for key in queries}
+    for key, _, results in pages:
+        ids[key].update(work['id'] for work in results)
+    assert not ids['nlp'] & ids['vision']
+
+
+def test_iter_queries_resumes_each_query_from_its_offset(stub, sleeps):
+    queries = {'nlp': (f'{QUERY} AND (title:"language model")', 2), 'all': (QUERY, 1)}
+    pages = list(client_for(stub, max_workers=2).iter_queries(queries, per_page=100, start_offsets={'nlp': 100}))
+    assert sorted((key, offset) for key, offset, _ in pages) == [('all', 0), ('nlp', 100), ('nlp', 200)]
@@ -0,0 +1,58 @@
+"""DuplicateDetector: DOI and MinHash/LSH matches against stored papers and earlier papers in the run"""
+import pytest
+
+from dedup import DuplicateDetector, normalize_doi
+from repositories.mongo import MongoPaperRepository
+
+mongomock = pytest.importorskip('mongomock')
+
+ABSTRACT = ('We study message passing neural networks on large sparse graphs and show that a simple '
+            'attention readout matches spectral methods on node classification benchmarks.')
+
+
+def paper_doc(core_id, title='Graph attention readouts', abstract=ABSTRACT, doi=''):
+    return {'coreId': core_id, 'title': title, 'abstract': abstract, 'doi': doi}
+
+
+@pytest.fixture
+def repository():
+    return MongoPaperRepository(mongomock.MongoClient().db)
+
+
+def annotated(detector, *docs):
+    return [detector.annotate(doc) for doc in docs]
+
+
+def test_normalize_doi_strips_resolver_prefixes():
+    assert normalize_doi('https://doi.org/10.1000/ABC') == '10.1000/abc'
+    assert normalize_doi('doi:10.1000/abc') == '10.1000/abc'
+    assert normalize_doi(None) == ''
+
+
+def test_near_duplicate_later_in_the_run_maps_to_the_first(repository):
+    detector = DuplicateDetector(repository)
+    docs = annotated(detector, paper_doc(1), paper_doc(2, title='Graph attention readouts.'),
+                     paper_doc(3, title='Compiler passes', abstract='Register allocation by graph colouring.'))
+    assert detector.find_duplicates(docs) == [None, 1, None]
+    assert detector.duplicate_count == 1
+
+
+def test_stored_paper_matches_by_band_or_doi(repository):
+    detector = DuplicateDetector(repository)
+    stored = annotated(detector, paper_doc(1), paper_doc(2, title='Other', abstract='Unrelated text here.',
+                                                         doi='10.1000/x'))
+    repository.upsert_papers(stored)
+
+    fresh = DuplicateDetector(repository)
+    docs = annotated(fresh, paper_doc(10), paper_doc(11, title='Renamed', abstract='Different words entirely.',
+                                                     doi='https://doi.org/10.1000/X'))
+    assert fresh.find_duplicates(docs) == [1, 2]
+
+
+def test_flush_aliases_records_duplicate_ids(repository):
+    detector = DuplicateDetector(repository)
+    docs = annotated(detector, paper_doc(1))
+    repository.upsert_papers(docs)
+    detector.find_duplicates(annotated(detector, paper_doc(5)))
+    detector.flush_aliases()
+    assert repository.find_papers([1], {'_id': 0, 'coreId': 1, 'aliasIds': 1})[1]['aliasIds'] == [5]
@@ -0,0 +1,77 @@
+"""DumpCheckpoint: per-shard dump positions, re-split on a new shard count, and load_shard resume"""
+import json
+
+import pytest
+
+from ingest import dump
+from ingest.dump import DumpCheckpoint
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def checkpoints():
+    return mongomock.MongoClient().db.ingest_checkpoints
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    path = tmp_path / 'core.jsonl'
+    path.write_text(''.join(json.dumps({'coreId': core_id}) + '\n' for core_id in range(10)))
+    return str(path)
+
+
+def test_saved_position_is_read_back(checkpoints, dump_path):
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2)
+    DumpCheckpoint(checkpoints, dump_path, 1).save(120, 6)
+    checkpoint = DumpCheckpoint(checkpoints, dump_path, 1)
+    assert (checkpoint.offset, checkpoint.line, checkpoint.done) == (120, 6, False)
+    assert DumpCheckpoint(checkpoints, dump_path, 0).line == 0
+
+
+def test_new_shard_count_resumes_every_shard_at_the_lowest_line(checkpoints, dump_path):
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2)
+    DumpCheckpoint(checkpoints, dump_path, 0).save(100, 5)
+    DumpCheckpoint(checkpoints, dump_path, 1).save(160, 8, done=True)
+    DumpCheckpoint.prepare(checkpoints, dump_path, 3)
+    positions = [DumpCheckpoint(checkpoints, dump_path, shard) for shard in range(3)]
+    assert [(p.offset, p.line, p.done) for p in positions] == [(100, 5, False)] * 3
+
+
+def test_same_shard_count_keeps_positions_unless_restarted(checkpoints, dump_path):
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2)
+    DumpCheckpoint(checkpoints, dump_path, 0).save(100, 5)
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2)
+    assert DumpCheckpoint(checkpoints, dump_path, 0).line == 5
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2, restart=True)
+    assert DumpCheckpoint(checkpoints, dump_path, 0).line == 0
+
+
+class RecordingLoader:
+    def __init__(self, fetched_at, require_domain=False, batch_size=None):
+        self.loaded = []
+        self.records = 0
+        self.rejections = {}
+        self.observed = type('Observed', (), {'doc_freq': None, 'doc_count': 0})()
+        RecordingLoader.instance = self
+
+    def load(self, works):
+        self.loaded.extend(work['id'] for work in works)
+        self.records += len(works)
+        return len(works)
+
+
+def test_load_shard_resumes_after_the_saved_line(checkpoints, dump_path, monkeypatch):
+    monkeypatch.setattr(dump, 'db', {dump.DUMP_CHECKPOINTS_COLLECTION: checkpoints})
+    monkeypatch.setattr(dump, 'DumpLoader', RecordingLoader)
+    monkeypatch.setattr(dump, 'work_from_dump', lambda record: {'id': record['coreId']})
+    with open(dump_path) as f:
+        head = [next(f) for _ in range(4)]
+    DumpCheckpoint.prepare(checkpoints, dump_path, 2)
+    DumpCheckpoint(checkpoints, dump_path, 0).save(sum(len(line) for line in head), 4)
+
+    summary = dump.load_shard(dump_path, 0, 2, fetched_at=None, batch_size=2)
+    assert RecordingLoader.instance.loaded == [4, 6, 8]
+    assert summary['stored'] == 3
+    assert DumpCheckpoint(checkpoints, dump_path, 0).done
+    assert dump.load_shard(dump_path, 0, 2, fetched_at=None)['stored'] == 0
@@ -0,0 +1,106 @@
+"""FetchCheckpoint: updatedDate windows, offset resume and mark advancement"""
+from datetime import datetime
+
+import pytest
+
+from ingest.storage import FetchCheckpoint
+
+mongomock = pytest.importorskip('mongomock')
+
+BASE = 'yearPublished>=2026'
+START = datetime(2026, 1, 1)
+NOW = datetime(2026, 3, 1)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.ingest_checkpoints
+
+
+def reload(collection):
+    return FetchCheckpoint(collection, BASE, initial_mark=START)
+
+
+def test_first_window_is_bounded_from_initial_mark(collection):
+    checkpoint = reload(collection)
+    query = checkpoint.build_query(BASE, now=NOW)
+    assert query == f'{BASE} AND updatedDate>="2026-01-01T00:00:00" AND updatedDate<"2026-01-02T00:00:00"'
+
+
+def test_open_window_when_end_is_in_the_future(collection):
+    checkpoint = reload(collection)
+    assert checkpoint.build_query(BASE, now=datetime(2026, 1, 1, 12)) == f'{BASE} AND updatedDate>="2026-01-01T00:00:00"'
+
+
+def test_drained_window_advances_mark_and_widens(collection):
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(True)
+
+    checkpoint = reload(collection)
+    assert checkpoint.mark == '2026-01-02T00:00:00'
+    assert checkpoint.window_hours == 48
+    assert checkpoint.offset == 0
+
+
+def test_open_drained_window_advances_to_newest_seen(collection):
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=datetime(2026, 1, 1, 12))
+    checkpoint.observe([{'id': 1, 'updatedDate': '2026-01-01T05:00:00'},
+                        {'id': 2, 'updatedDate': '2026-01-01T07:30:00.123'}])
+    checkpoint.save(True)
+
+    checkpoint = reload(collection)
+    assert checkpoint.mark == '2026-01-01T07:30:00'
+    assert checkpoint.last_id == 2
+
+
+def test_undrained_window_resumes_from_saved_offset(collection):
+    checkpoint = reload(collection)
+    first = checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(False, next_offset=300)
+
+    checkpoint = reload(collection)
+    assert checkpoint.offset == 300
+    assert checkpoint.mark == '2026-01-01T00:00:00'
+    assert checkpoint.window_hours == 24
+    # Same window, even once its end has passed or the window would differ
+    assert checkpoint.build_query(BASE, now=datetime(2026, 6, 1)) == first
+
+
+def test_resumed_open_window_stays_open(collection):
+    checkpoint = reload(collection)
+    first = checkpoint.build_query(BASE, now=datetime(2026, 1, 1, 12))
+    checkpoint.save(False, next_offset=100)
+
+    checkpoint = reload(collection)
+    assert checkpoint.build_query(BASE, now=NOW) == first
+
+
+def test_undrained_window_without_progress_halves_and_restarts(collection):
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(False, next_offset=300)
+
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(False, next_offset=300)
+
+    checkpoint = reload(collection)
+    assert checkpoint.offset == 0
+    assert checkpoint.window_hours == 12
+    assert checkpoint.build_query(BASE, now=NOW).endswith('updatedDate<"2026-01-01T12:00:00"')
+
+
+def test_drain_after_resume_resets_offset(collection):
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(False, next_offset=200)
+
+    checkpoint = reload(collection)
+    checkpoint.build_query(BASE, now=NOW)
+    checkpoint.save(True)
+
+    checkpoint = reload(collection)
+    assert checkpoint.offset == 0
+    assert checkpoint.mark == '2026-01-02T00:00:00'
@@ -0,0 +1,91 @@
+"""BulkPaperWriter and filter_known_papers against the MongoDB repository"""
+from datetime import datetime
+
+import pytest
+
+from ingest.storage import BulkPaperWriter, filter_known_papers
+from repositories.mongo import MongoPaperRepository
+
+mongomock = pytest.importorskip('mongomock')
+
+RUN_START = datetime(2026, 10, 17, 9, 0)
+
+
+def paper_doc(core_id, domains=('artificial_intelligence',), title=None):
+    return {'coreId': core_id, 'title': title or f'Paper {core_id}', 'domains': list(domains),
+            'fetchedAt': RUN_START, 'fetchedDate': RUN_START.date().isoformat()}
+
+
+@pytest.fixture
+def repository():
+    return MongoPaperRepository(mongomock.MongoClient().db)
+
+
+def test_flushes_every_batch_size_documents(repository):
+    writer = BulkPaperWriter(repository, batch_size=3)
+    for core_id in range(1, 8):
+        writer.add(paper_doc(core_id))
+    assert repository.count_papers() == 6
+    writer.flush()
+    assert repository.count_papers() == 7
+    assert (writer.accepted_count, writer.upserted_count, writer.modified_count) == (7, 7, 0)
+
+
+def test_same_core_id_before_a_flush_is_written_once(repository):
+    writer = BulkPaperWriter(repository, batch_size=10)
+    writer.add(paper_doc(1, title='First'))
+    writer.add(paper_doc(1, title='Second'))
+    writer.flush()
+    assert writer.accepted_count == 1
+    assert repository.find_papers([1], {'_id': 0, 'coreId': 1, 'title': 1})[1]['title'] == 'Second'
+
+
+def test_rewrite_counts_as_modified(repository):
+    writer = BulkPaperWriter(repository)
+    writer.add(paper_doc(1))
+    writer.flush()
+    writer.add(paper_doc(1, title='Revised title'))
+    writer.flush()
+    assert (writer.upserted_count, writer.modified_count, writer.stored_count) == (1, 1, 2)
+
+
+def test_domain_stats_count_stored_papers(repository):
+    writer = BulkPaperWriter(repository, domains=['artificial_intelligence', 'cybersecurity'])
+    writer.add(paper_doc(1, domains=['artificial_intelligence', 'cybersecurity']))
+    writer.add(paper_doc(2))
+    writer.flush()
+    assert writer.domain_stats == {'artificial_intelligence': 2, 'cybersecurity': 1}
+
+
+def test_stamp_sets_fetched_at_when_the_batch_is_written(repository):
+    writer = BulkPaperWriter(repository, stamp=True)
+    writer.add(paper_doc(1))
+    before = datetime.now()
+    writer.flush()
+    stored = repository.find_papers([1], {'_id': 0, 'coreId': 1, 'fetchedAt': 1})[1]
+    assert stored['fetchedAt'] >= before.replace(microsecond=before.microsecond // 1000 * 1000)
+
+    unstamped = BulkPaperWriter(repository)
+    unstamped.add(paper_doc(2))
+    unstamped.flush()
+    assert repository.find_papers([2], {'_id': 0, 'coreId': 1, 'fetchedAt': 1})[2]['fetchedAt'] == RUN_START
+
+
+def test_on_flush_gets_each_committed_batch(repository):
+    batches = []
+    writer = BulkPaperWriter(repository, batch_size=2, on_flush=batches.append)
+    for core_id in range(1, 4):
+        writer.add(paper_doc(core_id))
+    assert [[doc['coreId'] for doc in batch] for batch in batches] == [[1, 2]]
+    writer.flush()
+    writer.flush()
+    assert [[doc['coreId'] for doc in batch] for batch in batches] == [[1, 2], [3]]
+
+
+def test_filter_known_papers_drops_stored_ids_and_aliases(repository):
+    writer = BulkPaperWriter(repository)
+    writer.add(paper_doc(1))
+    writer.flush()
+    repository.add_aliases([(1, 50)])
+    works = [{'id': 1}, {'id': 2}, {'id': 50}, {'title': 'no id'}]
+    assert filter_known_papers(repository, works) == [{'id': 2}, {'title': 'no id'}]
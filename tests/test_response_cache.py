@@ -0,0 +1,84 @@
+"""ResponseCache: versioned entries, ETag revalidation and the per-client bypass of cached_unless"""
+import pytest
+from flask import Flask, jsonify, request
+
+from response_cache import ResponseCache
+
+
+class Version:
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+
+@pytest.fixture
+def setup():
+    version = Version()
+    cache = ResponseCache(version, version_check_seconds=0)
+    calls = []
+    app = Flask(__name__)
+
+    @app.route('/listing')
+    @cache.cached
+    def listing():
+        calls.append(request.args.get('limit'))
+        return jsonify({'version': version.value})
+
+    @app.route('/personal')
+    @cache.cached_unless(lambda: request.cookies.get('seen'))
+    def personal():
+        calls.append(request.cookies.get('seen'))
+        return jsonify({'seen': request.cookies.get('seen')})
+
+    return app.test_client(), version, cache, calls
+
+
+def test_repeated_request_is_served_from_cache(setup):
+    client, _, cache, calls = setup
+    first = client.get('/listing?limit=5')
+    second = client.get('/listing?limit=5')
+    assert first.get_data() == second.get_data()
+    assert calls == ['5']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_query_string_is_part_of_the_key(setup):
+    client, _, _, calls = setup
+    client.get('/listing?limit=5')
+    client.get('/listing?limit=6')
+    assert calls == ['5', '6']
+
+
+def test_data_version_bump_drops_entries(setup):
+    client, version, _, calls = setup
+    client.get('/listing')
+    version.value = 2
+    assert client.get('/listing').get_json() == {'version': 2}
+    assert len(calls) == 2
+
+
+def test_matching_etag_gets_304(setup):
+    client, _, _, _ = setup
+    etag = client.get('/listing').headers['ETag']
+    response = client.get('/listing', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_cached_unless_shares_entries_until_personal(setup):
+    client, _, cache, calls = setup
+    client.get('/personal')
+    response = client.get('/personal')
+    assert calls == [None]
+    assert cache.hits == 1
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'Cookie' in response.headers['Vary']
+
+    client.set_cookie('seen', 'abc')
+    response = client.get('/personal')
+    assert response.get_json() == {'seen': 'abc'}
+    assert response.headers['Cache-Control'] == 'private, no-store'
+    assert 'ETag' not in response.headers
+    assert cache.hits == 1
@@ -0,0 +1,125 @@
+"""SearchIndex: BM25 ranking and the incremental fetchedAt sync against the papers collection"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import search_index
+from search_index import SYNC_LOOKBACK_SECONDS, SearchIndex
+
+mongomock = pytest.importorskip('mongomock')
+
+NOW = datetime(2026, 10, 17, 12, 0)
+
+
+def paper(core_id, title, fetched_at=NOW, abstract=''):
+    return {'coreId': core_id, 'title': title, 'abstract': abstract, 'keywords': [], 'fetchedAt': fetched_at}
+
+
+@pytest.fixture
+def papers():
+    return mongomock.MongoClient().db.papers
+
+
+def test_search_ranks_title_matches_first():
+    index = SearchIndex()
+    index.add(paper(1, 'Graph neural networks', abstract='message passing'))
+    index.add(paper(2, 'Protein folding', abstract='uses graph neural networks in one step'))
+    index.add(paper(3, 'Compilers'))
+    assert [core_id for core_id, _ in index.search('graph neural')] == [1, 2]
+
+
+def test_readd_replaces_the_old_terms():
+    index = SearchIndex()
+    index.add(paper(1, 'Quantum error correction'))
+    index.add(paper(1, 'Federated learning'))
+    assert index.search('quantum') == []
+    assert [core_id for core_id, _ in index.search('federated')] == [1]
+    assert len(index) == 1
+
+
+def test_sync_pulls_only_papers_since_the_watermark(papers):
+    index = SearchIndex()
+    papers.insert_many([paper(1, 'Alpha', NOW - timedelta(hours=2)), paper(2, 'Beta', NOW - timedelta(hours=1))])
+    assert index.sync(papers, now=NOW) == (2, 0)
+    assert index.watermark == NOW - timedelta(hours=1)
+
+    papers.insert_one(paper(3, 'Gamma', NOW))
+    assert index.sync(papers, now=NOW) == (1, 0)
+    assert index.sync(papers, now=NOW) == (0, 0)
+    assert len(index) == 3
+
+
+def test_sync_picks_up_a_batch_that_became_visible_late(papers):
+    # Two writers: the batch stamped first is committed after the other one was synced
+    index = SearchIndex()
+    papers.insert_one(paper(1, 'Later stamp', NOW))
+    index.sync(papers, now=NOW)
+    papers.insert_one(paper(2, 'Earlier stamp', NOW - timedelta(seconds=SYNC_LOOKBACK_SECONDS // 2)))
+    assert index.sync(papers, now=NOW) == (1, 0)
+    assert [core_id for core_id, _ in index.search('earlier')] == [2]
+
+
+def test_sync_reindexes_a_rewritten_paper(papers):
+    index = SearchIndex()
+    papers.insert_one(paper(1, 'Old title', NOW - timedelta(minutes=1)))
+    index.sync(papers, now=NOW)
+    papers.update_one({'coreId': 1}, {'$set': {'title': 'New title', 'fetchedAt': NOW}})
+    assert index.sync(papers, now=NOW) == (1, 0)
+    assert index.search('old') == []
+
+
+def test_sync_expires_papers_past_retention(papers):
+    index = SearchIndex()
+    papers.insert_many([paper(1, 'Fresh', NOW), paper(2, 'Stale', NOW - timedelta(days=40))])
+    assert index.sync(papers, now=NOW) == (2, 1)
+    assert index.search('stale') == []
+
+
+def test_expires_at_overrides_retention_and_none_is_kept(papers):
+    index = SearchIndex()
+    papers.insert_many([
+        {**paper(1, 'Dump load', NOW - timedelta(days=60)), 'expiresAt': None},
+        {**paper(2, 'Short lived', NOW), 'expiresAt': NOW - timedelta(minutes=1)},
+        {**paper(3, 'Fetched', NOW), 'expiresAt': NOW + timedelta(days=30)},
+    ])
+    assert index.sync(papers, now=NOW) == (3, 1)
+    assert sorted(index.doc_by_id) == [1, 3]
+    assert index.expire(NOW + timedelta(days=31)) == 1
+    assert list(index.doc_by_id) == [1]
+
+
+def test_resync_count_change_drops_the_watermark(papers):
+    index = SearchIndex()
+    papers.insert_one(paper(1, 'Recent', NOW))
+    index.check_resync(0)
+    index.sync(papers, now=NOW)
+    # A bulk load stores papers dated far behind the watermark
+    papers.insert_one(paper(2, 'Loaded from a dump', NOW - timedelta(days=1)))
+    index.check_resync(1)
+    assert index.sync_query() == {}
+    index.sync(papers, now=NOW)
+    assert [core_id for core_id, _ in index.search('dump')] == [2]
+
+
+def test_refresh_syncs_once_per_data_version(papers, monkeypatch):
+    monkeypatch.setattr(search_index, 'SEARCH_SNAPSHOT_SECONDS', float('inf'))
+    index = SearchIndex()
+    papers.insert_one(paper(1, 'Alpha', datetime.now()))
+    index.refresh(papers, 1)
+    papers.insert_one(paper(2, 'Beta', datetime.now()))
+    index.refresh(papers, 1)
+    assert index.search('beta') == []
+    index.refresh(papers, 2)
+    assert [core_id for core_id, _ in index.search('beta')] == [2]
+
+
+def test_snapshot_round_trip(tmp_path, papers):
+    index = SearchIndex()
+    papers.insert_one(paper(1, 'Snapshot me', NOW))
+    index.sync(papers, now=NOW)
+    path = str(tmp_path / 'search.snapshot')
+    index.save(path)
+    restored = SearchIndex.load(path)
+    assert restored.watermark == index.watermark
+    assert [core_id for core_id, _ in restored.search('snapshot')] == [1]
+    assert list(tmp_path.iterdir()) == [tmp_path / 'search.snapshot']
@@ -0,0 +1,70 @@
+"""Seen-sets: Bloom filter generations, swipe recording and listings that skip swiped papers"""
+import pytest
+
+import pagination
+from pagination import decode_cursor, paginate
+from seen import SeenSet, SeenStore, SwipeError, parse_swipes
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_seen_set_rolls_over_to_a_new_generation():
+    seen = SeenSet(capacity=3)
+    assert seen.empty
+    seen.add([1, 2, 3])
+    seen.add([4])
+    assert not seen.empty
+    assert seen.count == 1
+    assert all(core_id in seen for core_id in (1, 2, 3, 4))
+
+
+def test_seen_set_round_trips_through_its_document():
+    seen = SeenSet()
+    seen.add([7, 8])
+    restored = SeenSet.from_doc(seen.to_doc())
+    assert 7 in restored and 8 in restored
+    assert restored.count == 2
+
+
+def test_parse_swipes_rejects_bad_entries():
+    assert parse_swipes({'swipes': [{'coreId': 1, 'direction': 'left'}]}) == [(1, 'left')]
+    with pytest.raises(SwipeError):
+        parse_swipes({'swipes': [{'coreId': True, 'direction': 'left'}]})
+    with pytest.raises(SwipeError):
+        parse_swipes({'swipes': []})
+
+
+def test_record_stores_swipes_and_updates_the_set(db):
+    store = SeenStore(db.seen_papers, db.swipes, cache_seconds=0)
+    store.record('client-1', [(1, 'left'), (2, 'right')])
+    store.record('client-1', [(3, 'left')])
+    seen = store.get('client-1')
+    assert all(core_id in seen for core_id in (1, 2, 3))
+    assert db.swipes.count_documents({'user': 'client-1'}) == 3
+    assert db.seen_papers.find_one({'_id': 'client-1'})['revision'] == 2
+    assert store.get('client-2').empty
+
+
+def test_paginate_skips_seen_papers(db):
+    db.papers.insert_many([{'coreId': core_id, 'publishedDate': f'2026-01-{core_id:02d}'} for core_id in range(1, 11)])
+    seen = SeenSet()
+    seen.add([10, 9, 7])
+    papers, cursor = paginate(db.papers, {}, {'limit': '3', 'fields': 'coreId'}, 3, seen=seen)
+    assert [paper['coreId'] for paper in papers] == [8, 6, 5]
+    assert decode_cursor(cursor)[1] == 5
+
+
+def test_paginate_stops_after_the_scan_rounds(db, monkeypatch):
+    monkeypatch.setattr(pagination, 'SEEN_SCAN_ROUNDS', 1)
+    db.papers.insert_many([{'coreId': core_id, 'publishedDate': f'2026-01-{core_id:02d}'} for core_id in range(1, 11)])
+    seen = SeenSet()
+    seen.add(range(3, 11))
+    papers, cursor = paginate(db.papers, {}, {'limit': '2', 'fields': 'coreId'}, 2, seen=seen)
+    assert papers == []
+    # The page points past the papers it scanned, so they are not read again
+    assert decode_cursor(cursor)[1] == 8
@@ -0,0 +1,65 @@
+"""VectorIndex: incremental fetchedAt sync of paper_vectors and similarity lookups"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from search_index import SYNC_LOOKBACK_SECONDS
+from vector_index import VECTOR_DIMENSIONS, VectorIndex, store_vectors
+
+mongomock = pytest.importorskip('mongomock')
+
+NOW = datetime(2026, 10, 17, 12, 0)
+EXPIRES = NOW + timedelta(days=30)
+
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).random((count, VECTOR_DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def vectors():
+    return mongomock.MongoClient().db.paper_vectors
+
+
+def test_refresh_loads_vectors_once_per_data_version(vectors):
+    store_vectors(vectors, [1, 2, 3], unit_vectors(3), NOW, EXPIRES)
+    index = VectorIndex()
+    index.refresh(vectors, 1, now=NOW)
+    assert len(index) == 3
+    store_vectors(vectors, [4], unit_vectors(1, seed=1), NOW, EXPIRES)
+    index.refresh(vectors, 1, now=NOW)
+    assert len(index) == 3
+    index.refresh(vectors, 2, now=NOW)
+    assert len(index) == 4
+
+
+def test_refresh_picks_up_vectors_that_became_visible_late(vectors):
+    store_vectors(vectors, [1, 2], unit_vectors(2), NOW, EXPIRES)
+    index = VectorIndex()
+    index.refresh(vectors, 1, now=NOW)
+    store_vectors(vectors, [3], unit_vectors(1, seed=1), NOW - timedelta(seconds=SYNC_LOOKBACK_SECONDS // 2), EXPIRES)
+    index.refresh(vectors, 2, now=NOW)
+    assert sorted(index.core_ids) == [1, 2, 3]
+    assert index.watermark == NOW
+
+
+def test_most_similar_finds_the_nearest_vector(vectors):
+    base = unit_vectors(3)
+    near = base[0] + 0.01
+    store_vectors(vectors, [1, 2, 3, 4], np.vstack([base, near / np.linalg.norm(near)]), NOW, EXPIRES)
+    index = VectorIndex()
+    index.refresh(vectors, 1, now=NOW)
+    assert index.most_similar(4, limit=1)[0][0] == 1
+    assert index.most_similar(99) is None
+
+
+def test_vectors_leave_at_their_expiry_and_none_stays(vectors):
+    store_vectors(vectors, [1, 2], unit_vectors(2), NOW - timedelta(days=40), [NOW - timedelta(days=10), None])
+    store_vectors(vectors, [3], unit_vectors(1, seed=1), NOW, EXPIRES)
+    index = VectorIndex()
+    index.refresh(vectors, 1, now=NOW)
+    assert sorted(index.core_ids) == [2, 3]
+    index.expire(EXPIRES)
+    assert index.core_ids == [2]
@@ -0,0 +1,301 @@
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import ReplaceOne
+
+from search_index import SYNC_LOOKBACK_SECONDS, expiry_timestamp, tokenize
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DIMENSIONS = 256
+HASH_BUCKETS = 1 << 16      # hashed vocabulary the document frequencies are kept over
+PROJECTIONS_PER_BUCKET = 4  # non-zeros per bucket in the sparse random projection
+PROJECTION_SEED = 20240601
+MODEL_ID = 'paper_vectorizer'
+MAX_VECTORS = int(os.getenv('MAX_VECTORS', '60000'))
+CALIBRATION_SAMPLE = 20000
+MIN_POSITIVES = 20
+
+# Fixed sparse random projection from hashed buckets to the dense vector space
+_rng = np.random.default_rng(PROJECTION_SEED)
+PROJECTION_COLUMNS = _rng.integers(0, VECTOR_DIMENSIONS, size=(HASH_BUCKETS, PROJECTIONS_PER_BUCKET), dtype=np.int32)
+PROJECTION_SIGNS = _rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=(HASH_BUCKETS, PROJECTIONS_PER_BUCKET))
+
+
+def paper_text(paper):
+    keywords = ' '.join(k for k in paper.get('keywords') or [] if isinstance(k, str))
+    return f"{paper.get('title') or ''} {paper.get('title') or ''} {paper.get('abstract') or ''} {keywords}"
+
+
+def _buckets(text):
+    """Hashed unigram and bigram buckets of text, stable across processes"""
+    tokens = tokenize(text)
+    features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(feature.encode()) & (HASH_BUCKETS - 1) for feature in features]
+
+
+class PaperVectorizer:
+    """Hashed TF-IDF features projected to dense unit vectors, plus domain prototypes.
+
+    Document frequencies are kept per hash bucket, so the model has a fixed size no
+    matter how large the vocabulary grows. A whole ingest batch is vectorised with a
+    handful of NumPy scatter-adds rather than per paper.
+    """
+
+    def __init__(self, domains):
+        self.domains = list(domains)
+        self.doc_freq = np.zeros(HASH_BUCKETS, dtype=np.int32)
+        self.doc_count = 0
+        self.prototypes = np.zeros((len(self.domains), VECTOR_DIMENSIONS), dtype=np.float32)
+        # Until calibrated, no domain can be assigned from vectors alone
+        self.thresholds = np.full(len(self.domains), np.inf, dtype=np.float32)
+
+    def _bucket_batch(self, papers):
+        rows, buckets = [], []
+        for row, paper in enumerate(papers):
+            paper_buckets = _buckets(paper_text(paper))
+            rows.extend([row] * len(paper_buckets))
+            buckets.extend(paper_buckets)
+        return np.array(rows, dtype=np.int64), np.array(buckets, dtype=np.int64)
+
+    def transform(self, papers):
+        """Return an (n, VECTOR_DIMENSIONS) float32 matrix of unit vectors"""
+        vectors = np.zeros((len(papers), VECTOR_DIMENSIONS), dtype=np.float32)
+        if not papers:
+            return vectors
+        rows, buckets = self._bucket_batch(papers)
+        if len(rows):
+            # Term frequency per (paper, bucket), dampened, times bucket IDF
+            pairs, tf = np.unique(rows * HASH_BUCKETS + buckets, return_counts=True)
+            pair_rows, pair_buckets = pairs // HASH_BUCKETS, pairs % HASH_BUCKETS
+            idf = np.log((1 + self.doc_count) / (1 + self.doc_freq[pair_buckets])) + 1
+            weights = ((1 + np.log(tf)) * idf).astype(np.float32)
+            for j in range(PROJECTIONS_PER_BUCKET):
+                np.add.at(vectors, (pair_rows, PROJECTION_COLUMNS[pair_buckets, j]),
+                          weights * PROJECTION_SIGNS[pair_buckets, j])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def observe(self, papers):
+        """Fold a batch of stored papers into the bucket document frequencies"""
+        if not papers:
+            return
+        rows, buckets = self._bucket_batch(papers)
+        unique_buckets = np.unique(rows * HASH_BUCKETS + buckets) % HASH_BUCKETS
+        np.add.at(self.doc_freq, unique_buckets, 1)
+        self.doc_count += len(papers)
+
+    def score_domains(self, vectors):
+        """Cosine similarity of each vector to each domain prototype, shape (n, domains)"""
+        return vectors @ self.prototypes.T
+
+    def vector_domains(self, vectors):
+        """Domains whose calibrated threshold each vector clears"""
+        hits = self.score_domains(vectors) >= self.thresholds
+        return [[self.domains[i] for i in np.flatnonzero(row)] for row in hits]
+
+    def calibrate(self, vectors, labels):
+        """Fit prototypes and per-domain thresholds against keyword labels.
+
+        labels is a list of domain lists (from DomainMatcher). Each prototype is
+        the mean vector of its labelled papers; its threshold is the similarity that
+        maximises F1 against those labels, so vector-only assignments stay about as
+        precise as the keyword rules they extend.
+        """
+        if len(vectors) == 0:
+            return
+        for i, domain in enumerate(self.domains):
+            positive = np.array([domain in paper_labels for paper_labels in labels])
+            if positive.sum() < MIN_POSITIVES:
+                self.thresholds[i] = np.inf
+                continue
+            prototype = vectors[positive].mean(axis=0)
+            self.prototypes[i] = prototype / (np.linalg.norm(prototype) or 1)
+
+            scores = vectors @ self.prototypes[i]
+            order = np.argsort(-scores)
+            true_positives = np.cumsum(positive[order])
+            predicted = np.arange(1, len(order) + 1)
+            f1 = 2 * true_positives / (predicted + positive.sum())
+            self.thresholds[i] = scores[order][int(np.argmax(f1))]
+        logger.info("Calibrated vector domain thresholds: " + ', '.join(
+            f"{domain}={threshold:.3f}" for domain, threshold in zip(self.domains, self.thresholds)))
+
+    def save(self, collection):
+        collection.replace_one({'_id': MODEL_ID}, {
+            '_id': MODEL_ID,
+            'domains': self.domains,
+            'docFreq': self.doc_freq.tobytes(),
+            'docCount': self.doc_count,
+            'prototypes': self.prototypes.tobytes(),
+            'thresholds': [float(t) if np.isfinite(t) else None for t in self.thresholds],
+            'savedAt': datetime.now()
+        }, upsert=True)
+
+    @classmethod
+    def load(cls, collection, domains):
+        model = cls(domains)
+        doc = collection.find_one({'_id': MODEL_ID})
+        if not doc or doc.get('domains') != model.domains:
+            return model
+        model.doc_freq = np.frombuffer(doc['docFreq'], dtype=np.int32).copy()
+        model.doc_count = doc['docCount']
+        model.prototypes = np.frombuffer(doc['prototypes'], dtype=np.float32).reshape(
+            len(model.domains), VECTOR_DIMENSIONS).copy()
+        model.thresholds = np.array(
+            [np.inf if t is None else t for t in doc['thresholds']], dtype=np.float32)
+        return model
+
+
+def store_vectors(collection, core_ids, vectors, fetched_at, expires_at):
+    """Upsert paper vectors (one bulk round trip) into the paper_vectors collection.
+
+    fetched_at and expires_at are each one value for the whole batch or one per
+    vector; expires_at is the paper's expiresAt (None: kept, see indexes.paper_expiry).
+    """
+    if not core_ids:
+        return
+    if not isinstance(fetched_at, list):
+        fetched_at = [fetched_at] * len(core_ids)
+    if not isinstance(expires_at, list):
+        expires_at = [expires_at] * len(core_ids)
+    collection.bulk_write([
+        ReplaceOne({'_id': core_id},
+                   {'_id': core_id, 'v': vector.tobytes(), 'fetchedAt': fetched, 'expiresAt': expires}, upsert=True)
+        for core_id, vector, fetched, expires in zip(core_ids, vectors, fetched_at, expires_at)
+    ], ordered=False)
+
+
+def recalibrate(repository, vectorizer, matcher):
+    """Refit the vectorizer's domain prototypes on the most recently stored papers"""
+    papers = repository.recent_papers(CALIBRATION_SAMPLE, {'_id': 0, 'title': 1, 'abstract': 1, 'keywords': 1})
+    if not papers:
+        return
+    vectorizer.calibrate(vectorizer.transform(papers), [matcher.match_paper(paper) for paper in papers])
+
+
+class VectorIndex:
+    """Dense matrix of paper vectors held by the web process for similarity queries.
+
+    Capacity is capped at MAX_VECTORS rows (about 1 KB each); past that the oldest
+    papers are dropped first, as they are about to expire anyway.
+    """
+
+    def __init__(self, max_vectors=MAX_VECTORS):
+        self.max_vectors = max_vectors
+        self._lock = threading.Lock()
+        # Serialises refreshes: the version check, the query and the watermark move as one
+        self._sync_lock = threading.RLock()
+        self.matrix = np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32)
+        self.core_ids = []
+        self.fetched = np.zeros(0, dtype=np.float64)
+        self.expires = np.zeros(0, dtype=np.float64)
+        self.row_by_id = {}
+        self.watermark = None
+        self.data_version = None
+        self.resync_count = None
+
+    def __len__(self):
+        return len(self.core_ids)
+
+    def _rebuild(self, keep):
+        self.matrix = self.matrix[keep]
+        self.fetched = self.fetched[keep]
+        self.expires = self.expires[keep]
+        self.core_ids = [self.core_ids[i] for i in np.flatnonzero(keep)]
+        self.row_by_id = {core_id: row for row, core_id in enumerate(self.core_ids)}
+
+    def add_many(self, core_ids, vectors, fetched_ts, expires_ts):
+        with self._lock:
+            replaced = np.ones(len(self.core_ids), dtype=bool)
+            for core_id in core_ids:
+                row = self.row_by_id.get(core_id)
+                if row is not None:
+                    replaced[row] = False
+            if not replaced.all():
+                self._rebuild(replaced)
+            self.matrix = np.vstack([self.matrix, vectors.astype(np.float32)])
+            self.fetched = np.concatenate([self.fetched, np.asarray(fetched_ts, dtype=np.float64)])
+            self.expires = np.concatenate([self.expires, np.asarray(expires_ts, dtype=np.float64)])
+            self.core_ids.extend(core_ids)
+            self.row_by_id = {core_id: row for row, core_id in enumerate(self.core_ids)}
+            if len(self.core_ids) > self.max_vectors:
+                cutoff = np.sort(self.fetched)[len(self.core_ids) - self.max_vectors]
+                self._rebuild(self.fetched >= cutoff)
+
+    def expire(self, now):
+        """Drop vectors whose expiresAt has passed (mirrors the expiresAt TTL index)"""
+        with self._lock:
+            keep = self.expires > now.timestamp()
+            if not keep.all():
+                self._rebuild(keep)
+
+    def most_similar(self, core_id, limit=10):
+        """Return [(coreId, cosine similarity)] of the papers closest to core_id"""
+        with self._lock:
+            row = self.row_by_id.get(core_id)
+            if row is None:
+                return None
+            similarities = self.matrix @ self.matrix[row]
+            similarities[row] = -np.inf
+            count = min(limit, len(self.core_ids) - 1)
+            if count <= 0:
+                return []
+            best = np.argpartition(-similarities, count - 1)[:count]
+            best = best[np.argsort(-similarities[best])]
+            return [(self.core_ids[i], float(similarities[i])) for i in best]
+
+    def check_resync(self, resync_count):
+        """Forget the watermark once a bulk load has stored vectors dated behind it"""
+        with self._sync_lock:
+            if resync_count == self.resync_count:
+                return
+            if self.watermark is not None:
+                logger.info("Vectors were stored behind the similarity watermark; reloading them all")
+                self.watermark = None
+            self.resync_count = resync_count
+
+    def sync_query(self):
+        """Filter for vectors stored since the watermark, less SYNC_LOOKBACK_SECONDS"""
+        with self._sync_lock:
+            if not self.watermark:
+                return {}
+            return {'fetchedAt': {'$gte': self.watermark - timedelta(seconds=SYNC_LOOKBACK_SECONDS)}}
+
+    def apply_sync(self, docs, data_version, now=None):
+        """Add vector documents returned by sync_query (oldest first) and expire old rows"""
+        now = now or datetime.now()
+        with self._sync_lock:
+            core_ids, vectors, fetched, expires = [], [], [], []
+            watermark = self.watermark
+            for doc in docs:
+                row = self.row_by_id.get(doc['_id'])
+                # The lookback re-reads vectors already loaded at this fetchedAt
+                if row is not None and self.fetched[row] == doc['fetchedAt'].timestamp():
+                    continue
+                core_ids.append(doc['_id'])
+                vectors.append(np.frombuffer(doc['v'], dtype=np.float32))
+                fetched.append(doc['fetchedAt'].timestamp())
+                expires.append(expiry_timestamp(doc))
+                if watermark is None or doc['fetchedAt'] > watermark:
+                    watermark = doc['fetchedAt']
+            if core_ids:
+                self.add_many(core_ids, np.stack(vectors), fetched, expires)
+            self.expire(now)
+            self.watermark = watermark
+            self.data_version = data_version
+
+    def refresh(self, vectors_collection, data_version, now=None, read_resync_count=None):
+        """Load vectors stored since the watermark once ingestion has committed"""
+        if data_version == self.data_version:
+            return
+        with self._sync_lock:
+            if data_version == self.data_version:
+                return
+            if read_resync_count is not None:
+                self.check_resync(read_resync_count())
+            self.apply_sync(vectors_collection.find(self.sync_query()).sort('fetchedAt', 1), data_version, now)